@@ -0,0 +1,114 @@
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+_DAY_NS = 86400 * 10**9
+_EPOCH = date(1970, 1, 1)
+
+def iso_timestamp(nanoseconds):
+    return (datetime(1970, 1, 1) + timedelta(microseconds=nanoseconds // 1000)).isoformat()
+
+def day_number(when):
+    """Days since 1970-01-01 of a date or "YYYY-MM-DD..." string"""
+    if isinstance(when, str):
+        when = date.fromisoformat(when[:10])
+    return (when - _EPOCH).days
+
+class ArticleStats:
+    """Article counts per source and UTC day, kept in step with the served snapshot
+
+    Each refresh only adds the counts of the articles it brought in, so the
+    cost of a refresh and of reading the counts depends on the number of new
+    articles and of (source, day) pairs, not on the size of the history. The
+    counters are rebuilt from the whole snapshot when they cannot be carried
+    over, e.g. after a warm start or when a refresh also removed articles.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = None
+        self._days = {}
+        self._totals = {}
+        self._latest = {}
+        self._total = 0
+
+    def _rebuild(self, articles):
+        self._days, self._totals, self._latest, self._total = {}, {}, {}, len(articles)
+        if not len(articles):
+            return
+        codes = np.asarray(articles.sources.codes, dtype=np.int64)
+        days = articles.timestamps // _DAY_NS
+        offset = int(days.min())
+        span = int(days.max()) - offset + 1
+        pairs, counts = np.unique(codes * span + (days - offset), return_counts=True)
+        names = articles.sources.names
+        for pair, count in zip(pairs.tolist(), counts.tolist()):
+            code, day = divmod(pair, span)
+            self._days.setdefault(names[code], {})[day + offset] = count
+        # The table is in date order, so the last position of each source holds its newest article
+        reversed_codes = codes[::-1]
+        present, last = np.unique(reversed_codes, return_index=True)
+        for code, position in zip(present.tolist(), last.tolist()):
+            name = names[code]
+            self._totals[name] = sum(self._days[name].values())
+            self._latest[name] = int(articles.timestamps[len(codes) - 1 - position])
+
+    def _add(self, source, timestamp):
+        days = self._days.setdefault(source, {})
+        day = timestamp // _DAY_NS
+        days[day] = days.get(day, 0) + 1
+        self._totals[source] = self._totals.get(source, 0) + 1
+        if timestamp > self._latest.get(source, timestamp - 1):
+            self._latest[source] = timestamp
+        self._total += 1
+
+    def update(self, previous, current, added=None):
+        """Move the counters from the previous snapshot to the current one
+
+        added are the positions of the articles the refresh added; without
+        them, or if the counters are not those of previous, they are rebuilt.
+        """
+        articles = current.articles
+        with self._lock:
+            if self.version == current.version:
+                return
+            if (added is not None and previous is not None and self.version == previous.version
+                    and len(articles) == len(previous.articles) + len(added)):
+                for position in added:
+                    self._add(articles.sources[position], int(articles.timestamps[position]))
+            else:
+                self._rebuild(articles)
+            self.version = current.version
+
+    def sync(self, snapshot):
+        """Rebuild the counters from a snapshot newer than the one they were last brought to"""
+        if self.version is None or snapshot.version > self.version:
+            self.update(None, snapshot)
+
+    def sources(self):
+        """Sorted names of the sources that have articles"""
+        with self._lock:
+            return sorted(name for name, total in self._totals.items() if total)
+
+    def summary(self, start_date=None, end_date=None, sources=None):
+        """Totals, newest article and per-day counts of each source, days limited to an inclusive range"""
+        first = day_number(start_date) if start_date else None
+        last = day_number(end_date) if end_date else None
+        if isinstance(sources, str):
+            sources = [sources]
+        with self._lock:
+            names = sorted(self._totals) if not sources else [name for name in sources if name in self._totals]
+            result = {}
+            for name in names:
+                days = {
+                    (_EPOCH + timedelta(days=day)).isoformat(): count
+                    for day, count in sorted(self._days[name].items())
+                    if (first is None or day >= first) and (last is None or day <= last)
+                }
+                result[name] = {
+                    "total": self._totals[name],
+                    "latest": iso_timestamp(self._latest[name]),
+                    "days": days,
+                }
+            return {"version": self.version, "total": self._total, "sources": result}
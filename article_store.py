@@ -0,0 +1,224 @@
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from article_table import ArticleTable
+from feed_cache import CACHE_DIR
+
+# SQLite file holding every article ever fetched
+DB_PATH = os.environ.get("NEWS_DB_PATH", os.path.join(CACHE_DIR, "articles.db"))
+
+COLUMNS = ["Title", "Link", "Description", "Source", "Image", "date"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    link TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    source TEXT NOT NULL,
+    image TEXT,
+    date TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_date ON articles (date);
+CREATE INDEX IF NOT EXISTS idx_articles_source_date ON articles (source, date);
+"""
+
+# Only rows whose content actually changed are rewritten
+UPSERT = """
+INSERT INTO articles (link, title, description, source, image, date, first_seen, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (link) DO UPDATE SET
+    title = excluded.title,
+    description = excluded.description,
+    source = excluded.source,
+    image = excluded.image,
+    date = excluded.date,
+    updated_at = excluded.updated_at
+WHERE title IS NOT excluded.title
+    OR description IS NOT excluded.description
+    OR source IS NOT excluded.source
+    OR image IS NOT excluded.image
+    OR date IS NOT excluded.date
+"""
+
+# Links per query when checking which articles of a batch are already stored,
+# kept under SQLite's limit on bound parameters
+LOOKUP_CHUNK = 500
+
+# Query parameters that only track the click and never identify the article
+TRACKING_PARAMS = ("utm_", "mc_", "fbclid", "gclid")
+
+def canonical_link(link):
+    """Normalize an article URL so the same story always maps to the same key"""
+    link = (link or "").strip()
+    try:
+        parts = urlsplit(link)
+    except ValueError:
+        return link
+    if not parts.scheme:
+        return link
+
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith(TRACKING_PARAMS)]
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", urlencode(query), ""))
+
+def _format_date(value):
+    import pandas as pd
+    return pd.Timestamp(value).isoformat()
+
+def _filters(start_date=None, end_date=None, sources=None):
+    """SQL clauses and parameters for an inclusive date range and a set of sources"""
+    clauses, params = [], []
+    if start_date is not None:
+        clauses.append("date >= ?")
+        params.append(_format_date(start_date))
+    if end_date is not None:
+        clauses.append("date <= ?")
+        params.append(_format_date(end_date))
+    if sources:
+        if isinstance(sources, str):
+            sources = [sources]
+        clauses.append(f"source IN ({','.join('?' * len(sources))})")
+        params.extend(sources)
+    return clauses, params
+
+class ArticleStore:
+    """Embedded on-disk article history keyed by canonical link"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = None
+
+    @property
+    def _conn(self):
+        # Opened on first use, so creating a store touches no files; callers hold the lock
+        if self._connection is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._connection = conn
+        return self._connection
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def upsert(self, df):
+        """Insert new articles and update changed ones; returns (inserted, updated)"""
+        if df is None or df.empty:
+            return 0, 0
+
+        now = time.time()
+        rows = [
+            (
+                canonical_link(row.Link),
+                row.Title,
+                row.Description,
+                row.Source,
+                row.Image if isinstance(row.Image, str) else None,
+                _format_date(row.date),
+                now,
+                now,
+            )
+            for row in df[COLUMNS].itertuples(index=False)
+        ]
+
+        links = list(dict.fromkeys(row[0] for row in rows))
+        with self._lock, self._conn:
+            # Looked up by primary key, so the cost follows the batch rather than the table
+            existing = set()
+            for start in range(0, len(links), LOOKUP_CHUNK):
+                chunk = links[start:start + LOOKUP_CHUNK]
+                existing.update(link for link, in self._conn.execute(
+                    f"SELECT link FROM articles WHERE link IN ({','.join('?' * len(chunk))})", chunk
+                ))
+            changes = self._conn.total_changes
+            self._conn.executemany(UPSERT, rows)
+            written = self._conn.total_changes - changes
+
+        inserted = len(links) - len(existing)
+        return inserted, written - inserted
+
+    def load(self, start_date=None, end_date=None, sources=None):
+        """Load articles as a DataFrame sorted newest first, optionally filtered"""
+        clauses, params = _filters(start_date, end_date, sources)
+        query = "SELECT title, link, description, source, image, date FROM articles"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        # Newest first, with the link as tie-breaker so the order is stable for cursors
+        query += " ORDER BY date DESC, link DESC"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        import pandas as pd
+        df = pd.DataFrame(rows, columns=COLUMNS)
+        df["date"] = pd.to_datetime(df["date"])
+        return df
+
+    def iter_chunks(self, start_date=None, end_date=None, sources=None, chunk_size=20000):
+        """Yield lists of (title, link, description, source, image, date) rows, newest first
+
+        Each chunk is a separate keyset query after the last row of the previous
+        one, so memory stays bounded by chunk_size and writers are only blocked
+        while a chunk is read.
+        """
+        clauses, params = _filters(start_date, end_date, sources)
+        last = None
+        while True:
+            query = "SELECT title, link, description, source, image, date FROM articles"
+            where, args = list(clauses), list(params)
+            if last is not None:
+                # Written so SQLite walks the date index and stops after chunk_size rows
+                where.append("date <= ? AND (date < ? OR link < ?)")
+                args.extend((last[5], last[5], last[1]))
+            if where:
+                query += " WHERE " + " AND ".join(where)
+            query += " ORDER BY date DESC, link DESC LIMIT ?"
+            args.append(chunk_size)
+            with self._lock:
+                rows = self._conn.execute(query, args).fetchall()
+            if not rows:
+                return
+            yield rows
+            if len(rows) < chunk_size:
+                return
+            last = rows[-1]
+
+    def load_table(self, chunk_size=50000):
+        """Load every article into a compact ArticleTable, oldest first, without a DataFrame"""
+        with self._lock:
+            return ArticleTable(self._table_rows(chunk_size))
+
+    def _table_rows(self, chunk_size):
+        import pandas as pd
+        # Rows are streamed in chunks so only one chunk is ever held as Python objects
+        cursor = self._conn.execute(
+            "SELECT title, link, description, source, image, date, first_seen FROM articles ORDER BY date, link"
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            titles, links, descriptions, sources, images, dates, first_seen = zip(*rows)
+            timestamps = pd.to_datetime(pd.Series(dates), format="ISO8601").astype("int64").tolist()
+            yield from zip(titles, links, descriptions, sources, images, timestamps, first_seen)
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def last_updated(self):
+        """Time of the most recent write, or None for an empty store"""
+        with self._lock:
+            return self._conn.execute("SELECT MAX(updated_at) FROM articles").fetchone()[0]
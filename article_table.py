@@ -0,0 +1,366 @@
+"""Columnar article history shared by the store, the snapshot index and the API
+
+Web workers serve from ArticleTable and numpy alone. pandas, pyarrow and
+Pillow are imported inside the functions that need them (conversions here,
+dates in article_store and news_index, thumbnails), never at module level,
+so a worker starts without them.
+"""
+import zlib
+from array import array
+
+import numpy as np
+
+# Columns of an article table, in the order of to_frame()
+COLUMNS = ("Title", "Link", "Description", "Source", "Image", "date", "cluster_id")
+
+class StringColumn:
+    """Sequence of strings packed into one UTF-8 buffer
+
+    A Python str costs about 50 bytes of overhead plus a pointer in a list;
+    here each value costs its encoded length plus an 8-byte offset. Values
+    are decoded on access. None is stored as an empty string. Columns are
+    only appended to while their table is being built. The layout is that of
+    an Arrow large_string array, so columns convert to and from Arrow
+    without copying.
+    """
+
+    __slots__ = ("_data", "_offsets")
+
+    def __init__(self, values=()):
+        self._data = bytearray()
+        self._offsets = array("q", [0])
+        for value in values:
+            self.append(value)
+
+    @classmethod
+    def from_buffers(cls, count, offsets, data):
+        """Read-only column over existing buffers, e.g. of a memory-mapped Arrow file"""
+        column = cls.__new__(cls)
+        column._offsets = memoryview(offsets).cast("B").cast("q")[:count + 1]
+        column._data = memoryview(data) if data is not None else memoryview(b"")
+        return column
+
+    def buffers(self):
+        """(offsets, data) as buffer objects, e.g. for pyarrow.LargeStringArray.from_buffers"""
+        return self._offsets, self._data
+
+    def append(self, value):
+        if value:
+            self._data += value.encode("utf-8")
+        self._offsets.append(len(self._data))
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("StringColumn index out of range")
+        return str(self._data[self._offsets[position]:self._offsets[position + 1]], "utf-8")
+
+    def __iter__(self):
+        data, offsets = self._data, self._offsets
+        for position in range(len(offsets) - 1):
+            yield str(data[offsets[position]:offsets[position + 1]], "utf-8")
+
+    def hashes(self):
+        """CRC-32 of every value as int64; unlike hash() the same in every process"""
+        data, offsets = self._data, self._offsets
+        return np.fromiter((zlib.crc32(data[offsets[position]:offsets[position + 1]])
+                            for position in range(len(offsets) - 1)), dtype=np.int64, count=len(offsets) - 1)
+
+    @property
+    def nbytes(self):
+        return len(self._data) + self._offsets.itemsize * len(self._offsets)
+
+class CodedColumn:
+    """Sequence of repeated strings stored as integer codes into a list of distinct values
+
+    Codes are collected with append() and turned into a numpy array by
+    finish(), after which the column is read-only. The distinct values can
+    also be a StringColumn, as when the column is mapped from an Arrow file.
+    """
+
+    __slots__ = ("codes", "names", "_lookup", "_dtype")
+
+    def __init__(self, values=(), dtype=np.int32):
+        self.codes = array("q")
+        self.names = []
+        self._lookup = {}
+        self._dtype = dtype
+        for value in values:
+            self.append(value)
+
+    @classmethod
+    def from_codes(cls, codes, names):
+        """Read-only column over existing codes (-1 for missing) and distinct values"""
+        column = cls.__new__(cls)
+        column.codes = codes
+        column.names = names
+        column._lookup = None
+        column._dtype = codes.dtype
+        return column
+
+    def finish(self):
+        self.codes = np.array(self.codes, dtype=self._dtype)
+        self._lookup = None
+        return self
+
+    def append(self, value):
+        # None and NaN (missing values from pandas) become -1
+        if value is None or value != value:
+            self.codes.append(-1)
+            return
+        code = self._lookup.get(value)
+        if code is None:
+            code = self._lookup[value] = len(self.names)
+            self.names.append(value)
+        self.codes.append(code)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, position):
+        code = self.codes[position]
+        return self.names[code] if code >= 0 else None
+
+    def __iter__(self):
+        names = self.names
+        for code in self.codes.tolist():
+            yield names[code] if code >= 0 else None
+
+    @property
+    def nbytes(self):
+        if isinstance(self.names, StringColumn):
+            return self.codes.nbytes + self.names.nbytes
+        return self.codes.nbytes + sum(len(name) + 49 for name in self.names)
+
+class ArticleTable:
+    """Read-only columnar articles in ascending (date, link) order
+
+    Strings are packed per column, sources and cluster ids are interned as
+    small integer codes and dates are int64 nanoseconds, so a million articles
+    take a fraction of a DataFrame's memory. Columns can be read by name like
+    a frame (table['Title']), and to_frame() converts back for exports.
+    """
+
+    def __init__(self, rows=()):
+        """Build from (title, link, description, source, image, timestamp_ns, first_seen) tuples
+
+        Rows are streamed into the packed columns, so the input can be a cursor
+        or generator. They should arrive in ascending (date, link) order;
+        otherwise the table is sorted once at the end.
+        """
+        self.titles = StringColumn()
+        self.links = StringColumn()
+        self.descriptions = StringColumn()
+        self.images = StringColumn()
+        self.sources = CodedColumn(dtype=np.int32)
+        timestamps = array("q")
+        first_seen = array("d")
+        for title, link, description, source, image, timestamp, seen in rows:
+            self.titles.append(title)
+            self.links.append(link)
+            self.descriptions.append(description)
+            self.sources.append(source)
+            self.images.append(image if isinstance(image, str) else None)
+            timestamps.append(timestamp)
+            first_seen.append(seen or 0.0)
+        self.timestamps = np.array(timestamps, dtype=np.int64)
+        self.first_seen = np.array(first_seen, dtype=np.float64)
+        if not self._is_sorted():
+            self._sort()
+        self.sources.finish()
+        self.clusters = CodedColumn([None] * len(self.timestamps)).finish()
+
+        # Links by hash for find(); collisions are resolved by comparing the link
+        hashes = self.links.hashes()
+        self._link_order = np.argsort(hashes, kind="stable").astype(np.int32)
+        self._link_hashes = hashes[self._link_order]
+
+    def _is_sorted(self):
+        steps = np.diff(self.timestamps)
+        if (steps < 0).any():
+            return False
+        links = self.links
+        return all(links[i] <= links[i + 1] for i in np.flatnonzero(steps == 0).tolist())
+
+    def _sort(self):
+        keys = list(zip(self.timestamps.tolist(), self.links))
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        del keys
+        self.timestamps = self.timestamps[order]
+        self.first_seen = self.first_seen[order]
+        for name in ("titles", "links", "descriptions", "images"):
+            column = getattr(self, name)
+            setattr(self, name, StringColumn(column[i] for i in order))
+        self.sources = CodedColumn((self.sources[i] for i in order), dtype=np.int32)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build a table from an article DataFrame, keeping its cluster_id column if present"""
+        import pandas as pd
+        if df.empty:
+            return cls()
+        ordered = df.sort_values(by=['date', 'Link'], ascending=True, kind="mergesort")
+        images = ordered['Image'] if 'Image' in ordered else [None] * len(ordered)
+        table = cls(zip(ordered['Title'], ordered['Link'], ordered['Description'], ordered['Source'], images,
+                        pd.to_datetime(ordered['date']).astype("int64").tolist(), [0.0] * len(ordered)))
+        if 'cluster_id' in ordered:
+            table.set_clusters(ordered['cluster_id'])
+        return table
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def __contains__(self, name):
+        return name in COLUMNS
+
+    def __getitem__(self, name):
+        """Column by DataFrame name, e.g. table['Title']"""
+        if name == "date":
+            import pandas as pd
+            return pd.to_datetime(self.timestamps)
+        return {
+            "Title": self.titles,
+            "Link": self.links,
+            "Description": self.descriptions,
+            "Source": self.sources,
+            "Image": self.images,
+            "cluster_id": self.clusters,
+        }[name]
+
+    def set_clusters(self, cluster_ids):
+        """Attach one cluster id (or None) per row, in table order; only before the table is shared"""
+        self.clusters = CodedColumn(cluster_ids).finish()
+
+    def find(self, link):
+        """Position of a link, or None"""
+        key = zlib.crc32(link.encode("utf-8"))
+        start = int(np.searchsorted(self._link_hashes, key, side="left"))
+        for index in range(start, len(self._link_hashes)):
+            if self._link_hashes[index] != key:
+                break
+            position = int(self._link_order[index])
+            if self.links[position] == link:
+                return position
+        return None
+
+    def row(self, position):
+        """One article as a dict with the DataFrame column names"""
+        import pandas as pd
+        return {
+            "Title": self.titles[position],
+            "Link": self.links[position],
+            "Description": self.descriptions[position],
+            "Source": self.sources[position],
+            "Image": self.images[position] or None,
+            "date": pd.Timestamp(int(self.timestamps[position])),
+            "cluster_id": self.clusters[position],
+        }
+
+    def added_since(self, when):
+        """Positions of articles first stored after the given time, oldest first"""
+        return np.flatnonzero(self.first_seen > when).tolist()
+
+    def to_frame(self):
+        """Newest-first DataFrame of the table, for exports and pandas-based tooling"""
+        import pandas as pd
+        df = pd.DataFrame({
+            "Title": list(self.titles),
+            "Link": list(self.links),
+            "Description": list(self.descriptions),
+            "Source": list(self.sources),
+            "Image": [image or None for image in self.images],
+            "date": pd.to_datetime(self.timestamps),
+            "cluster_id": list(self.clusters),
+        }, columns=list(COLUMNS))
+        return df.iloc[::-1].reset_index(drop=True)
+
+    def write_arrow(self, path, metadata=None):
+        """Write the table, with its link lookup, as one record batch of an Arrow IPC file
+
+        The columns are handed to Arrow without copying and the file is written
+        uncompressed, so read_arrow() can map it back without copying either.
+        """
+        import pyarrow as pa
+
+        def strings(column):
+            offsets, data = column.buffers()
+            return pa.LargeStringArray.from_buffers(len(column), pa.py_buffer(offsets), pa.py_buffer(data))
+
+        def coded(column):
+            codes = np.asarray(column.codes, dtype=np.int32)
+            names = column.names
+            names = strings(names) if isinstance(names, StringColumn) else pa.array(names, pa.large_string())
+            # Missing values keep their -1 code under the null mask, which read_arrow relies on
+            return pa.DictionaryArray.from_arrays(pa.array(codes, mask=codes < 0), names)
+
+        batch = pa.record_batch([
+            strings(self.titles),
+            strings(self.links),
+            strings(self.descriptions),
+            coded(self.sources),
+            strings(self.images),
+            pa.array(self.timestamps, pa.timestamp("ns")),
+            coded(self.clusters),
+            pa.array(self.first_seen, pa.float64()),
+            pa.array(self._link_hashes, pa.int64()),
+            pa.array(self._link_order, pa.int32()),
+        ], names=list(COLUMNS) + ["first_seen", "link_hash", "link_order"])
+        if metadata:
+            batch = batch.replace_schema_metadata({key: str(value) for key, value in metadata.items()})
+        with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+
+    @classmethod
+    def read_arrow(cls, path):
+        """Map a file from write_arrow(); returns (table, metadata)
+
+        Every column is a view of the memory-mapped file, so processes reading
+        the same file share one copy of it in the page cache.
+        """
+        import pyarrow as pa
+        reader = pa.ipc.open_file(pa.memory_map(path))
+        metadata = {key.decode(): value.decode() for key, value in (reader.schema.metadata or {}).items()}
+        batch = reader.get_batch(0)
+        count = batch.num_rows
+        if not count:
+            return cls(), metadata
+
+        def strings(array, length):
+            _, offsets, data = array.buffers()
+            return StringColumn.from_buffers(length, offsets, data)
+
+        def numbers(array, dtype):
+            return np.frombuffer(array.buffers()[1], dtype=dtype, count=len(array))
+
+        def coded(array):
+            return CodedColumn.from_codes(numbers(array.indices, np.int32), strings(array.dictionary, len(array.dictionary)))
+
+        column = batch.column
+        table = cls.__new__(cls)
+        table.titles = strings(column("Title"), count)
+        table.links = strings(column("Link"), count)
+        table.descriptions = strings(column("Description"), count)
+        table.sources = coded(column("Source"))
+        table.sources.names = list(table.sources.names)
+        table.images = strings(column("Image"), count)
+        table.timestamps = numbers(column("date"), np.int64)
+        table.clusters = coded(column("cluster_id"))
+        table.first_seen = numbers(column("first_seen"), np.float64)
+        table._link_hashes = numbers(column("link_hash"), np.int64)
+        table._link_order = numbers(column("link_order"), np.int32)
+        return table, metadata
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the table"""
+        return (self.timestamps.nbytes + self.first_seen.nbytes + self._link_hashes.nbytes + self._link_order.nbytes
+                + self.links.nbytes + self.titles.nbytes + self.descriptions.nbytes + self.images.nbytes
+                + self.sources.nbytes + self.clusters.nbytes)
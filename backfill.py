@@ -0,0 +1,46 @@
+"""Fetch older listing pages of scraped sources into the article store
+
+Usage: python backfill.py [--source deeplearning.ai] [--pages 10] [--delay 1]
+
+Regular refreshes only read the first listing page of an html source. This
+walks its older pages (the source's page_url), one request every --delay
+seconds, and stores every dated article found, however old.
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from article_store import ArticleStore
+from fetch_data import BACKFILL_DELAY, backfill_source, extract_and_clean_data, registry
+from fetcher import fetcher
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", action="append", dest="sources", help="source name; repeat for several "
+                        "(default: every html source with a page_url)")
+    parser.add_argument("--pages", type=int, default=10, help="older pages to read per source")
+    parser.add_argument("--delay", type=float, default=BACKFILL_DELAY, help="seconds between page requests")
+    args = parser.parse_args(argv)
+
+    sources = [source for source in registry
+               if source.page_url and (not args.sources or source.name in args.sources)]
+    if not sources:
+        parser.error("no html source with a page_url to backfill")
+
+    store = ArticleStore()
+    try:
+        for source in sources:
+            start = time.perf_counter()
+            entries, pages = fetcher.run(backfill_source(source, args.pages, args.delay))
+            df = extract_and_clean_data(pd.DataFrame(entries), max_age=None)
+            inserted, updated = store.upsert(df)
+            seconds = time.perf_counter() - start
+            print(f"{source.name}: {pages} pages, {len(df)} articles in {seconds:.1f}s "
+                  f"({pages / seconds:.2f} pages/s), {inserted} new and {updated} updated")
+    finally:
+        store.close()
+        fetcher.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Scraping The Batch: full-page parse versus incremental parsing, and backfill throughput
+
+Usage: python -m benchmarks.bench_batch [--entries 15,100,1000] [--pages 20] [--latency-ms 50] [--json results.json]
+
+The listing page fixture is scaled to `entries` articles:
+
+- "full page (original)": the whole page parsed into one BeautifulSoup tree and
+  every article read, as every refresh used to do
+- "all articles": each <article> cut out and parsed on its own (first poll)
+- "1 new" / "0 new": a refresh of a changed page whose articles below the first
+  one (or all of them) are already known, so parsing stops at the first known link
+
+Backfill reads --pages older listing pages served by ReplayTransport with
+--latency-ms per request and no delay between pages, so the rate shown is the
+most a backfill can reach; NEWS_BACKFILL_DELAY bounds it below that.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+# Keep the benchmark's feed state away from the real cache
+os.environ["NEWS_CACHE_DIR"] = tempfile.mkdtemp(prefix="news-bench-")
+
+from bs4 import BeautifulSoup
+
+from benchmarks.common import measure, report
+from benchmarks.replay import ReplayTransport, listing_pages, scaled_bodies, sources
+from fetch_data import backfill_source, html_entry, parse_html_entries
+from fetcher import fetcher
+
+def full_page_entries(html, source):
+    """The original parse: one tree of the whole page, then every item"""
+    soup = BeautifulSoup(html, "html.parser")
+    return [html_entry(item, source, source.url) for item in soup.select(source.selectors["item"])]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", default="15,100,1000", help="comma-separated articles per listing page")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    source = sources("html")[0]
+    results = []
+    for entries in [int(value) for value in args.entries.split(",")]:
+        html = scaled_bodies(entries)[source.url].decode("utf-8")
+        links = parse_html_entries(html, source)["Link"]
+        cases = [
+            ("full page (original)", lambda: full_page_entries(html, source)),
+            ("all articles", lambda: parse_html_entries(html, source)),
+            ("1 new", lambda: parse_html_entries(html, source, seen=set(links[1:]))),
+            ("0 new", lambda: parse_html_entries(html, source, seen=set(links))),
+        ]
+        for name, fn in cases:
+            results.append({"case": name, "articles": len(links), "seconds": measure(fn, args.repeat)})
+
+    per_page = 15
+    fetcher.close()
+    fetcher.transport = ReplayTransport(listing_pages(source, args.pages, per_page), args.latency_ms / 1000)
+    start = time.perf_counter()
+    found, pages = fetcher.run(backfill_source(source, args.pages + 1, delay=0))
+    seconds = time.perf_counter() - start
+    fetcher.close()
+    results.append({"case": "backfill", "pages": pages, "articles": len(found["Link"]), "seconds": seconds,
+                    "pages_per_s": pages / seconds, "articles_per_s": len(found["Link"]) / seconds})
+
+    report("The Batch scraping", results, args.json)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compare per-row extract_date with the batched normalize_dates
+
+Usage: python -m benchmarks.bench_dates [--size 100000] [--json results.json]
+
+Exits non-zero if a batch mixing naive and offset-bearing ISO 8601 values is
+not converted row by row.
+"""
+import argparse
+import random
+
+import pandas as pd
+
+from benchmarks.common import measure, report
+from fetch_data import extract_date, normalize_dates
+
+FORMATS = [
+    lambda d: d.strftime("%a, %d %b %Y %H:%M:%S GMT"),
+    lambda d: d.strftime("%a, %d %b %Y %H:%M:%S -0400"),
+    lambda d: d.strftime("%d %b %Y"),
+    lambda d: d.strftime("%Y-%m-%dT%H:%M:%S+02:00"),
+    lambda d: d.strftime("%Y-%m-%dT%H:%M:%S"),
+    lambda d: d.strftime("%Y-%m-%d"),
+    lambda d: d.strftime("%b %d, %Y"),
+]
+
+# Naive values are UTC whatever the offsets of the other rows in the batch
+MIXED_BATCH = [
+    ("2025-04-14T10:00:00+02:00", "2025-04-14 08:00:00"),
+    ("2025-04-14T10:00:00", "2025-04-14 10:00:00"),
+    ("2025-04-14T10:00:00Z", "2025-04-14 10:00:00"),
+    ("2025-04-14", "2025-04-14 00:00:00"),
+    ("2025-04-14T10:00:00-05:00", "2025-04-14 15:00:00"),
+    ("2025-04-14 23:30", "2025-04-14 23:30:00"),
+]
+
+def synthetic_published(size, seed=0):
+    """Build a Series of Published strings mixing the formats seen in our feeds"""
+    rng = random.Random(seed)
+    start = pd.Timestamp("2024-01-01")
+    values = []
+    for _ in range(size):
+        moment = start + pd.Timedelta(seconds=rng.randrange(0, 500 * 86400))
+        values.append(rng.choice(FORMATS)(moment))
+    # A few unparseable values, as real feeds occasionally send
+    for i in range(0, size, 1000):
+        values[i] = "No Date"
+    return pd.Series(values)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    published = synthetic_published(args.size)
+
+    results = []
+    for name, fn in [
+        ("extract_date (per row)", lambda: published.apply(extract_date)),
+        ("normalize_dates (batched)", lambda: normalize_dates(published)),
+    ]:
+        seconds = measure(fn, args.repeat)
+        results.append({"stage": name, "rows": args.size, "seconds": seconds, "rows_per_second": args.size / seconds})
+
+    # The calendar day must agree wherever the old parser succeeded on a UTC input
+    old = published.apply(extract_date)
+    new = normalize_dates(published)
+    utc_rows = published.str.endswith("GMT") | ~published.str.contains(":")
+    agree = (old[utc_rows].dt.normalize() == new[utc_rows].dt.normalize()) | old[utc_rows].isna()
+    results.append({"stage": "agreement on UTC rows", "rows": int(utc_rows.sum()), "ratio": float(agree.mean())})
+
+    mixed = normalize_dates(pd.Series([value for value, _ in MIXED_BATCH]))
+    expected = pd.to_datetime(pd.Series([value for _, value in MIXED_BATCH]))
+    wrong = int((mixed != expected).sum())
+    results.append({"stage": "mixed ISO offsets", "rows": len(MIXED_BATCH), "wrong": wrong})
+
+    report("Date parsing", results, args.json)
+    if wrong:
+        raise SystemExit(f"normalize_dates got {wrong} of {len(MIXED_BATCH)} mixed ISO values wrong")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Bulk export throughput and memory: streamed JSONL / CSV / Parquet versus the old to_excel
+
+Usage: python -m benchmarks.bench_export [--sizes 100000,1000000] [--excel-max 100000] [--json results.json]
+
+Synthetic articles are written to a temporary ArticleStore once per size. Each
+export then runs in a fresh child process writing to a temporary file:
+
+- "jsonl", "csv", "parquet": export.export_file, reading the store in chunks
+- "xlsx": what fetch_data.py used to do, the whole history as a DataFrame
+  written with to_excel (only up to --excel-max articles; it is slow and Excel
+  sheets stop at 1,048,576 rows)
+
+"peak_mb" is the child's peak RSS minus its RSS after the imports, so it is
+the memory the export itself needed.
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+# Keep the benchmark's store and caches away from the real ones
+os.environ["NEWS_CACHE_DIR"] = tempfile.mkdtemp(prefix="news-bench-")
+
+from article_store import ArticleStore
+from benchmarks.bench_memory import fill_store
+from benchmarks.common import report
+
+def rss_mb():
+    with open("/proc/self/status", "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def run_export(fmt, db_path, path, results):
+    import pandas as pd  # noqa: F401 - imported up front so it is not counted as export memory
+    import pyarrow.parquet  # noqa: F401
+    import export
+
+    store = ArticleStore(db_path)
+    before = rss_mb()
+    start = time.perf_counter()
+    if fmt == "xlsx":
+        store.load().to_excel(path)
+    else:
+        export.export_file(store, path, fmt)
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    results.put({"seconds": seconds, "peak_mb": peak - before, "file_mb": os.path.getsize(path) / 2**20})
+
+def measure_export(fmt, db_path, directory):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=run_export,
+                              args=(fmt, db_path, os.path.join(directory, f"export.{fmt}"), results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100000,1000000")
+    parser.add_argument("--excel-max", type=int, default=100000)
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for size in [int(value) for value in args.sizes.split(",")]:
+        directory = tempfile.mkdtemp(prefix="news-bench-export-")
+        db_path = os.path.join(directory, "articles.db")
+        store = ArticleStore(db_path)
+        fill_store(store, size)
+        store.close()
+        for fmt in ("jsonl", "csv", "parquet", "xlsx"):
+            if fmt == "xlsx" and size > args.excel_max:
+                continue
+            result = measure_export(fmt, db_path, directory)
+            results.append({"format": fmt, "articles": size, **result,
+                            "rows_per_s": size / result["seconds"]})
+
+    report("Bulk export", results, args.json)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Per-request latency of /api/news filtering: DataFrame scans versus NewsIndex lookups
+
+Usage: python -m benchmarks.bench_filter [--sizes 1000,100000] [--json results.json]
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from benchmarks.common import report
+from main_page import filter_news, paginate, process_news_item
+from news_index import NewsIndex
+
+SOURCES = ["Tech Crunch Waymo", "Wired: Waymo", "Cars Arstechnica", "The Last Driver License Holder", "deeplearning.ai"]
+
+def synthetic_articles(size, seed=0):
+    """Newest-first frame shaped like a snapshot"""
+    rng = random.Random(seed)
+    start = pd.Timestamp("2022-01-01")
+    df = pd.DataFrame({
+        "Title": [f"Robotaxi story {i}" for i in range(size)],
+        "Link": [f"https://example.com/articles/{i}" for i in range(size)],
+        "Description": ["Waymo and others expand driverless service. " * 8] * size,
+        "Source": [rng.choice(SOURCES) for _ in range(size)],
+        "Image": [None if i % 3 else f"https://example.com/{i}.jpg" for i in range(size)],
+        "date": [start + pd.Timedelta(minutes=rng.randrange(0, 3 * 365 * 1440)) for _ in range(size)],
+    })
+    return df.sort_values(by=["date", "Link"], ascending=False, ignore_index=True)
+
+def dataframe_request(df, query):
+    filtered = filter_news(df, query.get("start_date"), query.get("end_date"), query.get("sources"))
+    page, _ = paginate(filtered, query.get("limit"))
+    return [process_news_item(row) for _, row in page.iterrows()]
+
+def index_request(index, query):
+    items, _, _ = index.query(query.get("start_date"), query.get("end_date"), query.get("sources"), query.get("limit"))
+    return items
+
+QUERIES = {
+    "first page": {"limit": 24},
+    "source page": {"sources": "Wired: Waymo", "limit": 24},
+    "date range page": {"start_date": "2023-03-01", "end_date": "2023-06-30", "limit": 24},
+    "date range + source, all": {"start_date": "2024-01-01", "end_date": "2024-01-31", "sources": "Cars Arstechnica"},
+}
+
+def per_request(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,100000")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for size in [int(size) for size in args.sizes.split(",")]:
+        df = synthetic_articles(size)
+        start = time.perf_counter()
+        index = NewsIndex(df, process_news_item)
+        results.append({"articles": size, "query": "index build (once per refresh)",
+                        "ms": (time.perf_counter() - start) * 1000})
+
+        for name, query in QUERIES.items():
+            assert dataframe_request(df, query) == index_request(index, query), name
+            old = per_request(lambda: dataframe_request(df, query), max(1, args.repeat // 10))
+            new = per_request(lambda: index_request(index, query), args.repeat)
+            results.append({"articles": size, "query": name, "dataframe_ms": old * 1000,
+                            "index_ms": new * 1000, "speedup": old / new})
+
+    report("News filtering per request", results, args.json)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Compare the original two-parse description handling with process_description
+
+Usage: python -m benchmarks.bench_html [--size 5000] [--json results.json]
+"""
+import argparse
+import random
+
+from benchmarks.common import measure, report
+from fetch_data import clean_html, extract_image_url
+from html_text import BACKENDS, LexborHTMLParser, process_description
+
+WORDS = "waymo robotaxi cruise tesla autonomous driverless fleet city permit sensor lidar rider".split()
+
+def synthetic_description(rng):
+    paragraphs = "".join(
+        f"<p>{' '.join(rng.choice(WORDS) for _ in range(40))} <a href='https://example.com/{rng.random()}'>link</a></p>"
+        for _ in range(rng.randint(2, 6))
+    )
+    image = f'<img src="https://example.com/{rng.randrange(10**6)}.jpg" width="640">' if rng.random() < 0.7 else ""
+    return f"<div>{image}{paragraphs}</div>"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    descriptions = [synthetic_description(rng) for _ in range(args.size)]
+
+    def original():
+        for html in descriptions:
+            extract_image_url({}, html)
+            clean_html(html)[:500].replace("\n", "")
+
+    cases = [("bs4 twice (original)", original)]
+    for name in BACKENDS:
+        if name == "selectolax" and LexborHTMLParser is None:
+            continue
+        cases.append((f"process_description ({name})",
+                      lambda name=name: [process_description(html, backend=name) for html in descriptions]))
+
+    results = []
+    for name, fn in cases:
+        seconds = measure(fn, args.repeat)
+        results.append({"stage": name, "entries": args.size, "seconds": seconds, "entries_per_second": args.size / seconds})
+
+    report("Description processing", results, args.json)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Memory and latency of the snapshot layouts: DataFrame + prerendered items versus ArticleTable
+
+Usage: python -m benchmarks.bench_memory [--sizes 100000,1000000] [--json results.json]
+
+Synthetic articles are written to a temporary ArticleStore once per size. Each
+layout is then loaded from it in a fresh child process, so one layout's
+leftovers cannot inflate the other's numbers:
+
+- "dataframe": what snapshots used to hold, the history DataFrame plus every
+  article rendered to its response dict up front (the previous NewsIndex)
+- "table": ArticleTable plus the NewsIndex built on it, rendering on demand
+
+"retained" is the Python heap (including numpy buffers) still allocated after
+the build, "peak" the most allocated at once while building, both measured
+with tracemalloc.
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import time
+import tracemalloc
+
+# Keep the benchmark's store and caches away from the real ones
+os.environ["NEWS_CACHE_DIR"] = tempfile.mkdtemp(prefix="news-bench-")
+
+import pandas as pd
+
+from article_store import ArticleStore
+from benchmarks.common import report
+from benchmarks.bench_filter import SOURCES, dataframe_request
+from main_page import build_index, process_news_item
+
+WORDS = ("waymo robotaxi cruise zoox tesla driverless autonomous fleet city permit safety lidar "
+         "expansion service riders launch regulators miles testing highway downtown airport").split()
+
+QUERIES = {
+    "first_page": {"limit": 24},
+    "source_page": {"sources": "Wired: Waymo", "limit": 24},
+    "date_range_page": {"start_date": "2023-03-01", "end_date": "2023-06-30", "limit": 24},
+}
+
+def fill_store(store, size, seed=0, batch=50000):
+    """Write size synthetic articles with distinct texts spread over three years"""
+    rng = random.Random(seed)
+    start = pd.Timestamp("2022-01-01")
+    for offset in range(0, size, batch):
+        count = min(batch, size - offset)
+        ids = range(offset, offset + count)
+        store.upsert(pd.DataFrame({
+            "Title": [" ".join(rng.choices(WORDS, k=9)).capitalize() + f" ({i})" for i in ids],
+            "Link": [f"https://example.com/{rng.choice(SOURCES).split()[0].lower()}/articles/{i}" for i in ids],
+            "Description": [" ".join(rng.choices(WORDS, k=45)) for _ in ids],
+            "Source": [rng.choice(SOURCES) for _ in ids],
+            "Image": [None if i % 3 else f"https://cdn.example.com/images/{i}.jpg" for i in ids],
+            "date": [start + pd.Timedelta(minutes=rng.randrange(0, 3 * 365 * 1440)) for _ in ids],
+        }))
+
+def dataframe_layout(store):
+    df = store.load()
+    ordered = df.sort_values(by=["date", "Link"], ascending=True, kind="mergesort")
+    timestamps = ordered["date"].astype("int64").tolist()
+    keys = list(zip(timestamps, ordered["Link"].tolist()))
+    items = [process_news_item(row) for row in ordered.to_dict("records")]
+    positions = {link: position for position, (_, link) in enumerate(keys)}
+    return df, timestamps, keys, items, positions
+
+def table_layout(store):
+    table = store.load_table()
+    return table, build_index(table)
+
+def per_request(fn, repeat=50):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def measure_layout(path, layout, queue):
+    """Child process: build one layout from the store and report its memory and latency"""
+    store = ArticleStore(path)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    built = dataframe_layout(store) if layout == "dataframe" else table_layout(store)
+    seconds = time.perf_counter() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {"layout": layout, "articles": store.count(), "build_s": seconds,
+              "retained_mb": retained / 2 ** 20, "peak_mb": peak / 2 ** 20,
+              "maxrss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+    if layout == "dataframe":
+        df, _, _, items, positions = built
+        for name, query in QUERIES.items():
+            result[f"{name}_ms"] = per_request(lambda: dataframe_request(df, query), 5)
+        link = items[len(items) // 2]["Link"]
+        result["lookup_ms"] = per_request(lambda: items[positions[link]])
+    else:
+        table, index = built
+        for name, query in QUERIES.items():
+            result[f"{name}_ms"] = per_request(
+                lambda: index.query(query.get("start_date"), query.get("end_date"), query.get("sources"),
+                                    query.get("limit")))
+        link = table.links[len(table) // 2]
+        result["lookup_ms"] = per_request(lambda: index.item(link))
+    queue.put(result)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100000,1000000")
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("fork")
+    results = []
+    for size in [int(size) for size in args.sizes.split(",")]:
+        path = os.path.join(os.environ["NEWS_CACHE_DIR"], f"articles-{size}.db")
+        store = ArticleStore(path)
+        fill_store(store, size)
+        store.close()
+
+        for layout in ("dataframe", "table"):
+            queue = context.Queue()
+            child = context.Process(target=measure_layout, args=(path, layout, queue))
+            child.start()
+            results.append(queue.get())
+            child.join()
+
+    report("Snapshot memory and latency by layout", results, args.json)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Time each fetch_data stage offline by replaying recorded fixtures at scaled sizes
+
+Usage: python -m benchmarks.bench_pipeline [--entries 10,100,1000] [--latency-ms 0] [--json results.json]
+
+Every feed and The Batch page is served by ReplayTransport with `entries` entries
+each. "cold" runs start with an empty feed cache, "warm" runs get 304s for every source
+and "not due" runs are skipped by the polling scheduler. "changed" runs re-download and
+re-parse every feed but find the entries in the per-entry memo, as when a feed only
+gained a few new entries; "uncached" stages clear the memo first.
+"""
+import argparse
+import os
+import tempfile
+
+# Keep the benchmark's feed state away from the real cache
+os.environ["NEWS_CACHE_DIR"] = tempfile.mkdtemp(prefix="news-bench-")
+
+import feedparser
+import pandas as pd
+
+import fetch_data
+from benchmarks.common import measure, report
+from benchmarks.replay import ReplayTransport, scaled_bodies, sources
+from fetch_data import clean_html, extract_and_clean_data, extract_date, fetch_feed, fetch_single_feed, fetch_source
+from fetcher import fetcher
+
+def raw_frame(rss_df, batch_df):
+    return pd.concat([batch_df, rss_df], ignore_index=True)
+
+def run_stages(entries, latency, repeat):
+    bodies = scaled_bodies(entries)
+    fetcher.close()
+    fetcher.transport = ReplayTransport(bodies, latency)
+    feeds = [(source.url, source.name) for source in sources("rss")]
+    page = sources("html")[0]
+
+    def cold(fn):
+        def run():
+            fetch_data.reset_cache()
+            return fn()
+        return run
+
+    def due(fn):
+        # Keep the cached validators but make every source due, so polls get 304s
+        def run():
+            fetch_data.scheduler.reset()
+            return fn()
+        return run
+
+    def changed(fn):
+        # Forget the validators so every feed is downloaded and parsed, but keep the entry memo
+        def run():
+            fetch_data.feed_cache.clear()
+            fetch_data.scheduler.reset()
+            return fn()
+        return run
+
+    def uncached(fn):
+        def run():
+            fetch_data.entry_cache.clear()
+            return fn()
+        return run
+
+    def scrape_page():
+        return fetch_source(page)
+
+    def all_feeds():
+        for feed in feeds:
+            fetch_single_feed(feed)
+
+    # Inputs for the CPU-only stages, taken from the replayed responses
+    fetch_data.reset_cache()
+    rss_df = fetch_feed(dict(feeds))
+    batch_df = scrape_page()
+    raw = raw_frame(rss_df, batch_df)
+    published = raw["Published"].tolist()
+    descriptions = [entry.get("description", "") for url, _ in feeds
+                    for entry in feedparser.parse(bodies[url]).entries]
+
+    stages = [
+        ("fetch_single_feed (cold)", len(rss_df), cold(all_feeds)),
+        ("fetch_single_feed (changed, memo)", len(rss_df), changed(all_feeds)),
+        ("fetch_single_feed (warm, 304)", len(rss_df), due(all_feeds)),
+        ("fetch_single_feed (not due)", len(rss_df), all_feeds),
+        ("fetch_source html (cold)", len(batch_df), cold(scrape_page)),
+        ("fetch_source html (warm, 304)", len(batch_df), due(scrape_page)),
+        ("extract_date", len(published), lambda: [extract_date(value) for value in published]),
+        ("clean_html", len(descriptions), lambda: [clean_html(html) for html in descriptions]),
+        ("extract_and_clean_data (uncached)", len(raw), uncached(lambda: extract_and_clean_data(raw.copy()))),
+        ("extract_and_clean_data (memo)", len(raw), lambda: extract_and_clean_data(raw.copy())),
+        ("main (cold)", len(raw), cold(fetch_data.main)),
+        ("main (warm, 304)", len(raw), due(fetch_data.main)),
+        ("main (not due)", len(raw), fetch_data.main),
+    ]
+
+    results = []
+    for name, rows, fn in stages:
+        fetch_data.reset_cache()
+        fn()  # Warm-up, and primes the cache for the warm stages
+        seconds = measure(fn, repeat)
+        results.append({"stage": name, "entries_per_source": entries, "rows": rows,
+                        "seconds": seconds, "rows_per_second": rows / seconds if seconds else None})
+
+    kept = len(fetch_data.main())
+    results.append({"stage": "main output rows", "entries_per_source": entries, "rows": kept})
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", default="10,100,1000", help="comma-separated entries per source")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated latency per request")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for entries in [int(value) for value in args.entries.split(",")]:
+        results.extend(run_stages(entries, args.latency_ms / 1000, args.repeat))
+    fetcher.close()
+
+    report("fetch_data pipeline (replayed fixtures)", results, args.json)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Build time, incremental update cost and query latency percentiles of SearchIndex
+
+Usage: python -m benchmarks.bench_search [--size 1000000] [--queries 500] [--json results.json]
+
+The p99 target for /api/search is 50 ms on a 1M-article corpus.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from benchmarks.common import report
+from search_index import SearchIndex
+
+P99_TARGET_MS = 50
+
+def make_vocabulary(size, rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = {"".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(size)}
+    # Domain words first so they are the most frequent, as in real feeds
+    return ["waymo", "robotaxi", "tesla", "cruise", "driverless", "austin", "phoenix", "lidar"] + sorted(words)
+
+def synthetic_corpus(size, seed=0):
+    """(link, title, description) triples with Zipf-distributed words"""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(50_000, rng)
+    weights = 1 / np.arange(1, len(vocabulary) + 1)
+    np_rng = np.random.default_rng(seed)
+    picks = np_rng.choice(len(vocabulary), size=(size, 48), p=weights / weights.sum())
+    for i in range(size):
+        words = [vocabulary[j] for j in picks[i]]
+        yield f"https://example.com/{i}", " ".join(words[:8]), " ".join(words[8:])
+
+def percentile(values, q):
+    return float(np.percentile(values, q) * 1000)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    index = SearchIndex()
+    start = time.perf_counter()
+    for link, title, description in synthetic_corpus(args.size):
+        index.add(link, title, description)
+    build = time.perf_counter() - start
+    results = [{"case": "build", "articles": args.size, "seconds": build, "articles_per_second": args.size / build}]
+
+    # A refresh typically brings a few hundred new or changed articles
+    batch = list(synthetic_corpus(500, seed=1))
+    start = time.perf_counter()
+    for link, title, description in batch:
+        index.add(link + "?new", title, description)
+    results.append({"case": "incremental add of 500", "articles": args.size, "ms": (time.perf_counter() - start) * 1000})
+
+    rng = random.Random(2)
+    vocabulary = sorted(index._term_ids)
+    common = ["waymo", "robotaxi", "tesla"]
+    query_mix = {
+        "rare term": lambda: rng.choice(vocabulary),
+        "common term": lambda: rng.choice(common),
+        "two terms": lambda: f"{rng.choice(common)} {rng.choice(vocabulary)}",
+        "phrase": lambda: f'"{rng.choice(common)} {rng.choice(common)}"',
+        "prefix": lambda: rng.choice(vocabulary)[:3] + "*",
+    }
+    all_latencies = []
+    for name, make_query in query_mix.items():
+        latencies = []
+        for _ in range(args.queries):
+            query = make_query()
+            start = time.perf_counter()
+            index.search(query, 20)
+            latencies.append(time.perf_counter() - start)
+        all_latencies.extend(latencies)
+        results.append({"case": name, "articles": args.size, "p50_ms": percentile(latencies, 50),
+                        "p99_ms": percentile(latencies, 99)})
+
+    p99 = percentile(all_latencies, 99)
+    results.append({"case": "all queries", "articles": args.size, "p50_ms": percentile(all_latencies, 50),
+                    "p99_ms": p99, "p99_target_ms": P99_TARGET_MS, "meets_target": p99 <= P99_TARGET_MS})
+    report("Search index", results, args.json)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Memory of several web workers serving one snapshot: per-worker copies versus a shared Arrow file
+
+Usage: python -m benchmarks.bench_shared [--articles 200000] [--workers 4] [--json results.json]
+
+Synthetic articles are written to a temporary ArticleStore and published once
+as an Arrow snapshot file and a search index file. For each mode, --workers
+fresh processes start at the same time, load the snapshot, build the NewsIndex
+over it and get a search index:
+
+- "private": every worker loads its own ArticleTable from SQLite and indexes it
+  for search, as each uvicorn worker did before snapshots were shared
+- "shared": every worker memory-maps the published snapshot and search index
+  files (NEWS_SHARED_SNAPSHOT=1)
+
+Memory is read from /proc/self/smaps_rollup while all workers are alive.
+"pss" divides shared pages between the processes mapping them, so the sum
+over workers is what the group really uses; "private" is what each worker
+would free on exit. "load" is seconds from start to a served snapshot with
+its search index, "page" the best seconds to render the first /api/news page
+and "search" the best seconds to rank a two-term query.
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+# Keep the benchmark's store and caches away from the real ones
+os.environ["NEWS_CACHE_DIR"] = tempfile.mkdtemp(prefix="news-bench-")
+
+from article_store import ArticleStore
+from benchmarks.common import measure, report
+
+def memory_kb():
+    """Rss, Pss and private kB of this process, from smaps_rollup"""
+    values = {}
+    with open("/proc/self/smaps_rollup", "r", encoding="utf-8") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if rest.strip().endswith("kB"):
+                values[key] = int(rest.split()[0])
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "private": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+    }
+
+def worker(mode, db_path, snapshot_path, search_path, barrier, results):
+    start = time.perf_counter()
+    from article_table import ArticleTable
+    from main_page import build_index
+    from search_index import MappedSearchIndex, SearchIndex
+
+    if mode == "shared":
+        table, _ = ArticleTable.read_arrow(snapshot_path)
+        search = MappedSearchIndex(search_path)
+    else:
+        store = ArticleStore(db_path)
+        table = store.load_table()
+        store.close()
+        search = SearchIndex()
+        search.update(table)
+    index = build_index(table)
+    load = time.perf_counter() - start
+    # Time requests while every worker is up in both modes, so they compete for the CPU alike
+    barrier.wait()
+    page = measure(lambda: index.query(limit=24), repeat=20)
+    query = measure(lambda: search.search("waymo robotaxi", 20), repeat=20)
+    # Measure memory only once every worker holds its snapshot, so shared pages are split between them
+    barrier.wait()
+    results.put(dict(memory_kb(), load=load, page=page, search=query))
+    barrier.wait()
+
+def run_workers(mode, count, db_path, snapshot_path, search_path):
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(count)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(mode, db_path, snapshot_path, search_path, barrier, results))
+                 for _ in range(count)]
+    for process in processes:
+        process.start()
+    rows = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=200000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    from benchmarks.bench_memory import fill_store
+    from main_page import build_index  # noqa: F401 - warms the import cache for the workers
+    from search_index import SearchIndex
+
+    directory = tempfile.mkdtemp(prefix="news-bench-shared-")
+    db_path = os.path.join(directory, "articles.db")
+    snapshot_path = os.path.join(directory, "snapshot-1.arrow")
+    search_path = os.path.join(directory, "search-1.idx")
+    store = ArticleStore(db_path)
+    fill_store(store, args.articles)
+    table = store.load_table()
+    store.close()
+    start = time.perf_counter()
+    table.write_arrow(snapshot_path, {"version": 1, "built_at": time.time()})
+    publish = time.perf_counter() - start
+    search = SearchIndex()
+    search.update(table)
+    start = time.perf_counter()
+    search.write(search_path, {"version": 1})
+    publish_search = time.perf_counter() - start
+    del table, search
+
+    results = [
+        {"mode": "publish", "articles": args.articles, "seconds": publish,
+         "file_mb": os.path.getsize(snapshot_path) / 2**20},
+        {"mode": "publish search", "articles": args.articles, "seconds": publish_search,
+         "file_mb": os.path.getsize(search_path) / 2**20},
+    ]
+    for mode in ("private", "shared"):
+        rows = run_workers(mode, args.workers, db_path, snapshot_path, search_path)
+        results.append({
+            "mode": mode,
+            "workers": args.workers,
+            "total_pss_mb": sum(row["pss"] for row in rows) / 1024,
+            "worker_private_mb": max(row["private"] for row in rows) / 1024,
+            "worker_rss_mb": max(row["rss"] for row in rows) / 1024,
+            "load_s": max(row["load"] for row in rows),
+            "page_s": min(row["page"] for row in rows),
+            "search_s": min(row["search"] for row in rows),
+        })
+
+    report("Snapshot memory across web workers", results, args.json)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Crawl a generated registry of hundreds of sources against local stand-in servers
+
+Usage: python -m benchmarks.bench_sources [--sources 500] [--hosts 25] [--entries 10]
+                                          [--latency-ms 50] [--host-limit 4] [--budget 30] [--json results.json]
+
+Each host is a local HTTP server on its own port serving replayed fixtures
+(RSS, plus The Batch page for every tenth source) with ETags and a simulated
+latency. The run reports the cold crawl (everything parsed), the warm crawl
+(every source answers 304) and the highest number of requests any host saw
+at once, and fails if the cold crawl exceeds the budget or a host cap was broken.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Keep the benchmark's feed state away from the real cache
+os.environ["NEWS_CACHE_DIR"] = tempfile.mkdtemp(prefix="news-bench-")
+
+import fetch_data
+from benchmarks.common import report
+from benchmarks.replay import scaled_bodies, sources
+from fetcher import fetcher
+from sources import Source, SourceRegistry
+
+class StandInServer:
+    """One host: serves fixed bodies by path with ETags, counting concurrent requests"""
+
+    def __init__(self, bodies, latency):
+        self.bodies = bodies
+        self.etags = {path: f'"{hashlib.sha256(body).hexdigest()[:16]}"' for path, body in bodies.items()}
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    time.sleep(server.latency)
+                    body = server.bodies.get(self.path)
+                    if body is None:
+                        self.send_response(404)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    etag = server.etags[self.path]
+                    if self.headers.get("If-None-Match") == etag:
+                        self.send_response(304)
+                        self.send_header("ETag", etag)
+                        self.end_headers()
+                        return
+                    self.send_response(200)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def build(count, hosts, entries, latency, host_limit):
+    """Start the stand-in servers and return them with a registry of `count` sources spread over them"""
+    bodies = scaled_bodies(entries)
+    feeds = [bodies[source.url] for source in sources("rss")]
+    page = sources("html")[0]
+
+    paths = [{} for _ in range(hosts)]
+    specs = []
+    for i in range(count):
+        host = i % hosts
+        if i % 10 == 9:
+            path = f"/pages/{i}/"
+            paths[host][path] = bodies[page.url]
+            specs.append((host, path, dict(kind="html", selectors=page.selectors, date_format=page.date_format)))
+        else:
+            path = f"/feeds/{i}.xml"
+            paths[host][path] = feeds[i % len(feeds)]
+            specs.append((host, path, {}))
+
+    servers = [StandInServer(bodies, latency) for bodies in paths]
+    registry = SourceRegistry(
+        [Source(f"source-{i}", f"http://127.0.0.1:{servers[host].port}{path}", **options)
+         for i, (host, path, options) in enumerate(specs)],
+        {f"127.0.0.1:{server.port}": host_limit for server in servers},
+    )
+    return servers, registry
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sources", type=int, default=500)
+    parser.add_argument("--hosts", type=int, default=25)
+    parser.add_argument("--entries", type=int, default=10, help="entries per source")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="simulated server latency per request")
+    parser.add_argument("--host-limit", type=int, default=4, help="concurrent requests allowed per host")
+    parser.add_argument("--budget", type=float, default=30.0, help="seconds allowed for the cold crawl")
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    servers, registry = build(args.sources, args.hosts, args.entries, args.latency_ms / 1000, args.host_limit)
+    fetcher.close()
+    fetcher.transport = None
+    fetch_data.configure(registry)
+
+    results = []
+    try:
+        for stage in ("cold", "warm, 304"):
+            if stage == "cold":
+                fetch_data.reset_cache()
+            else:
+                fetch_data.scheduler.reset()
+            requests = sum(server.requests for server in servers)
+            start = time.perf_counter()
+            df = fetch_data.main(registry)
+            seconds = time.perf_counter() - start
+            results.append({
+                "stage": f"main ({stage})", "sources": len(registry), "hosts": len(servers),
+                "requests": sum(server.requests for server in servers) - requests, "rows": len(df),
+                "seconds": seconds, "sources_per_second": len(registry) / seconds,
+                "budget": args.budget, "within_budget": seconds <= args.budget,
+            })
+    finally:
+        fetcher.close()
+        for server in servers:
+            server.close()
+
+    busiest = max(server.max_in_flight for server in servers)
+    results.append({"stage": "max concurrent requests per host", "observed": busiest, "limit": args.host_limit})
+    report(f"{args.sources}-source crawl (local stand-in servers)", results, args.json)
+
+    if not results[0]["within_budget"] or busiest > args.host_limit:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Cold start of a web worker: import time and time to the first responses
+
+Usage: python -m benchmarks.bench_startup [--articles 20000] [--runs 3] [--json results.json]
+
+A temporary store is filled with synthetic articles and the source registry is
+empty, so nothing is crawled and no network is used. Each run is a fresh
+interpreter:
+
+- "import": seconds to import main_page, and which heavy modules it loaded
+- "server": a uvicorn worker started from scratch; seconds until GET / answers
+  and until /api/news returns articles. "warm start" serves the stored articles
+  with the story clusters saved by a previous run, "first boot" has no saved
+  clusters yet and "no warm start" (NEWS_WARM_START=0) waits for the first crawl.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+# Keep the benchmark's store and caches away from the real ones
+os.environ["NEWS_CACHE_DIR"] = tempfile.mkdtemp(prefix="news-bench-")
+
+from benchmarks.bench_memory import fill_store
+from benchmarks.common import report
+from article_store import ArticleStore
+
+HEAVY_MODULES = ("pandas", "pyarrow", "PIL", "bs4", "feedparser", "httpx", "fetch_data")
+
+IMPORT_SCRIPT = f"""
+import sys, time
+start = time.perf_counter()
+import main_page
+print(time.perf_counter() - start)
+print(",".join(name for name in {HEAVY_MODULES!r} if name in sys.modules))
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def worker_env(cache_dir, **extra):
+    env = dict(os.environ, NEWS_CACHE_DIR=cache_dir, NEWS_SOURCES_PATH=os.path.join(cache_dir, "sources.json"),
+               NEWS_REFRESH_INTERVAL="3600", NEWS_THUMBNAIL_PREFETCH="0", PYTHONDONTWRITEBYTECODE="1")
+    env.update(extra)
+    return env
+
+def time_import(env):
+    out = subprocess.check_output([sys.executable, "-c", IMPORT_SCRIPT], cwd=ROOT, env=env, text=True)
+    seconds, modules = out.splitlines()[-2:]
+    return float(seconds), modules or "-"
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def get(url):
+    """Response body of a GET, or None if the server is not answering yet"""
+    try:
+        with urllib.request.urlopen(url, timeout=60) as res:
+            return res.read()
+    except OSError:
+        return None
+
+def time_server(env, timeout=300):
+    """Seconds from launching a worker until / answers and until /api/news has articles"""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main_page:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        first_response = first_articles = None
+        while time.perf_counter() - start < timeout:
+            if first_response is None:
+                if get(base + "/") is not None:
+                    first_response = time.perf_counter() - start
+            else:
+                body = get(base + "/api/news?limit=24")
+                if body is not None and json.loads(body):
+                    first_articles = time.perf_counter() - start
+                    break
+            time.sleep(0.01)
+        return first_response, first_articles
+    finally:
+        server.terminate()
+        server.wait()
+
+def summary(values):
+    values = [value for value in values if value is not None]
+    return (min(values), statistics.median(values)) if values else (None, None)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix="news-bench-startup-")
+    with open(os.path.join(cache_dir, "sources.json"), "w", encoding="utf-8") as f:
+        json.dump({"sources": []}, f)
+    store = ArticleStore(os.path.join(cache_dir, "articles.db"))
+    fill_store(store, args.articles)
+    store.close()
+    clusters_path = os.path.join(cache_dir, "clusters.npz")
+
+    results = []
+    timings = [time_import(worker_env(cache_dir)) for _ in range(args.runs)]
+    fastest, median = summary([seconds for seconds, _ in timings])
+    results.append({"stage": "import main_page", "min_s": fastest, "median_s": median,
+                    "heavy_modules": timings[-1][1]})
+
+    modes = (
+        ("first boot", {}, True),
+        ("warm start", {}, False),
+        ("no warm start", {"NEWS_WARM_START": "0"}, False),
+    )
+    for name, extra, fresh in modes:
+        runs = []
+        for _ in range(1 if fresh else args.runs):
+            if fresh and os.path.exists(clusters_path):
+                os.remove(clusters_path)
+            runs.append(time_server(worker_env(cache_dir, **extra)))
+        first_response, _ = summary([run[0] for run in runs])
+        first_articles, _ = summary([run[1] for run in runs])
+        results.append({"stage": f"server ({name})", "articles": args.articles,
+                        "first_response_s": first_response, "first_articles_s": first_articles})
+
+    report("Web worker cold start", results, args.json)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Per-source and per-day counts: counting the /api/news list versus ArticleStats
+
+Usage: python -m benchmarks.bench_stats [--sizes 100000,1000000] [--json results.json]
+
+For each history size a synthetic ArticleTable spread over three years is built:
+
+- "count /api/news items": what clients did, render every article and count them
+- "rebuild": ArticleStats built from the whole snapshot (startup, warm start)
+- "refresh +100": the counters moved on by a refresh adding 100 articles
+- "summary": reading the counts /api/stats returns
+"""
+import argparse
+import random
+from collections import Counter
+
+from article_stats import ArticleStats
+from article_table import ArticleTable
+from benchmarks.bench_filter import SOURCES
+from benchmarks.common import measure, report
+from main_page import build_index
+
+START_NS = 1640995200 * 10**9  # 2022-01-01
+SPAN_NS = 3 * 365 * 86400 * 10**9
+
+class Snapshot:
+    def __init__(self, articles, version):
+        self.articles = articles
+        self.version = version
+
+class Sized:
+    """Stands in for the previous snapshot's table, of which only the length is read"""
+
+    def __init__(self, length):
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+def synthetic_table(size, seed=0):
+    rng = random.Random(seed)
+    rows = [
+        (f"Article {i}", f"https://example.com/articles/{i}", "", rng.choice(SOURCES), None,
+         START_NS + rng.randrange(SPAN_NS), 1.0)
+        for i in range(size)
+    ]
+    rows.sort(key=lambda row: (row[5], row[1]))
+    return ArticleTable(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100000,1000000")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for size in [int(value) for value in args.sizes.split(",")]:
+        table = synthetic_table(size + 100)
+        index = build_index(table)
+        # The refresh adds the last 100 articles of the table to a history of `size`
+        previous, current = Snapshot(Sized(size), 1), Snapshot(table, 2)
+        added = list(range(size, size + 100))
+        stats = ArticleStats()
+
+        def count_items():
+            items, _, _ = index.query()
+            return Counter((item["Source"], item["date"]) for item in items)
+
+        def rebuild():
+            stats.version = None
+            stats.sync(current)
+
+        def refresh():
+            stats.version = previous.version
+            stats.update(previous, current, added)
+
+        cases = [
+            ("count /api/news items", count_items),
+            ("rebuild", rebuild),
+            ("refresh +100", refresh),
+            ("summary", stats.summary),
+        ]
+        for name, fn in cases:
+            results.append({"case": name, "articles": size, "seconds": measure(fn, args.repeat)})
+
+    report("Per-source and per-day article counts", results, args.json)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import json
+import platform
+import subprocess
+import time
+
+def measure(fn, repeat=3):
+    """Run fn repeat times and return the best wall-clock time in seconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+def report(name, results, output=None):
+    """Print benchmark results and optionally write them as JSON for comparison between commits"""
+    print(f"\n{name}")
+    for row in results:
+        print("  " + "  ".join(f"{key}={value:.6g}" if isinstance(value, float) else f"{key}={value}"
+                               for key, value in row.items()))
+
+    if output:
+        payload = {
+            "benchmark": name,
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "timestamp": time.time(),
+            "results": results,
+        }
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        print(f"Results written to {output}")
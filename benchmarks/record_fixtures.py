@@ -0,0 +1,25 @@
+"""Re-record the fixtures replayed by the pipeline benchmark from the live sources
+
+Usage: python -m benchmarks.record_fixtures
+"""
+import os
+
+from benchmarks.replay import FIXTURE_DIR, FIXTURES
+from fetcher import fetcher
+
+def main():
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for url, name in FIXTURES.items():
+        try:
+            res = fetcher.run(fetcher.get(url))
+            res.raise_for_status()
+        except Exception as e:
+            print(f"Error recording {url}: {e}")
+            continue
+        with open(os.path.join(FIXTURE_DIR, name), "wb") as f:
+            f.write(res.content)
+        print(f"Recorded {url} -> {name} ({len(res.content)} bytes)")
+    fetcher.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Replay recorded feed fixtures through an httpx transport, scaled to any number of entries"""
+import asyncio
+import hashlib
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+
+from fetch_data import registry
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Recorded response body for every URL the pipeline fetches
+FIXTURES = {
+    "https://www.deeplearning.ai/the-batch/": "the_batch.html",
+    "https://thelastdriverlicenseholder.com/feed/": "thelastdriverlicenseholder.xml",
+    "https://techcrunch.com/tag/waymo/feed/": "techcrunch_waymo.xml",
+    "https://www.wired.com/feed/tag/waymo/latest/rss": "wired_waymo.xml",
+    "https://feeds.arstechnica.com/arstechnica/cars": "arstechnica_cars.xml",
+}
+
+ITEM = re.compile(r"<item>.*?</item>\s*", re.DOTALL)
+ARTICLE = re.compile(r"<article\b.*?</article>\s*", re.DOTALL)
+ITEM_LINK = re.compile(r"<link>(.*?)</link>")
+ITEM_DATE = re.compile(r"<pubDate>.*?</pubDate>")
+ARTICLE_LINK = re.compile(r'href="(/the-batch/[^"]*)"')
+ARTICLE_DATE = re.compile(r'(<div class="text-slate-500[^"]*">)[^<]*(</div>)')
+
+# Scaled entries are spread over this window so extract_and_clean_data keeps them
+DATE_WINDOW = timedelta(days=29)
+
+def load_fixture(url):
+    with open(os.path.join(FIXTURE_DIR, FIXTURES[url]), "r", encoding="utf-8") as f:
+        return f.read()
+
+def _scale(body, block, entries, rewrite):
+    """Repeat the recorded entry blocks until there are `entries` of them"""
+    blocks = block.findall(body)
+    if not blocks or entries <= 0:
+        return body
+    start = block.search(body).start()
+    head, tail = body[:start], block.sub("", body[start:])
+    step = DATE_WINDOW / entries
+    now = datetime.now(timezone.utc)
+    scaled = [rewrite(blocks[i % len(blocks)], i // len(blocks), now - step * i) for i in range(entries)]
+    return head + "".join(scaled) + tail
+
+def _rewrite_item(item, copy, published):
+    if copy:
+        item = ITEM_LINK.sub(lambda m: f"<link>{m.group(1)}?copy={copy}</link>", item, count=1)
+    return ITEM_DATE.sub(f"<pubDate>{format_datetime(published)}</pubDate>", item, count=1)
+
+def _rewrite_article(article, copy, published):
+    if copy:
+        article = ARTICLE_LINK.sub(lambda m: f'href="{m.group(1)}?copy={copy}"', article, count=1)
+    return ARTICLE_DATE.sub(lambda m: m.group(1) + published.strftime("%b %d, %Y") + m.group(2), article, count=1)
+
+def _is_html(url):
+    return FIXTURES[url].endswith(".html")
+
+def scaled_bodies(entries):
+    """Response bodies for every fixture URL with `entries` recent entries each"""
+    bodies = {}
+    for url in FIXTURES:
+        if _is_html(url):
+            body = _scale(load_fixture(url), ARTICLE, entries, _rewrite_article)
+        else:
+            body = _scale(load_fixture(url), ITEM, entries, _rewrite_item)
+        bodies[url] = body.encode("utf-8")
+    return bodies
+
+def listing_pages(source, pages, entries, first_page=2):
+    """Bodies of a scraped source's older listing pages, `entries` distinct older articles each"""
+    bodies = {}
+    for page in range(first_page, first_page + pages):
+        def rewrite(article, copy, published, page=page):
+            # Each page continues back in time from the previous one, with links of its own
+            return _rewrite_article(article, copy + 1000 * page, published - DATE_WINDOW * (page - 1))
+        bodies[source.page_url.format(page=page)] = _scale(load_fixture(source.url), ARTICLE, entries, rewrite).encode("utf-8")
+    return bodies
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serve fixed bodies by URL with ETags and 304s, optionally after a simulated latency"""
+
+    def __init__(self, bodies, latency=0.0):
+        self.bodies = bodies
+        self.latency = latency
+        self.etags = {url: f'"{hashlib.sha256(body).hexdigest()[:16]}"' for url, body in bodies.items()}
+        self.requests = 0
+
+    async def handle_async_request(self, request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        url = str(request.url)
+        body = self.bodies.get(url)
+        if body is None:
+            return httpx.Response(404, request=request)
+
+        etag = self.etags[url]
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers={"ETag": etag}, request=request)
+
+        is_feed = b"<rss" in body[:1024] or b"<feed" in body[:1024]
+        content_type = "application/rss+xml; charset=utf-8" if is_feed else "text/html; charset=utf-8"
+        return httpx.Response(200, headers={"ETag": etag, "Content-Type": content_type}, content=body, request=request)
+
+def sources(kind="rss"):
+    """Registry sources of the given kind that have a fixture"""
+    return [source for source in registry if source.kind == kind and source.url in FIXTURES]
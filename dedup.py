@@ -0,0 +1,200 @@
+import hashlib
+import logging
+import os
+import threading
+import zlib
+
+import numpy as np
+
+from feed_cache import CACHE_DIR
+from search_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Signatures and cluster links saved after each refresh, so a restart need not re-sign the history
+CLUSTERS_PATH = os.path.join(CACHE_DIR, "clusters.npz")
+
+# Words per shingle
+SHINGLE_SIZE = 2
+
+# MinHash signature length, split into LSH bands of BAND_ROWS values each;
+# 20 bands of 3 make pairs above ~0.5 similarity candidates with >90% probability
+NUM_HASHES = 60
+BAND_ROWS = 3
+
+# Estimated Jaccard similarity above which two articles are the same story
+SIMILARITY_THRESHOLD = 0.5
+
+# Words too common to say anything about which story an article covers
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+_MASK = np.uint64(0xFFFFFFFF)
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Stable 32-bit hashes of the word n-grams in a text"""
+    tokens = [token for token in tokenize(text) if token not in STOPWORDS]
+    if len(tokens) < size:
+        return {zlib.crc32(" ".join(tokens).encode("utf-8"))} if tokens else set()
+    return {zlib.crc32(" ".join(tokens[i:i + size]).encode("utf-8")) for i in range(len(tokens) - size + 1)}
+
+class StoryClusterer:
+    """Group near-duplicate articles into stories with MinHash and LSH buckets
+
+    Each article is signed once when it is added and only compared with the
+    articles sharing one of its LSH buckets, so adding n articles costs
+    roughly O(n) instead of comparing every pair.
+    """
+
+    def __init__(self, num_hashes=NUM_HASHES, band_rows=BAND_ROWS, threshold=SIMILARITY_THRESHOLD, seed=1):
+        self._params = (num_hashes, band_rows, seed)
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: odd 32-bit multipliers keep products within 64 bits
+        self._a = rng.integers(1, 2**32, size=num_hashes, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**32, size=num_hashes, dtype=np.uint64)
+        self.band_rows = band_rows
+        self.bands = num_hashes // band_rows
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._ids = {}
+        self._links = []
+        self._signatures = []
+        self._parents = []
+        self._buckets = {}
+        self._saved = 0
+
+    def __len__(self):
+        return len(self._links)
+
+    def signature(self, text):
+        """MinHash signature of a text's shingles, or None if it has no words"""
+        values = shingles(text)
+        if not values:
+            return None
+        x = np.fromiter(values, dtype=np.uint64, count=len(values))
+        hashes = (np.outer(self._a, x) + self._b[:, None]) & _MASK
+        return hashes.min(axis=1).astype(np.uint32)
+
+    def _find(self, node):
+        parents = self._parents
+        while parents[node] != node:
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+        return node
+
+    def _union(self, a, b):
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a != root_b:
+            # The earliest article stays the root so cluster ids are stable
+            if root_b < root_a:
+                root_a, root_b = root_b, root_a
+            self._parents[root_b] = root_a
+
+    def add(self, link, text):
+        """Add an article (no-op if already known) and return its cluster id"""
+        with self._lock:
+            node = self._ids.get(link)
+            if node is not None:
+                return self._cluster_id(node)
+
+            signature = self.signature(text)
+            node = len(self._links)
+            self._ids[link] = node
+            self._links.append(link)
+            self._signatures.append(signature)
+            self._parents.append(node)
+            if signature is None:
+                return self._cluster_id(node)
+
+            for other in self._bucket(node, signature):
+                if self._find(other) == self._find(node):
+                    continue
+                similarity = float(np.mean(self._signatures[other] == signature))
+                if similarity >= self.threshold:
+                    self._union(node, other)
+
+            return self._cluster_id(node)
+
+    def _bucket(self, node, signature):
+        """Add a node to its LSH buckets and return the nodes already in them"""
+        candidates = set()
+        for band in range(self.bands):
+            key = (band, signature[band * self.band_rows:(band + 1) * self.band_rows].tobytes())
+            bucket = self._buckets.setdefault(key, [])
+            candidates.update(bucket)
+            bucket.append(node)
+        return candidates
+
+    def update(self, df):
+        """Add every row of an article frame; returns the number of new articles"""
+        before = len(self)
+        for link, title, description in zip(df['Link'], df['Title'], df['Description']):
+            self.add(link, f"{title} {description}")
+        return len(self) - before
+
+    def _cluster_id(self, node):
+        root = self._links[self._find(node)]
+        return hashlib.blake2b(root.encode("utf-8"), digest_size=6).hexdigest()
+
+    def cluster_id(self, link):
+        """Cluster id for a known link, or None"""
+        with self._lock:
+            node = self._ids.get(link)
+            return self._cluster_id(node) if node is not None else None
+
+    def save(self, path=CLUSTERS_PATH):
+        """Write signatures and cluster links to disk if articles were added since the last save"""
+        with self._lock:
+            if len(self._links) == self._saved:
+                return
+            count = len(self._links)
+            signed = np.array([signature is not None for signature in self._signatures], dtype=bool)
+            signatures = np.zeros((count, len(self._a)), dtype=np.uint32)
+            if signed.any():
+                signatures[signed] = np.stack([signature for signature in self._signatures if signature is not None])
+            parents = np.array([self._find(node) for node in range(count)], dtype=np.int64)
+            links = "\n".join(self._links).encode("utf-8")
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, params=np.array(self._params), links=np.frombuffer(links, dtype=np.uint8),
+                         signatures=signatures, signed=signed, parents=parents)
+            os.replace(tmp_path, path)
+            self._saved = count
+        except Exception as e:
+            logger.warning("Error saving story clusters: %s", e)
+
+    def load(self, path=CLUSTERS_PATH):
+        """Restore a saved state into an empty clusterer; returns the number of articles loaded"""
+        try:
+            with np.load(path) as data:
+                if tuple(data["params"].tolist()) != self._params:
+                    return 0
+                links = data["links"].tobytes().decode("utf-8").split("\n") if len(data["links"]) else []
+                signatures, signed, parents = data["signatures"], data["signed"], data["parents"]
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            logger.warning("Error loading story clusters: %s", e)
+            return 0
+
+        with self._lock:
+            if self._links or len(links) != len(parents):
+                return 0
+            self._links = links
+            self._ids = {link: node for node, link in enumerate(links)}
+            self._parents = parents.tolist()
+            self._signatures = [signatures[node] if signed[node] else None for node in range(len(links))]
+            for node, signature in enumerate(self._signatures):
+                if signature is not None:
+                    self._bucket(node, signature)
+            self._saved = len(links)
+        return len(links)
+
+def assign_clusters(df, clusterer):
+    """Return a copy of df with a cluster_id column from the clusterer"""
+    df = df.copy()
+    df['cluster_id'] = [clusterer.cluster_id(link) for link in df['Link']]
+    return df
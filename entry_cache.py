@@ -0,0 +1,91 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from metrics import entry_cache_lookups
+
+# Processed results kept across refreshes; the least recently used are evicted first
+ENTRY_CACHE_SIZE = int(os.environ.get("NEWS_ENTRY_CACHE_SIZE", "50000"))
+
+_MISSING = object()
+
+def content_hash(content):
+    """Short stable hash of raw entry bytes or of a field (other values are hashed by their str)"""
+    data = content if isinstance(content, bytes) else str(content).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=8).digest()
+
+class EntryCache:
+    """Bounded per-entry memo of processing results keyed by (stage, link, content hash)
+
+    Feeds that changed still mostly repeat the entries of their last poll, so
+    a refresh only pays for parsing the entries that are new or whose content
+    changed. Hits and misses are counted per stage.
+    """
+
+    def __init__(self, max_entries=ENTRY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+        self._counters = {}
+        self._evictions = 0
+
+    def __len__(self):
+        return len(self._results)
+
+    def _count(self, stage, hits, misses):
+        counters = self._counters.setdefault(stage, {"hits": 0, "misses": 0})
+        counters["hits"] += hits
+        counters["misses"] += misses
+        if hits:
+            entry_cache_lookups.inc(hits, stage=stage, result="hit")
+        if misses:
+            entry_cache_lookups.inc(misses, stage=stage, result="miss")
+
+    def _store(self, items):
+        with self._lock:
+            for key, value in items:
+                self._results[key] = value
+                self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+                self._evictions += 1
+
+    def memo_many(self, stage, links, contents, compute):
+        """Results for many entries, reusing those computed by an earlier refresh
+
+        compute(list of contents) runs once over just the misses and returns
+        their results in order.
+        """
+        keys = [(stage, link, content_hash(content)) for link, content in zip(links, contents)]
+        results = []
+        missing = []
+        with self._lock:
+            for position, key in enumerate(keys):
+                value = self._results.get(key, _MISSING)
+                if value is _MISSING:
+                    missing.append(position)
+                else:
+                    self._results.move_to_end(key)
+                results.append(value)
+            self._count(stage, len(keys) - len(missing), len(missing))
+        if missing:
+            computed = compute([contents[position] for position in missing])
+            for position, value in zip(missing, computed):
+                results[position] = value
+            self._store([(keys[position], results[position]) for position in missing])
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+    def stats(self):
+        """Size, evictions and per-stage hit/miss counters"""
+        with self._lock:
+            stages = {}
+            for stage, counters in self._counters.items():
+                lookups = counters["hits"] + counters["misses"]
+                stages[stage] = dict(counters, hit_rate=round(counters["hits"] / lookups, 4) if lookups else None)
+            return {"entries": len(self._results), "max_entries": self.max_entries,
+                    "evictions": self._evictions, "stages": stages}
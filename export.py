@@ -0,0 +1,165 @@
+"""Stream the stored article history as JSONL, CSV or Parquet
+
+Usage: python export.py [--format csv] [--output ai_news.csv] [--start-date 2024-01-01]
+                        [--end-date 2024-06-30] [--source "Wired: Waymo" ...]
+
+Articles are read from the ArticleStore a chunk at a time, newest first, and
+each chunk is written out before the next is read, so memory use does not grow
+with the size of the history. /api/export serves the same streams.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from datetime import timedelta
+
+from article_store import COLUMNS, ArticleStore
+
+# Rows read from SQLite and written out at a time; also the Parquet row group size
+CHUNK_SIZE = int(os.environ.get("NEWS_EXPORT_CHUNK_SIZE", "20000"))
+
+# format: (media type, file extension)
+FORMATS = {
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+def date_range(start_date=None, end_date=None):
+    """Inclusive (start, end) bounds with the same meaning as /api/news filters
+
+    A bare end date includes that whole day. Raises ValueError for dates that
+    cannot be parsed.
+    """
+    import pandas as pd
+    try:
+        start = pd.to_datetime(start_date) if start_date else None
+        end = pd.to_datetime(end_date) if end_date else None
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid date: {e}")
+    if end is not None and end == end.normalize():
+        end = end + timedelta(days=1) - pd.Timedelta(1, "ns")
+    return start, end
+
+def jsonl_chunks(chunks):
+    for rows in chunks:
+        yield "".join(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False) + "\n" for row in rows).encode("utf-8")
+
+def csv_chunks(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+class _Sink:
+    """Write-only file object whose contents are taken out after each row group"""
+
+    def __init__(self):
+        self.closed = False
+        self._parts = []
+        self._position = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+def parquet_chunks(chunks):
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(name, pa.string()) for name in COLUMNS[:-1]] + [("date", pa.timestamp("ns"))])
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            timestamps = pd.to_datetime(pd.Series(columns[-1]), format="ISO8601").astype("int64").to_numpy()
+            arrays = [pa.array(values, type=pa.string()) for values in columns[:-1]]
+            arrays.append(pa.array(timestamps, type=pa.timestamp("ns")))
+            # One row group per chunk, handed on as soon as it is encoded
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+WRITERS = {"jsonl": jsonl_chunks, "csv": csv_chunks, "parquet": parquet_chunks}
+
+def stream(store, fmt, start_date=None, end_date=None, sources=None, chunk_size=CHUNK_SIZE):
+    """Bytes of an export of the stored articles, one chunk of rows at a time
+
+    Dates are validated before anything is read; raises ValueError for an
+    unknown format or invalid dates.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown format: {fmt}")
+    start, end = date_range(start_date, end_date)
+    return WRITERS[fmt](store.iter_chunks(start, end, sources, chunk_size))
+
+def export_file(store, path, fmt=None, start_date=None, end_date=None, sources=None):
+    """Write an export to a file (format taken from the extension if not given); returns bytes written"""
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    chunks = stream(store, fmt, start_date, end_date, sources)
+    written = 0
+    out = sys.stdout.buffer if path == "-" else open(path, "wb")
+    try:
+        for data in chunks:
+            out.write(data)
+            written += len(data)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    return written
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=sorted(FORMATS), help="default: from the output extension, else jsonl")
+    parser.add_argument("--output", help="file to write, or - for stdout (default: ai_news.<format>)")
+    parser.add_argument("--start-date")
+    parser.add_argument("--end-date")
+    parser.add_argument("--source", action="append", dest="sources", help="repeat for several sources")
+    parser.add_argument("--db", default=None, help="SQLite article store (default: NEWS_DB_PATH)")
+    args = parser.parse_args(argv)
+
+    fmt = args.format
+    if fmt is None and args.output and args.output != "-":
+        fmt = os.path.splitext(args.output)[1].lstrip(".").lower()
+    fmt = fmt if fmt in FORMATS else "jsonl"
+    output = args.output or f"ai_news.{FORMATS[fmt][1]}"
+
+    store = ArticleStore(args.db) if args.db else ArticleStore()
+    try:
+        written = export_file(store, output, fmt, args.start_date, args.end_date, args.sources)
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        store.close()
+    if output != "-":
+        print(f"Exported {written / 2**20:.1f} MB to {output}")
+
+if __name__ == "__main__":
+    main()
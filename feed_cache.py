@@ -0,0 +1,107 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Directory for on-disk caches shared by the fetch pipeline
+CACHE_DIR = os.environ.get("NEWS_CACHE_DIR", ".cache")
+FEED_STATE_PATH = os.path.join(CACHE_DIR, "feed_state.json")
+
+# Bumped whenever the shape of cached entries changes, so stale entries are discarded
+FORMAT_VERSION = 2
+
+def body_hash(content):
+    """Hash a response body so unchanged feeds can be detected without validators"""
+    return hashlib.sha256(content).hexdigest()
+
+class FeedCache:
+    """Per-feed HTTP validators, body hashes and last parsed entries"""
+
+    def __init__(self, path=FEED_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._feeds = {}
+        self._counters = {}
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        """Load persisted feed state, ignoring a missing or corrupt file"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._feeds = data.get("feeds", {}) if data.get("format") == FORMAT_VERSION else {}
+        except FileNotFoundError:
+            self._feeds = {}
+        except Exception as e:
+            logger.warning("Error loading feed state: %s", e)
+            self._feeds = {}
+
+    def save(self):
+        """Write feed state to disk atomically if anything changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps({"format": FORMAT_VERSION, "feeds": self._feeds})
+            self._dirty = False
+
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning("Error saving feed state: %s", e)
+
+    def clear(self):
+        """Forget all feed state in memory, so the next poll of every feed is a full fetch"""
+        with self._lock:
+            self._feeds = {}
+            self._dirty = True
+
+    def request_headers(self, link):
+        """Conditional GET headers for a feed based on its stored validators"""
+        state = self._feeds.get(link, {})
+        headers = {}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("modified"):
+            headers["If-Modified-Since"] = state["modified"]
+        return headers
+
+    def cached_entries(self, link):
+        """Entries parsed on the last successful poll, or None"""
+        return self._feeds.get(link, {}).get("entries")
+
+    def is_unchanged(self, link, digest):
+        state = self._feeds.get(link)
+        return state is not None and state.get("hash") == digest and state.get("entries") is not None
+
+    def digest(self, link):
+        return self._feeds.get(link, {}).get("hash")
+
+    def update(self, link, etag, modified, digest, entries):
+        """Store validators and parsed entries after a changed response"""
+        with self._lock:
+            self._feeds[link] = {
+                "etag": etag,
+                "modified": modified,
+                "hash": digest,
+                "entries": entries,
+            }
+            self._dirty = True
+
+    def record(self, link, hit):
+        """Count a poll that was (hit) or was not (miss) served from the cache"""
+        with self._lock:
+            counters = self._counters.setdefault(link, {"hits": 0, "misses": 0})
+            counters["hits" if hit else "misses"] += 1
+
+    def stats(self):
+        """Per-feed hit/miss counters"""
+        with self._lock:
+            return {link: dict(counters) for link, counters in self._counters.items()}
@@ -1,20 +1,53 @@
 import feedparser
 import pandas as pd
 from datetime import datetime, timedelta
-import ssl
 from bs4 import BeautifulSoup
 import warnings
-import concurrent.futures
+import asyncio
+import functools
+import logging
+import os
 import re
-import requests
+from urllib.parse import urljoin
+from entry_cache import EntryCache
+from feed_cache import FeedCache, body_hash
+from fetcher import fetcher
+from scheduler import SourceScheduler
+from sources import load_sources
+from html_text import DESCRIPTION_LIMIT, process_description
+from metrics import (
+    feed_bytes, feed_entries, feed_fetch_seconds, feed_parse_errors, feed_polls, source_breaker_open, stage_seconds,
+)
+
+logger = logging.getLogger(__name__)
 
 warnings.filterwarnings("ignore")
 
-URL = "https://www.deeplearning.ai/the-batch/"
+# Feeds and scraped pages to crawl, from sources.json
+registry = load_sources()
 
-# Configure SSL once at the module level
-if hasattr(ssl, '_create_unverified_context'):
-    ssl._create_default_https_context = ssl._create_unverified_context
+# Validators and last parsed entries per feed, persisted between runs
+feed_cache = FeedCache()
+
+# When each source is next polled, with backoff and circuit breakers
+scheduler = SourceScheduler()
+
+# Parsed descriptions and dates of entries seen before, so changed feeds only process their new entries
+entry_cache = EntryCache()
+
+def configure(sources):
+    """Apply a registry's per-host concurrency caps and fixed polling intervals"""
+    fetcher.host_limits.update(sources.host_limits)
+    for source in sources:
+        scheduler.configure(source.url, source.poll_interval)
+
+configure(registry)
+
+# Seconds between listing pages fetched by a backfill, to keep its request rate bounded
+BACKFILL_DELAY = float(os.environ.get("NEWS_BACKFILL_DELAY", "1"))
+
+# Last cleaned result, reused while no source has changed
+_last_result = {"key": None, "df": None}
 
 def extract_date(date_str):
     """Extract date from various formats using regex patterns"""
@@ -52,35 +85,118 @@ def extract_date(date_str):
         # If all else fails, return NaT
         return pd.NaT
 
+# Date formats recognised in bulk by normalize_dates
+RFC_DATE = (r'^\s*(?:[A-Za-z]{3},?\s+)?(?P<day>\d{1,2})\s+(?P<month>[A-Za-z]{3})[A-Za-z]*\.?\s+(?P<year>\d{4})'
+            r'(?:\s+(?P<time>\d{1,2}:\d{2}(?::\d{2})?))?(?:\s*(?P<tz>[+-]\d{4}|[A-Za-z]{1,5}))?\s*$')
+ISO_DATE = r'^\s*\d{4}-\d{2}-\d{2}'
+ISO_OFFSET = r'\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?\s*(?:[Zz]|[+-]\d{2}(?::?\d{2})?)\s*$'
+MDY_DATE = r'^\s*(?P<month>[A-Za-z]{3})[A-Za-z]*\.?\s+(?P<day>\d{1,2}),\s+(?P<year>\d{4})\s*$'
+
+# UTC offsets for the zone names RSS feeds use instead of numeric offsets
+TZ_OFFSETS = {
+    "GMT": "+0000", "UTC": "+0000", "UT": "+0000", "Z": "+0000",
+    "EST": "-0500", "EDT": "-0400", "CST": "-0600", "CDT": "-0500",
+    "MST": "-0700", "MDT": "-0600", "PST": "-0800", "PDT": "-0700",
+    "CET": "+0100", "CEST": "+0200", "BST": "+0100",
+}
+
+def _as_utc(value):
+    """Convert a parsed timestamp to naive UTC, treating naive values as UTC"""
+    if pd.isna(value):
+        return pd.NaT
+    value = pd.Timestamp(value)
+    if value.tzinfo is not None:
+        value = value.tz_convert("UTC").tz_localize(None)
+    return value
+
+def normalize_dates(published):
+    """Parse a Series of date strings in bulk and return UTC timestamps (naive)
+
+    Rows are classified by format with vectorized string matching and each
+    group is converted with a single pd.to_datetime call. Times and UTC
+    offsets are honoured, so entries published late in the day in other
+    time zones land on the right UTC instant. Unrecognised strings fall
+    back to extract_date; anything unparseable becomes NaT.
+    """
+    published = published.fillna("").astype(str)
+    result = pd.Series(pd.NaT, index=published.index, dtype="datetime64[ns, UTC]")
+    remaining = pd.Series(True, index=published.index)
+
+    # RFC 822 style: "Mon, 14 Apr 2025 10:00:00 GMT", "14 Apr 2025"
+    rfc = published.str.extract(RFC_DATE)
+    mask = rfc["day"].notna()
+    if mask.any():
+        rfc = rfc[mask]
+        time = rfc["time"].fillna("00:00:00").str.replace(r'^(\d{1,2}:\d{2})$', r'\1:00', regex=True)
+        tz = rfc["tz"].fillna("+0000").str.upper()
+        tz = tz.where(tz.str.match(r'^[+-]\d{4}$'), tz.map(TZ_OFFSETS).fillna("+0000"))
+        text = rfc["day"] + " " + rfc["month"].str.title() + " " + rfc["year"] + " " + time + " " + tz
+        result[mask] = pd.to_datetime(text, format="%d %b %Y %H:%M:%S %z", utc=True, errors="coerce")
+        remaining &= ~mask
+
+    # ISO 8601: "2025-04-14", "2025-04-14T10:00:00+02:00"
+    mask = remaining & published.str.match(ISO_DATE)
+    if mask.any():
+        # Parsed in one call, naive values would take the offset of the rows before them
+        offset = mask & published.str.contains(ISO_OFFSET)
+        for group in (offset, mask & ~offset):
+            if group.any():
+                result[group] = pd.to_datetime(published[group].str.strip(), format="ISO8601", utc=True,
+                                               errors="coerce")
+        remaining &= ~mask
+
+    # Month first: "Mar 12, 2025"
+    mdy = published[remaining].str.extract(MDY_DATE)
+    mdy = mdy[mdy["day"].notna()]
+    if not mdy.empty:
+        text = mdy["month"].str.title() + " " + mdy["day"] + " " + mdy["year"]
+        result[mdy.index] = pd.to_datetime(text, format="%b %d %Y", utc=True, errors="coerce")
+        remaining[mdy.index] = False
+
+    # Anything else goes through the per-row parser
+    if remaining.any():
+        fallback = published[remaining].map(lambda x: _as_utc(extract_date(x)))
+        result[remaining] = pd.to_datetime(fallback, errors="coerce").dt.tz_localize("UTC")
+
+    return result.dt.tz_localize(None)
+
 def clean_html(text):
     """Clean HTML tags from text"""
     try:
         soup = BeautifulSoup(text, "html.parser")
         return soup.get_text()
     except Exception as e:
-        print(f"Error cleaning HTML: {e}")
+        logger.warning("Error cleaning HTML: %s", e)
         return text
 
+def extract_media_url(entry):
+    """Extract an image URL from the entry's media or enclosure elements"""
+    # Check for media:content
+    if hasattr(entry, 'media_content') and entry.media_content:
+        for media in entry.media_content:
+            if isinstance(media, dict) and 'url' in media:
+                return media['url']
+    
+    # Check for media:thumbnail
+    if hasattr(entry, 'media_thumbnail') and entry.media_thumbnail:
+        for media in entry.media_thumbnail:
+            if isinstance(media, dict) and 'url' in media:
+                return media['url']
+    
+    # Check for enclosures
+    if hasattr(entry, 'enclosures') and entry.enclosures:
+        for enclosure in entry.enclosures:
+            if isinstance(enclosure, dict) and 'url' in enclosure and enclosure.get('type', '').startswith('image/'):
+                return enclosure['url']
+    
+    return None
+
 def extract_image_url(entry, description):
     """Extract image URL from RSS entry if available"""
     try:
-        # Check for media:content
-        if hasattr(entry, 'media_content') and entry.media_content:
-            for media in entry.media_content:
-                if isinstance(media, dict) and 'url' in media:
-                    return media['url']
-        
-        # Check for media:thumbnail
-        if hasattr(entry, 'media_thumbnail') and entry.media_thumbnail:
-            for media in entry.media_thumbnail:
-                if isinstance(media, dict) and 'url' in media:
-                    return media['url']
-        
-        # Check for enclosures
-        if hasattr(entry, 'enclosures') and entry.enclosures:
-            for enclosure in entry.enclosures:
-                if isinstance(enclosure, dict) and 'url' in enclosure and enclosure.get('type', '').startswith('image/'):
-                    return enclosure['url']
+        media_url = extract_media_url(entry)
+        if media_url:
+            return media_url
         
         # Try to extract from description using BeautifulSoup
         if description:
@@ -104,387 +220,345 @@ def extract_image_url(entry, description):
         # No image found
         return None
     except Exception as e:
-        print(f"Error extracting image URL: {e}")
+        logger.warning("Error extracting image URL: %s", e)
         return None
 
-def fetch_single_feed(link_source_tuple):
-    """Fetch a single RSS feed and return its entries"""
-    link, source = link_source_tuple
-    entries = {"Title": [], "Link": [], "Published": [], "Description": [], "Source": [], "Image": []}
-    
-    try:
-        feed = feedparser.parse(link)
-        
-        for entry in feed.entries:
-            title = entry.get("title", "No Title")
-            link = entry.get("link", "No Link")
-            published = entry.get("published", "No Date")
-            description = entry.get("description", "No Description")
-            
-            # Extract image URL
-            image_url = extract_image_url(entry, description)
-            
-            entries["Title"].append(title)
-            entries["Link"].append(link)
-            entries["Published"].append(published)
-            entries["Description"].append(description)
-            entries["Source"].append(source)
-            entries["Image"].append(image_url)  # Add image URL
-            
-    except Exception as e:
-        print(f"Error fetching {link}: {e}")
-    
-    return entries
+async def conditional_get(link):
+    """GET a URL with stored validators; returns (response, digest) or (None, None) if unchanged"""
+    res = await fetcher.get(link, headers=feed_cache.request_headers(link))
 
-def fetch_feed(links):
-    """Fetch multiple RSS feeds in parallel"""
-    all_entries = {"Title": [], "Link": [], "Published": [], "Description": [], "Source": [], "Image": []}
-    
-    # Use ThreadPoolExecutor to fetch feeds in parallel
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_link = {executor.submit(fetch_single_feed, (link, source)): (link, source) 
-                         for link, source in links.items()}
-        
-        for future in concurrent.futures.as_completed(future_to_link):
-            link, source = future_to_link[future]
-            try:
-                result = future.result()
-                # Merge results into all_entries
-                for key in all_entries:
-                    all_entries[key].extend(result[key])
-            except Exception as e:
-                print(f"Exception for {link}: {e}")
-    
-    # Create a DataFrame from all entries
-    df = pd.DataFrame(all_entries)
-    return df
-
-def scrape_the_batch_articles():
-    all_entries = {"Title": [], "Link": [], "Published": [], "Description": [], "Source": [], "Image": []}
-    
-    try:
-        res = requests.get(URL)
-        soup = BeautifulSoup(res.text, "html.parser")
+    if res.status_code == 304 and feed_cache.cached_entries(link) is not None:
+        return None, None
+    res.raise_for_status()
 
-        articles = soup.find_all("article")
+    # Servers without ETag/Last-Modified are detected by hashing the body
+    digest = body_hash(res.content)
+    if feed_cache.is_unchanged(link, digest):
+        return None, None
 
-        for article in articles:
-            # Link
-            link_tag = article.find("a", href=True)
-            link = "https://www.deeplearning.ai" + link_tag["href"] if link_tag else "#"
+    return res, digest
 
-            # Title
-            title_tag = article.find("h2")
-            title = title_tag.get_text(strip=True) if title_tag else "No title"
+# One <item> (RSS) or <entry> (Atom) element of a feed body
+FEED_ITEM = re.compile(rb"<(item|entry)[\s>].*?</\1\s*>", re.S)
 
-            # Summary
-            summary_tag = article.find("div", class_="text-sm")
-            summary = summary_tag.get_text(strip=True) if summary_tag else ""
+def split_feed_items(content):
+    """(head, items, tail) byte strings of a feed body, or None if no items are found"""
+    matches = list(FEED_ITEM.finditer(content))
+    if not matches:
+        return None
+    return content[:matches[0].start()], [match.group(0) for match in matches], content[matches[-1].end():]
 
-            # Date (based on div with specific class)
-            date_tag = article.find("div", class_="text-slate-500")
-            date_str = date_tag.get_text(strip=True) if date_tag else ""
-            
-            # Image
-            img_tag = article.find("img")
-            image_url = img_tag["src"] if img_tag and img_tag.has_attr("src") else None
-
-            try:
-                parsed_date = datetime.strptime(date_str, "%b %d, %Y")
-            except Exception as e:
-                parsed_date = None
-
-            if parsed_date:
-                all_entries["Title"].append(title)
-                all_entries["Description"].append(summary)
-                all_entries["Link"].append(link)
-                all_entries["Published"].append(date_str)
-                all_entries["Source"].append("deeplearning.ai")
-                all_entries["Image"].append(image_url)
-        
-        return pd.DataFrame(all_entries)
-    except Exception as e:
-        print(f"Error scraping The Batch: {e}")
-        return pd.DataFrame()
+def entry_row(entry, source):
+    """(title, link, published, plain text, image) of a parsed feed entry"""
+    title = entry.get("title", "No Title")
+    entry_link = entry.get("link", "No Link")
+    published = entry.get("published", "No Date")
+    description = entry.get("description", "No Description")
 
-def extract_and_clean_data(df):
-    """Process and clean the feed data"""
-    if df.empty:
-        return df
-        
+    # One pass over the description yields the plain text and any embedded image
     try:
-        # Apply the custom date extraction function
-        df['date'] = df['Published'].apply(extract_date)
-        
-        # Drop rows with invalid dates
-        df = df.dropna(subset=['date'])
-        
-        # Drop the original 'Published' column
-        df.drop(columns=['Published'], inplace=True)
-        
-        # Filter for the last 30 days (increased from 7 for more content)
-        today = datetime.now()
-        thirty_days_ago = today - timedelta(days=30)
-        df_filtered = df[(df['date'] >= thirty_days_ago) & (df['date'] <= today)]
-        
-        # Sort by date in descending order
-        df_filtered = df_filtered.sort_values(by='date', ascending=False)
-        
-        # Clean HTML and limit description length in one step
-        df_filtered['Description'] = df_filtered['Description'].apply(
-            lambda x: clean_html(x)[:500].replace("\n", "")
-        )
-        
-        return df_filtered
-        
+        text, description_image = process_description(description)
+        image_url = extract_media_url(entry) or description_image
     except Exception as e:
-        print(f"An error occurred while processing the data: {e}")
-        return pd.DataFrame()
+        logger.warning("Error processing entry %s: %s", entry_link, e)
+        feed_parse_errors.inc(source=source)
+        text = clean_html(description)[:500].replace("\n", "")
+        image_url = extract_image_url(entry, description)
+    return title, entry_link, published, text, image_url
+
+def parse_feed_rows(content, source):
+    feed = feedparser.parse(content)
+    if feed.bozo:
+        feed_parse_errors.inc(source=source)
+    return [entry_row(entry, source) for entry in feed.entries]
+
+def parse_new_items(head, items, tail, source):
+    """Rows for items not seen before, parsed as one feed wrapped in the original head and tail"""
+    rows = parse_feed_rows(head + b"".join(items) + tail, source)
+    if len(rows) == len(items):
+        return rows
+    # Some item did not parse into exactly one entry; parse them one by one to keep rows aligned
+    return [next(iter(parse_feed_rows(head + item + tail, source)), None) for item in items]
+
+def parse_feed_entries(content, source, link=None):
+    """Parse an RSS/Atom body into entry columns
+
+    With the feed's link, each raw item is memoized by its content hash, so
+    only items that are new or changed since the last poll are parsed.
+    """
+    parts = split_feed_items(content) if link is not None and isinstance(content, bytes) else None
+    if parts is None:
+        rows = parse_feed_rows(content, source)
+    else:
+        head, items, tail = parts
+        rows = entry_cache.memo_many("feed_item", [link] * len(items), items,
+                                     lambda new: parse_new_items(head, new, tail, source))
+
+    entries = empty_entries()
+    for row in rows:
+        if row is None:
+            continue
+        title, entry_link, published, text, image_url = row
+        entries["Title"].append(title)
+        entries["Link"].append(entry_link)
+        entries["Published"].append(published)
+        entries["Description"].append(text)
+        entries["Source"].append(source)
+        entries["Image"].append(image_url)  # Add image URL
 
-def main():
-    # RSS links
-    links = {
-        "https://thelastdriverlicenseholder.com/feed/": "The Last Driver License Holder",
-        "https://techcrunch.com/tag/waymo/feed/": "Tech Crunch Waymo",
-        "https://www.wired.com/feed/tag/waymo/latest/rss": "Wired: Waymo",
-        "https://feeds.arstechnica.com/arstechnica/cars": "Cars Arstechnica"
-    }
-
-    # Fetch data from The Batch
-    batch_df = scrape_the_batch_articles()
-    
-    # Fetch data from RSS feeds
-    rss_df = fetch_feed(links)
-    
-    # Combine both dataframes
-    combined_df = pd.concat([batch_df, rss_df], ignore_index=True)
-    
-    # Process and clean data
-    final_df = extract_and_clean_data(combined_df)
-    
-    return final_df
-
-if __name__ == "__main__":
-    df = main()
-    print(df.head())
+    return entries
 
-import feedparser
-import pandas as pd
-from datetime import datetime, timedelta
-import ssl
-from bs4 import BeautifulSoup
-import warnings
-import concurrent.futures
-import re
-import requests
+def empty_entries():
+    return {"Title": [], "Link": [], "Published": [], "Description": [], "Source": [], "Image": []}
 
-warnings.filterwarnings("ignore")
+def entry_cadence(published):
+    """Median seconds between a source's articles, from their publication dates, or None"""
+    dates = normalize_dates(pd.Series(published, dtype=object)).dropna().drop_duplicates().sort_values()
+    if len(dates) < 2:
+        return None
+    return dates.diff().dropna().median().total_seconds() or None
 
-URL = "https://www.deeplearning.ai/the-batch/"
+async def poll_source(link, source, poll):
+    """Poll a source if the scheduler says it is due, within its deadline
 
-# Configure SSL once at the module level
-if hasattr(ssl, '_create_unverified_context'):
-    ssl._create_default_https_context = ssl._create_unverified_context
+    poll(link, source) returns (entries, changed). A source that is not due,
+    fails or misses its deadline is served from its last good entries, so it
+    never holds up or empties the rest of the crawl.
+    """
+    cached = feed_cache.cached_entries(link)
+    if cached is not None and not scheduler.due(link):
+        feed_polls.inc(source=source, result="skipped")
+        return cached
 
-def extract_date(date_str):
-    """Extract date from various formats using regex patterns"""
     try:
-        # Try different patterns to match various date formats
-        
-        # Pattern 1: Standard RFC format like "Mon, 14 Apr 2025 10:00:00 GMT"
-        pattern1 = r'(?:\w+,\s+)?(\d{1,2}\s+\w{3}\s+\d{4})'
-        match = re.search(pattern1, date_str)
-        if match:
-            date_str = match.group(1)
-            return pd.to_datetime(date_str, format='%d %b %Y')
-        
-        # Pattern 2: Simple format like "14 Apr 2025"
-        pattern2 = r'(\d{1,2}\s+\w{3}\s+\d{4})'
-        match = re.search(pattern2, date_str)
-        if match:
-            return pd.to_datetime(match.group(1), format='%d %b %Y')
-        
-        # Pattern 3: ISO format like "2025-04-14"
-        pattern3 = r'(\d{4}-\d{2}-\d{2})'
-        match = re.search(pattern3, date_str)
-        if match:
-            return pd.to_datetime(match.group(1))
-        
-        # Pattern 4: Format like "Mar 12, 2025"
-        pattern4 = r'(\w{3}\s+\d{1,2},\s+\d{4})'
-        match = re.search(pattern4, date_str)
-        if match:
-            return pd.to_datetime(match.group(1), format='%b %d, %Y')
-        
-        # If none of the patterns match, return original parsed date
-        return pd.to_datetime(date_str)
-    except:
-        # If all else fails, return NaT
-        return pd.NaT
-
-def clean_html(text):
-    """Clean HTML tags from text"""
-    try:
-        soup = BeautifulSoup(text, "html.parser")
-        return soup.get_text()
-    except Exception as e:
-        print(f"Error cleaning HTML: {e}")
-        return text
-
-def extract_image_url(entry, description):
-    """Extract image URL from RSS entry if available"""
-    try:
-        # Check for media:content
-        if hasattr(entry, 'media_content') and entry.media_content:
-            for media in entry.media_content:
-                if isinstance(media, dict) and 'url' in media:
-                    return media['url']
-        
-        # Check for media:thumbnail
-        if hasattr(entry, 'media_thumbnail') and entry.media_thumbnail:
-            for media in entry.media_thumbnail:
-                if isinstance(media, dict) and 'url' in media:
-                    return media['url']
-        
-        # Check for enclosures
-        if hasattr(entry, 'enclosures') and entry.enclosures:
-            for enclosure in entry.enclosures:
-                if isinstance(enclosure, dict) and 'url' in enclosure and enclosure.get('type', '').startswith('image/'):
-                    return enclosure['url']
-        
-        # Try to extract from description using BeautifulSoup
-        if description:
-            soup = BeautifulSoup(description, "html.parser")
-            
-            # First, check meta tags for twitter:image
-            meta_img = soup.find('meta', attrs={'name': 'twitter:image'})
-            if meta_img and meta_img.has_attr('content'):
-                return meta_img['content']
-            
-            # Then check for regular img tags
-            img_tag = soup.find('img')
-            if img_tag and img_tag.has_attr('src'):
-                return img_tag['src']
-            
-            # Try to extract image URL from HTML
-            img_match = re.search(r'<img[^>]+src=[\'"]([^\'"]+)[\'"]', description)
-            if img_match:
-                return img_match.group(1)
-        
-        # No image found
-        return None
+        with feed_fetch_seconds.time(source=source):
+            entries, changed = await asyncio.wait_for(poll(link, source), scheduler.deadline)
+        scheduler.success(link, changed, entry_cadence(entries["Published"]) if changed else None)
+        source_breaker_open.set(0, source=source)
+        return entries
     except Exception as e:
-        print(f"Error extracting image URL: {e}")
-        return None
+        if isinstance(e, asyncio.TimeoutError):
+            e = f"no response within {scheduler.deadline:g}s"
+        logger.warning("Error fetching %s: %s", link, e)
+        feed_polls.inc(source=source, result="error")
+        scheduler.failure(link, e)
+        source_breaker_open.set(int(scheduler.breaker_state(link) == "open"), source=source)
+        # Keep the last good entries so one failing feed does not empty the snapshot
+        return cached if cached is not None else empty_entries()
+
+async def _poll_feed(link, source):
+    res, digest = await conditional_get(link)
+    if res is None:
+        # Not modified: skip parsing and reuse the entries from the last poll
+        feed_cache.record(link, hit=True)
+        feed_polls.inc(source=source, result="hit")
+        return feed_cache.cached_entries(link), False
+    feed_cache.record(link, hit=False)
+    feed_polls.inc(source=source, result="miss")
+    feed_bytes.inc(len(res.content), source=source)
+
+    # Parse off the event loop so other downloads keep progressing
+    entries = await asyncio.to_thread(parse_feed_entries, res.content, source, link)
+    feed_entries.set(len(entries["Title"]), source=source)
+    feed_cache.update(link, res.headers.get("ETag"), res.headers.get("Last-Modified"), digest, entries)
+    return entries, True
+
+async def fetch_single_feed_async(link, source):
+    """Fetch a single RSS feed through the shared pool and return its entries"""
+    return await poll_source(link, source, _poll_feed)
 
 def fetch_single_feed(link_source_tuple):
     """Fetch a single RSS feed and return its entries"""
     link, source = link_source_tuple
-    entries = {"Title": [], "Link": [], "Published": [], "Description": [], "Source": [], "Image": []}
-    
-    try:
-        feed = feedparser.parse(link)
-        
-        for entry in feed.entries:
-            title = entry.get("title", "No Title")
-            link = entry.get("link", "No Link")
-            published = entry.get("published", "No Date")
-            description = entry.get("description", "No Description")
-            
-            # Extract image URL
-            image_url = extract_image_url(entry, description)
-            
-            entries["Title"].append(title)
-            entries["Link"].append(link)
-            entries["Published"].append(published)
-            entries["Description"].append(description)
-            entries["Source"].append(source)
-            entries["Image"].append(image_url)  # Add image URL
-            
-    except Exception as e:
-        print(f"Error fetching {link}: {e}")
-    
-    return entries
+    return fetcher.run(fetch_single_feed_async(link, source))
 
-def fetch_feed(links):
-    """Fetch multiple RSS feeds in parallel"""
-    all_entries = {"Title": [], "Link": [], "Published": [], "Description": [], "Source": [], "Image": []}
+def merge_entries(links, results):
+    """Combine per-source entry columns into one DataFrame, skipping sources that raised"""
+    all_entries = empty_entries()
     
-    # Use ThreadPoolExecutor to fetch feeds in parallel
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_link = {executor.submit(fetch_single_feed, (link, source)): (link, source) 
-                         for link, source in links.items()}
-        
-        for future in concurrent.futures.as_completed(future_to_link):
-            link, source = future_to_link[future]
-            try:
-                result = future.result()
-                # Merge results into all_entries
-                for key in all_entries:
-                    all_entries[key].extend(result[key])
-            except Exception as e:
-                print(f"Exception for {link}: {e}")
+    for link, result in zip(links, results):
+        if isinstance(result, Exception):
+            logger.warning("Exception for %s: %s", link, result)
+            continue
+        # Merge results into all_entries
+        for key in all_entries:
+            all_entries[key].extend(result[key])
     
     # Create a DataFrame from all entries
-    df = pd.DataFrame(all_entries)
-    return df
-
-def scrape_the_batch_articles():
-    all_entries = {"Title": [], "Link": [], "Published": [], "Description": [], "Source": [], "Image": []}
-    
-    try:
-        res = requests.get(URL)
-        soup = BeautifulSoup(res.text, "html.parser")
-
-        articles = soup.find_all("article")
-
-        for article in articles:
-            # Link
-            link_tag = article.find("a", href=True)
-            link = "https://www.deeplearning.ai" + link_tag["href"] if link_tag else "#"
+    return pd.DataFrame(all_entries)
 
-            # Title
-            title_tag = article.find("h2")
-            title = title_tag.get_text(strip=True) if title_tag else "No title"
+async def fetch_feed_async(links):
+    """Fetch multiple RSS feeds concurrently"""
+    results = await asyncio.gather(
+        *(fetch_single_feed_async(link, source) for link, source in links.items()),
+        return_exceptions=True
+    )
+    return merge_entries(links, results)
 
-            # Summary
-            summary_tag = article.find("div", class_="text-sm")
-            summary = summary_tag.get_text(strip=True) if summary_tag else ""
-
-            # Date (based on div with specific class)
-            date_tag = article.find("div", class_="text-slate-500")
-            date_str = date_tag.get_text(strip=True) if date_tag else ""
-            
-            # Image
-            img_tag = article.find("img")
-            image_url = img_tag["src"] if img_tag and img_tag.has_attr("src") else None
-
-            try:
-                parsed_date = datetime.strptime(date_str, "%b %d, %Y")
-            except Exception as e:
-                parsed_date = None
-
-            if parsed_date:
-                all_entries["Title"].append(title)
-                all_entries["Description"].append(summary)
-                all_entries["Link"].append(link)
-                all_entries["Published"].append(date_str)
-                all_entries["Source"].append("deeplearning.ai")
-                all_entries["Image"].append(image_url)
-        
-        return pd.DataFrame(all_entries)
-    except Exception as e:
-        print(f"Error scraping The Batch: {e}")
-        return pd.DataFrame()
-
-def extract_and_clean_data(df):
-    """Process and clean the feed data"""
+def fetch_feed(links):
+    """Fetch multiple RSS feeds in parallel"""
+    return fetcher.run(fetch_feed_async(links))
+
+def _select_text(node, selector):
+    tag = node.select_one(selector) if selector else None
+    return tag.get_text(strip=True) if tag else ""
+
+@functools.lru_cache(maxsize=None)
+def _item_pattern(tag):
+    return re.compile(rf"<{re.escape(tag)}\b.*?</{re.escape(tag)}\s*>", re.S | re.I)
+
+def listing_items(html, selector):
+    """Item elements of a listing page, first to last, parsed as they are consumed
+
+    With a bare tag name selector (e.g. "article") each item's markup is cut out
+    and parsed on its own, so the rest of the page never becomes a tree and items
+    after the caller stops are never parsed. Other selectors parse the whole page.
+    """
+    if re.fullmatch(r"[A-Za-z][A-Za-z0-9]*", selector):
+        for match in _item_pattern(selector).finditer(html):
+            item = BeautifulSoup(match.group(0), "html.parser").find(selector)
+            if item is not None:
+                yield item
+        return
+    yield from BeautifulSoup(html, "html.parser").select(selector)
+
+def html_entry(item, source, base):
+    """(title, link, published, summary, image) of a listing item, or None if it has no usable date"""
+    selectors = source.selectors
+    # Link, resolved against the page URL
+    link_tag = item.select_one(selectors["link"])
+    link = urljoin(base, link_tag["href"]) if link_tag and link_tag.has_attr("href") else "#"
+
+    title = _select_text(item, selectors["title"]) or "No title"
+    summary = _select_text(item, selectors.get("summary"))
+    date_str = _select_text(item, selectors.get("date"))
+
+    # Image
+    img_tag = item.select_one(selectors["image"]) if selectors.get("image") else None
+    image_url = urljoin(base, img_tag["src"]) if img_tag and img_tag.has_attr("src") else None
+
+    # Only keep entries with a date in the expected format
+    if source.date_format:
+        try:
+            datetime.strptime(date_str, source.date_format)
+        except ValueError:
+            return None
+    elif not date_str:
+        return None
+    return title, link, date_str, summary, image_url
+
+def parse_html_entries(html, source, base=None, seen=None):
+    """Parse a listing page into entry columns using the source's CSS selectors
+
+    Listings show the newest articles first: given the links already seen,
+    parsing stops at the first of them, so only the new articles are parsed.
+    base is the URL of the page (the source URL by default).
+    """
+    all_entries = empty_entries()
+    for item in listing_items(html, source.selectors["item"]):
+        entry = html_entry(item, source, base or source.url)
+        if entry is None:
+            continue
+        title, link, date_str, summary, image_url = entry
+        if seen is not None and link in seen:
+            break
+
+        all_entries["Title"].append(title)
+        all_entries["Description"].append(summary)
+        all_entries["Link"].append(link)
+        all_entries["Published"].append(date_str)
+        all_entries["Source"].append(source.name)
+        all_entries["Image"].append(image_url)
+
+    return all_entries
+
+def prepend_entries(new, cached, limit):
+    """New entries followed by the cached ones they do not repeat, at most limit in total"""
+    links = set(new["Link"])
+    keep = [i for i, link in enumerate(cached["Link"]) if link not in links][:max(0, limit - len(new["Link"]))]
+    return {key: new[key] + [cached[key][i] for i in keep] for key in new}
+
+async def _poll_html(source, link, name):
+    res, digest = await conditional_get(link)
+    if res is None:
+        # Listing page unchanged since the last poll
+        feed_cache.record(link, hit=True)
+        feed_polls.inc(source=name, result="hit")
+        return feed_cache.cached_entries(link), False
+    feed_cache.record(link, hit=False)
+    feed_polls.inc(source=name, result="miss")
+    feed_bytes.inc(len(res.content), source=name)
+
+    # Only the articles above the newest one already known are parsed
+    cached = feed_cache.cached_entries(link)
+    seen = set(cached["Link"]) if cached and cached["Link"] else None
+    new_entries = await asyncio.to_thread(parse_html_entries, res.text, source, link, seen)
+    if seen is None:
+        all_entries = new_entries
+    else:
+        # Keep as many entries as the listing showed before
+        all_entries = prepend_entries(new_entries, cached, max(len(cached["Link"]), len(new_entries["Link"])))
+    feed_entries.set(len(all_entries["Title"]), source=name)
+    feed_cache.update(link, res.headers.get("ETag"), res.headers.get("Last-Modified"), digest, all_entries)
+    return all_entries, seen is None or bool(new_entries["Link"])
+
+async def backfill_source(source, pages, delay=BACKFILL_DELAY, first_page=2):
+    """Walk a source's older listing pages one at a time; returns (entries, pages fetched)
+
+    Pages are fetched in order, delay seconds apart, until `pages` have been
+    read or a page is missing or has no articles. Used for one-off backfills;
+    regular polls only read the first page.
+    """
+    all_entries = empty_entries()
+    fetched = 0
+    for page in range(first_page, first_page + pages):
+        url = source.page_url.format(page=page)
+        try:
+            res = await fetcher.get(url)
+            if res.status_code == 404:
+                break
+            res.raise_for_status()
+        except Exception as e:
+            logger.warning("Error fetching %s: %s", url, e)
+            break
+        fetched += 1
+        feed_bytes.inc(len(res.content), source=source.name)
+        entries = await asyncio.to_thread(parse_html_entries, res.text, source, url)
+        if not entries["Link"]:
+            break
+        for key in all_entries:
+            all_entries[key].extend(entries[key])
+        if delay:
+            await asyncio.sleep(delay)
+    return all_entries, fetched
+
+async def fetch_source_async(source):
+    """Fetch one registry source, RSS or scraped HTML, and return its entries"""
+    if source.kind == "html":
+        return await poll_source(source.url, source.name, functools.partial(_poll_html, source))
+    return await poll_source(source.url, source.name, _poll_feed)
+
+def fetch_source(source):
+    """Fetch one registry source and return its entries as a DataFrame"""
+    return pd.DataFrame(fetcher.run(fetch_source_async(source)))
+
+async def crawl(sources):
+    """Fetch all sources concurrently into one DataFrame of raw entries"""
+    results = await asyncio.gather(*(fetch_source_async(source) for source in sources), return_exceptions=True)
+    return merge_entries([source.url for source in sources], results)
+
+def extract_and_clean_data(df, max_age=timedelta(days=30)):
+    """Process and clean the feed data, keeping articles up to max_age old (None keeps all)"""
     if df.empty:
         return df
         
     try:
-        # Apply the custom date extraction function
-        df['date'] = df['Published'].apply(extract_date)
+        # Parse the dates not seen before in bulk, grouped by format
+        dates = entry_cache.memo_many(
+            "date", df['Link'].tolist(), df['Published'].tolist(),
+            lambda published: normalize_dates(pd.Series(published, dtype=object)).tolist()
+        )
+        df['date'] = pd.Series(dates, index=df.index, dtype="datetime64[ns]")
         
         # Drop rows with invalid dates
         df = df.dropna(subset=['date'])
@@ -492,49 +566,65 @@ def extract_and_clean_data(df):
         # Drop the original 'Published' column
         df.drop(columns=['Published'], inplace=True)
         
-        # Filter for the last 30 days (increased from 7 for more content)
-        today = datetime.now()
-        thirty_days_ago = today - timedelta(days=30)
-        df_filtered = df[(df['date'] >= thirty_days_ago) & (df['date'] <= today)]
+        # Filter for the last 30 days (increased from 7 for more content); dates are in UTC
+        today = pd.Timestamp.now(tz="UTC").tz_localize(None)
+        keep = df['date'] <= today
+        if max_age is not None:
+            keep &= df['date'] >= today - max_age
+        df_filtered = df[keep]
         
         # Sort by date in descending order
         df_filtered = df_filtered.sort_values(by='date', ascending=False)
         
-        # Clean HTML and limit description length in one step
-        df_filtered['Description'] = df_filtered['Description'].apply(
-            lambda x: clean_html(x)[:500].replace("\n", "")
+        # Descriptions arrive as plain text from process_description; only enforce the limit
+        df_filtered['Description'] = (
+            df_filtered['Description'].fillna("").astype(str).str[:DESCRIPTION_LIMIT].str.replace("\n", "", regex=False)
         )
         
         return df_filtered
         
     except Exception as e:
-        print(f"An error occurred while processing the data: {e}")
+        logger.exception("An error occurred while processing the data: %s", e)
         return pd.DataFrame()
 
-def main():
-    # RSS links
-    links = {
-        "https://thelastdriverlicenseholder.com/feed/": "The Last Driver License Holder",
-        "https://techcrunch.com/tag/waymo/feed/": "Tech Crunch Waymo",
-        "https://www.wired.com/feed/tag/waymo/latest/rss": "Wired: Waymo",
-        "https://feeds.arstechnica.com/arstechnica/cars": "Cars Arstechnica"
-    }
-
-    # Fetch data from The Batch
-    batch_df = scrape_the_batch_articles()
-    
-    # Fetch data from RSS feeds
-    rss_df = fetch_feed(links)
+def reset_cache():
+    """Forget feed validators, schedules, memoized entries and the last result, so the next main() fetches and cleans everything"""
+    feed_cache.clear()
+    scheduler.reset()
+    entry_cache.clear()
+    _last_result["key"] = None
+    _last_result["df"] = None
+
+def main(sources=None):
+    """Crawl every source in the registry (or the given sources) and return the cleaned articles"""
+    sources = list(registry if sources is None else sources)
+
+    # Fetch all sources at the same time
+    with stage_seconds.time(stage="crawl"):
+        combined_df = fetcher.run(crawl(sources))
+    feed_cache.save()
     
-    # Combine both dataframes
-    combined_df = pd.concat([batch_df, rss_df], ignore_index=True)
+    # Nothing changed since the last run: skip cleaning and reuse the previous result
+    key = (datetime.now().date(), tuple(feed_cache.digest(source.url) for source in sources))
+    if _last_result["key"] == key and _last_result["df"] is not None:
+        return _last_result["df"]
     
     # Process and clean data
-    final_df = extract_and_clean_data(combined_df)
+    with stage_seconds.time(stage="extract_and_clean_data"):
+        final_df = extract_and_clean_data(combined_df)
+    _last_result["key"] = key
+    _last_result["df"] = final_df
     
     return final_df
 
 if __name__ == "__main__":
+    from article_store import ArticleStore
+    import export
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     df = main()
     print(df.head())
-    df.to_excel("ai_news.xlsx")
\ No newline at end of file
+    # Store the crawl and export the whole history; see export.py for formats and filters
+    store = ArticleStore()
+    inserted, updated = store.upsert(df)
+    print(f"Stored {inserted} new and {updated} updated articles")
+    export.main(["--output", "ai_news.csv"])
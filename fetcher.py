@@ -0,0 +1,107 @@
+import asyncio
+import os
+import threading
+from urllib.parse import urlsplit
+
+# Timeouts in seconds for establishing a connection and for each read
+CONNECT_TIMEOUT = float(os.environ.get("NEWS_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("NEWS_READ_TIMEOUT", "15"))
+
+# Connection pool size and the number of concurrent requests allowed per host
+MAX_CONNECTIONS = int(os.environ.get("NEWS_MAX_CONNECTIONS", "50"))
+PER_HOST_LIMIT = int(os.environ.get("NEWS_PER_HOST_LIMIT", "4"))
+
+USER_AGENT = "Mozilla/5.0 (compatible; RobotaxiNews/1.0; +https://github.com/venturero/Robotaxi-News)"
+
+class AsyncFetcher:
+    """Keep-alive HTTP client running on a dedicated event loop thread
+
+    The client and its connection pool live for the whole process, so repeated
+    crawls reuse open connections. Synchronous callers submit coroutines with run().
+    """
+
+    def __init__(self, per_host_limit=PER_HOST_LIMIT, max_connections=MAX_CONNECTIONS, transport=None,
+                 host_limits=None):
+        self.per_host_limit = per_host_limit
+        # Concurrent request caps for specific hosts, overriding per_host_limit
+        self.host_limits = dict(host_limits or {})
+        self.max_connections = max_connections
+        # Optional httpx transport, e.g. to replay recorded responses in benchmarks
+        self.transport = transport
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is not None:
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def run_loop():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=run_loop, name="news-fetcher", daemon=True)
+            self._thread.start()
+            started.wait()
+            self._loop = loop
+            return loop
+
+    def _get_client(self):
+        if self._client is None:
+            # Imported with the first request rather than with the web app
+            import httpx
+            self._client = httpx.AsyncClient(
+                headers={"User-Agent": USER_AGENT},
+                timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                follow_redirects=True,
+                transport=self.transport,
+            )
+        return self._client
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.host_limits.get(host, self.per_host_limit))
+            self._semaphores[host] = semaphore
+        return semaphore
+
+    async def get(self, url, headers=None):
+        """GET a URL through the shared pool, respecting the per-host limit"""
+        async with self._host_limit(url):
+            return await self._get_client().get(url, headers=headers)
+
+    def submit(self, coro):
+        """Schedule a coroutine on the fetcher loop and return a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the fetcher loop from synchronous code and wait for it"""
+        return self.submit(coro).result(timeout)
+
+    def close(self):
+        """Close pooled connections and stop the loop thread"""
+        if self._loop is None:
+            return
+        if self._client is not None:
+            self.run(self._client.aclose())
+            self._client = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+        self._thread = None
+        self._semaphores = {}
+
+# Shared fetcher used by the pipeline
+fetcher = AsyncFetcher()
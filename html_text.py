@@ -0,0 +1,136 @@
+import logging
+import os
+import re
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+# Characters of plain text kept from each description
+DESCRIPTION_LIMIT = 500
+
+# Parser used by process_description: "auto" picks selectolax when installed, else "stdlib"
+HTML_BACKEND = os.environ.get("NEWS_HTML_BACKEND", "auto")
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+IMG_SRC = re.compile(r'<img[^>]+src=[\'"]([^\'"]+)[\'"]')
+
+class _StopParsing(Exception):
+    pass
+
+class _DescriptionParser(HTMLParser):
+    """Collect text, the first <img> and twitter:image meta in one streaming pass"""
+
+    def __init__(self, limit):
+        super().__init__(convert_charrefs=True)
+        self.limit = limit
+        self.chunks = []
+        self.length = 0
+        self.image = None
+        self.meta_image = None
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._skip += 1
+        elif tag == "img" and self.image is None:
+            self.image = dict(attrs).get("src")
+        elif tag == "meta" and self.meta_image is None:
+            attrs = dict(attrs)
+            if attrs.get("name") == "twitter:image" and attrs.get("content"):
+                self.meta_image = attrs["content"]
+        self._maybe_stop()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag not in ("script", "style"):
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style") and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if self._skip or self.length >= self.limit:
+            return
+        self.chunks.append(data)
+        self.length += len(data)
+        self._maybe_stop()
+
+    def _maybe_stop(self):
+        # Nothing left to find once the text is full and both image sources are known
+        if self.length >= self.limit and self.image is not None and self.meta_image is not None:
+            raise _StopParsing
+
+def _finish(text, image, meta_image, limit):
+    return text[:limit].replace("\n", ""), meta_image or image
+
+def _process_stdlib(html, limit):
+    parser = _DescriptionParser(limit)
+    try:
+        parser.feed(html)
+        parser.close()
+    except _StopParsing:
+        pass
+    return _finish("".join(parser.chunks), parser.image, parser.meta_image, limit)
+
+def _process_selectolax(html, limit):
+    tree = LexborHTMLParser(html)
+    meta = tree.css_first('meta[name="twitter:image"]')
+    img = tree.css_first("img")
+    meta_image = meta.attributes.get("content") if meta is not None else None
+    image = img.attributes.get("src") if img is not None else None
+    tree.strip_tags(["script", "style"])
+    text = tree.root.text(deep=True) if tree.root is not None else ""
+    return _finish(text, image, meta_image, limit)
+
+def _process_bs4(html, limit):
+    """The original two-parse behaviour, kept as the fallback"""
+    soup = BeautifulSoup(html, "html.parser")
+    meta = soup.find("meta", attrs={"name": "twitter:image"})
+    img = soup.find("img")
+    meta_image = meta["content"] if meta is not None and meta.has_attr("content") else None
+    image = img["src"] if img is not None and img.has_attr("src") else None
+    if image is None:
+        match = IMG_SRC.search(html)
+        image = match.group(1) if match else None
+    return _finish(soup.get_text(), image, meta_image, limit)
+
+BACKENDS = {
+    "stdlib": _process_stdlib,
+    "selectolax": _process_selectolax,
+    "bs4": _process_bs4,
+}
+
+def _pick_backend(name):
+    if name == "auto":
+        name = "selectolax" if LexborHTMLParser is not None else "stdlib"
+    if name == "selectolax" and LexborHTMLParser is None:
+        logger.warning("selectolax is not installed, using the stdlib HTML parser")
+        name = "stdlib"
+    return BACKENDS.get(name, _process_stdlib)
+
+_backend = _pick_backend(HTML_BACKEND)
+
+def process_description(html, limit=DESCRIPTION_LIMIT, backend=None):
+    """Return (plain text truncated to limit without newlines, image URL) for an HTML description
+
+    The image is the twitter:image meta content if present, else the first <img> src.
+    Falls back to the BeautifulSoup implementation if the fast parser fails.
+    """
+    if not html:
+        return "", None
+    process = _pick_backend(backend) if backend else _backend
+    try:
+        return process(html, limit)
+    except Exception as e:
+        logger.warning("Error parsing description, falling back to BeautifulSoup: %s", e)
+        try:
+            return _process_bs4(html, limit)
+        except Exception as e:
+            logger.warning("Error cleaning HTML: %s", e)
+            return html[:limit].replace("\n", ""), None
@@ -0,0 +1,135 @@
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
+
+from metrics import response_cache_lookups
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Encoded JSON bodies kept per (endpoint, snapshot version, query)
+RESPONSE_CACHE_SIZE = 256
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+ONE_YEAR = 365 * 24 * 3600
+
+class CachedStaticFiles(StaticFiles):
+    """Static files with Cache-Control; versioned URLs (?v=...) are cached forever"""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if b"v=" in scope.get("query_string", b""):
+            response.headers["Cache-Control"] = f"public, max-age={ONE_YEAR}, immutable"
+        else:
+            response.headers["Cache-Control"] = "public, max-age=3600"
+        return response
+
+def file_version(path):
+    """Short content hash used to build cache-busting static URLs"""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+class _Entry:
+    __slots__ = ("etag", "body", "encoded", "headers")
+
+    def __init__(self, etag, body, headers=None):
+        self.etag = etag
+        self.body = body
+        self.encoded = {}
+        self.headers = headers or {}
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Encoded variants carry a suffix on the same tag, e.g. "abc-gzip"
+    base = etag.strip('"')
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        if tag == base or tag.startswith(base + "-"):
+            return True
+    return False
+
+def _choose_encoding(accept_encoding):
+    accepted = {part.split(";")[0].strip().lower() for part in (accept_encoding or "").split(",")}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def _encode(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+class ResponseCache:
+    """LRU of serialized JSON responses with strong ETags and pre-compressed variants"""
+
+    def __init__(self, size=RESPONSE_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        response_cache_lookups.inc(result="hit" if entry is not None else "miss")
+        return entry
+
+    def store(self, key, payload, headers=None):
+        """Serialize a payload once; headers are replayed with every response for it"""
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        entry = _Entry(f'"{hashlib.sha256(body).hexdigest()[:32]}"', body, headers)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def respond(self, request, entry, headers=None):
+        """Build a 304 or a (compressed) 200 response for a cached entry"""
+        headers = dict(headers or {})
+        headers.update(entry.headers)
+        headers["Cache-Control"] = "no-cache"
+        headers["Vary"] = "Accept-Encoding"
+
+        encoding = _choose_encoding(request.headers.get("accept-encoding"))
+        if len(entry.body) < MIN_COMPRESS_SIZE:
+            encoding = None
+        etag = entry.etag if encoding is None else f'{entry.etag[:-1]}-{encoding}"'
+        headers["ETag"] = etag
+
+        if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=304, headers=headers)
+
+        body = entry.body
+        if encoding is not None:
+            encoded = entry.encoded.get(encoding)
+            if encoded is None:
+                encoded = entry.encoded[encoding] = _encode(body, encoding)
+            body = encoded
+            headers["Content-Encoding"] = encoding
+
+        return Response(content=body, media_type="application/json", headers=headers)
@@ -1,17 +1,35 @@
-import pandas as pd
-from datetime import datetime, timedelta
-from fetch_data import main
-from PIL import Image
+from datetime import timedelta
+from news_cache import SnapshotCache
+from news_index import NewsIndex
+from search_index import SearchIndex
+from dedup import StoryClusterer
+from article_store import ArticleStore, canonical_link
+from article_stats import ArticleStats, day_number
+from http_cache import ONE_YEAR, CachedStaticFiles, ResponseCache, file_version
+from metrics import METRICS_ENABLED, Gauge, RequestTimer, render as render_metrics, stage_seconds
+from profiler import sampling_profile
+from news_stream import ArticleBroker
+from shared_snapshot import SHARED_SNAPSHOT, SnapshotChannel
+from sources import load_sources
+from thumbnails import PREFETCH_LIMIT, THUMBNAILS_ENABLED, ThumbnailCache, image_formats, image_key
 import base64
+import json
+import logging
 import os
-from fastapi import FastAPI, HTTPException, Request
+import threading
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import (
+    FileResponse, HTMLResponse, PlainTextResponse, RedirectResponse, Response, StreamingResponse,
+)
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
 from pydantic import BaseModel
 
+# Refresh progress and request errors; quiet unless logging is configured, as when run directly
+logger = logging.getLogger(__name__)
+
 # Create FastAPI app
 app = FastAPI(title="Latest AI News API")
 
@@ -22,56 +40,283 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Snapshot-Version", "X-Snapshot-Age", "X-Next-Cursor", "X-Newest-Cursor", "ETag"],
 )
 
-# Create necessary directories
-os.makedirs("templates", exist_ok=True)
-os.makedirs("static", exist_ok=True)
-
 # Setup templates
 templates = Jinja2Templates(directory="templates")
 
-# Create a simple CSS file in static directory
-with open("static/style.css", "w") as f:
-    f.write("""
-    .news-card {
-        transition: transform 0.2s;
-    }
-    .news-card:hover {
-        transform: translateY(-5px);
-    }
-    """)
-
-# Serve static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-def get_base64_encoded_image(image_path):
-    with open(image_path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode('utf-8')
+# Serve static files with cache headers
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 
 # Placeholder image path
-PLACEHOLDER_IMAGE_PATH = "placeholder.jpeg"
+PLACEHOLDER_IMAGE_PATH = "static/placeholder.jpeg"
 
-# Convert image to base64 if file exists
+# Serve the placeholder by URL; the content hash makes it safe to cache forever
 if os.path.exists(PLACEHOLDER_IMAGE_PATH):
-    img_base64 = get_base64_encoded_image(PLACEHOLDER_IMAGE_PATH)
-    PLACEHOLDER_IMAGE = f"data:image/jpeg;base64,{img_base64}"
+    PLACEHOLDER_IMAGE = f"/static/placeholder.jpeg?v={file_version(PLACEHOLDER_IMAGE_PATH)}"
 else:
     PLACEHOLDER_IMAGE = "https://img.freepik.com/free-vector/artificial-intelligence-ai-robot-server-room-digital-technology-banner_39422-794.jpg"
 
+# Serialized, compressed JSON responses keyed by snapshot version and query
+response_cache = ResponseCache()
+
+# Persistent article history; every refresh upserts only new or changed rows
+article_store = ArticleStore()
+
+# Full-text index over titles and descriptions, updated as articles arrive
+search_index = SearchIndex()
+
+# Groups the same story reported by several sources
+story_clusterer = StoryClusterer()
+
+# Per-source and per-day article counts behind /api/stats and /api/sources
+article_stats = ArticleStats()
+
+# Resized article images served from /thumbnails instead of hotlinking full-size originals
+thumbnails = ThumbnailCache()
+
+# Image policies of the sources, read here so that serving never imports the crawl pipeline
+source_registry = load_sources()
+
+# Set NEWS_WARM_START=0 to serve nothing until the first crawl instead of the stored articles
+WARM_START = os.environ.get("NEWS_WARM_START", "1") != "0"
+
+def crawler():
+    """The crawl pipeline module, imported on first use
+
+    It pulls in pandas, feedparser and BeautifulSoup, which web workers do
+    not need to start answering requests.
+    """
+    import fetch_data
+    return fetch_data
+
+def cluster_articles(history, new=None):
+    """Add articles to the story clusters and attach their cluster ids to the history table"""
+    if not len(story_clusterer) and story_clusterer.load():
+        # Restored the clusters saved by the last run; only stored articles they lack are signed
+        new = None
+    clustered = story_clusterer.update(history if new is None or not len(story_clusterer) else new)
+    logger.info("Clustered %d new articles", clustered)
+    history.set_clusters([story_clusterer.cluster_id(link) for link in history.links])
+    return history
+
+def stored_articles(df):
+    """The crawled articles under the canonical links the store and the snapshot are keyed by"""
+    if "Link" not in df:
+        return df.reindex(columns=["Title", "Link", "Description"])
+    return df.assign(Link=df["Link"].map(canonical_link))
+
+def build_snapshot():
+    """Crawl all sources, store the delta and return the full article history as an ArticleTable"""
+    # Writes a flame graph profile when NEWS_PROFILE_INTERVAL_MS is set
+    with sampling_profile("main"):
+        df = crawler().main()
+    with stage_seconds.time(stage="store"):
+        inserted, updated = article_store.upsert(df)
+        history = article_store.load_table()
+    logger.info("Stored %d new and %d updated articles", inserted, updated)
+    crawled = stored_articles(df)
+    # Index the whole history once, then only what each crawl brings in
+    with stage_seconds.time(stage="search_index"):
+        indexed = search_index.update(history if not len(search_index) else crawled)
+    logger.info("Indexed %d articles for search", indexed)
+    with stage_seconds.time(stage="cluster"):
+        history = cluster_articles(history, crawled)
+    story_clusterer.save()
+    return history
+
+def build_index(articles):
+    """Precompute date/source lookups for a new snapshot"""
+    with stage_seconds.time(stage="news_index"):
+        return NewsIndex(articles, process_news_item, image_key if THUMBNAILS_ENABLED else None)
+
+def added_articles(previous, current):
+    """Positions of the articles a rebuild added, oldest first"""
+    if previous is None:
+        return []
+    articles = current.articles
+    return [position for position in articles.added_since(previous.built_at)
+            if previous.index is None or articles.links[position] not in previous.index]
+
+# Pushes newly discovered articles to /api/stream clients
+article_broker = ArticleBroker()
+
+def publish_new_articles(previous, current):
+    """Send the articles a rebuild added to every open stream, oldest first"""
+    if current.index is None:
+        return
+    added = [current.index.item_at(position) for position in added_articles(previous, current)]
+    if added:
+        article_broker.publish(added)
+        logger.info("Pushed %d new articles to %d streams", len(added), article_broker.clients)
+
+def article_images(articles, positions):
+    """Original image URLs at the given positions, skipping sources that show the placeholder"""
+    images = []
+    for position in positions:
+        image = articles.images[position]
+        if image.startswith(("http://", "https://")) and source_registry.image_policy(articles.sources[position]) == "source":
+            images.append(image)
+    return images
+
+def prefetch_thumbnails(previous, current):
+    """Start fetching thumbnails for the articles a rebuild added, newest first"""
+    articles = current.articles
+    if not THUMBNAILS_ENABLED or articles.empty:
+        return
+    if previous is None:
+        positions = range(len(articles) - 1, max(-1, len(articles) - 1 - PREFETCH_LIMIT), -1)
+    else:
+        positions = reversed(added_articles(previous, current))
+    started = thumbnails.prefetch(article_images(articles, positions))
+    if started:
+        logger.info("Prefetching %d thumbnails", started)
+
+def resolve_image(key):
+    """Image URL of an article in the current snapshot with this thumbnail key"""
+    snapshot = news_cache.snapshot
+    return snapshot.index.image_url(key) if snapshot is not None and snapshot.index is not None else None
+
+thumbnails.resolver = resolve_image
+
+# With NEWS_SHARED_SNAPSHOT=1, one worker process crawls and the others map its snapshots
+snapshot_channel = SnapshotChannel() if SHARED_SNAPSHOT else None
+
+# Index /api/search answers from: search_index, or in a follower the one the refresher published
+served_search = search_index
+
+def serve_search(index):
+    global served_search
+    served_search = index
+
+def follow_search(index):
+    """Search the index published by the refresher process instead of indexing the history here"""
+    if news_cache.following:
+        serve_search(index)
+
+def publish_search(version):
+    """Serve this process's search index once it has documents and share it with the followers"""
+    if not len(search_index):
+        return
+    serve_search(search_index)
+    if snapshot_channel is not None:
+        snapshot_channel.publish_search(search_index, version)
+
+def snapshot_changed(previous, current):
+    article_stats.update(previous, current, added_articles(previous, current) if previous is not None else None)
+    publish_new_articles(previous, current)
+    if news_cache.following:
+        return
+    if snapshot_channel is not None:
+        snapshot_channel.publish(current)
+    publish_search(current.version)
+    prefetch_thumbnails(previous, current)
+
+def fill_search_index(history, version):
+    search_index.update(history)
+    publish_search(version)
+
+def warm_start():
+    """Serve the stored articles until the first crawl finishes
+
+    The search index is filled in the background once the snapshot is served.
+    """
+    if not article_store.count():
+        return
+    with stage_seconds.time(stage="warm_start"):
+        history = cluster_articles(article_store.load_table())
+        snapshot = news_cache.seed(history, article_store.last_updated())
+    if snapshot_channel is not None:
+        snapshot_channel.publish(snapshot)
+    story_clusterer.save()
+    threading.Thread(target=fill_search_index, args=(history, snapshot.version), name="search-warm-start",
+                     daemon=True).start()
+
+# In-memory snapshot of the stored articles, rebuilt in the background
+news_cache = SnapshotCache(build_snapshot, prepare=build_index, on_change=snapshot_changed,
+                           warm_start=warm_start if WARM_START else None)
+
+# Read at scrape time from the current snapshot
+Gauge("news_snapshot_version", "Version of the served snapshot",
+      function=lambda: news_cache.snapshot.version if news_cache.snapshot else None)
+Gauge("news_snapshot_age_seconds", "Age of the served snapshot",
+      function=lambda: news_cache.snapshot.age if news_cache.snapshot else None)
+Gauge("news_snapshot_articles", "Articles in the served snapshot",
+      function=lambda: len(news_cache.snapshot.articles) if news_cache.snapshot else None)
+Gauge("news_stream_clients", "Open /api/stream connections", function=lambda: article_broker.clients)
+
+if METRICS_ENABLED:
+    app.add_middleware(RequestTimer)
+
+def become_refresher():
+    logger.info("Worker %d is the snapshot refresher", os.getpid())
+    news_cache.lead()
+    news_cache.start()
+
+@app.on_event("startup")
+def start_refresher():
+    if snapshot_channel is None:
+        # Loading the stored articles and crawling both happen on the refresher thread
+        news_cache.start()
+        return
+    # Serve what the refresher process publishes until this process becomes the refresher
+    news_cache.follow()
+    threading.Thread(target=snapshot_channel.run, args=(news_cache, become_refresher, follow_search),
+                     name="snapshot-follower", daemon=True).start()
+
+@app.on_event("shutdown")
+def stop_refresher():
+    news_cache.stop()
+    if snapshot_channel is not None:
+        snapshot_channel.stop()
+
+def get_snapshot():
+    """Return the current news snapshot, waiting only for the very first build"""
+    return news_cache.get()
+
 def get_data():
-    """Fetch and return the latest news data"""
-    return main()
+    """Return the latest news data from the snapshot cache as a DataFrame (an export copy)"""
+    snapshot = get_snapshot()
+    if snapshot is None:
+        import pandas as pd
+        return pd.DataFrame()
+    return snapshot.articles.to_frame()
+
+def snapshot_headers(snapshot):
+    """Expose the snapshot version and age to clients"""
+    if snapshot is None:
+        return {}
+    return {
+        "X-Snapshot-Version": str(snapshot.version),
+        "X-Snapshot-Age": str(int(snapshot.age)),
+    }
+
+async def cached_json(request, key, build, snapshot):
+    """Serve a JSON payload from the response cache, building it in a worker thread on a miss
+
+    build returns (payload, headers); the headers are cached with the payload.
+    """
+    entry = response_cache.lookup(key)
+    if entry is None:
+        payload, headers = await run_in_threadpool(build)
+        entry = response_cache.store(key, payload, headers)
+    return response_cache.respond(request, entry, snapshot_headers(snapshot))
 
 def filter_news(df, start_date=None, end_date=None, selected_sources=None):
     """Filter news data based on date range and sources"""
+    import pandas as pd
     if start_date:
         start_date = pd.to_datetime(start_date)
         df = df[df['date'] >= start_date]
     
     if end_date:
         end_date = pd.to_datetime(end_date)
-        df = df[df['date'] <= end_date]
+        # Article dates carry a time of day; a bare end date includes that whole day
+        if end_date == end_date.normalize():
+            df = df[df['date'] < end_date + timedelta(days=1)]
+        else:
+            df = df[df['date'] <= end_date]
     
     if selected_sources:
         # Convert selected_sources to list if it's a single string
@@ -82,11 +327,69 @@ def filter_news(df, start_date=None, end_date=None, selected_sources=None):
     
     return df
 
+# Fields a client may request with ?fields=
+NEWS_FIELDS = ("Title", "Description", "Link", "Source", "date", "Image", "cluster_id")
+
+# Largest page a client may request with ?limit=
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(date, link):
+    """Opaque keyset cursor for the position of an article in newest-first order"""
+    import pandas as pd
+    raw = json.dumps([pd.Timestamp(date).isoformat(), link]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """Decode a cursor into (date, link); raises ValueError if it is malformed"""
+    import pandas as pd
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        date, link = json.loads(raw)
+        return pd.Timestamp(date), str(link)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def parse_fields(fields):
+    """Turn ?fields=Title,Link into a tuple of known field names"""
+    if not fields:
+        return None
+    selected = tuple(field.strip() for field in fields.split(",") if field.strip())
+    unknown = [field for field in selected if field not in NEWS_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return selected
+
+def paginate(df, limit=None, cursor=None, since=None):
+    """Apply keyset pagination to a newest-first frame; returns (page, next_cursor)"""
+    if cursor is not None:
+        date, link = cursor
+        df = df[(df['date'] < date) | ((df['date'] == date) & (df['Link'] < link))]
+    if since is not None:
+        date, link = since
+        df = df[(df['date'] > date) | ((df['date'] == date) & (df['Link'] > link))]
+
+    next_cursor = None
+    if limit is not None and len(df) > limit:
+        df = df.iloc[:limit]
+        last = df.iloc[-1]
+        next_cursor = encode_cursor(last['date'], last['Link'])
+    return df, next_cursor
+
+def project(item, fields, collapse=False):
+    """Keep only the requested fields of an item (and cluster_size when collapsing)"""
+    projected = {field: item[field] for field in fields}
+    if collapse:
+        projected['cluster_size'] = item['cluster_size']
+    return projected
+
 def process_news_item(row):
     """Process a single news item and return formatted data"""
+    import pandas as pd
     image_url = PLACEHOLDER_IMAGE
-    if pd.notna(row.get('Image')) and row.get('Image') is not None and row['Source'] != "deeplearning.ai":
+    if pd.notna(row.get('Image')) and row.get('Image') is not None and source_registry.image_policy(row['Source']) == "source":
         image_url = row['Image']
+        if THUMBNAILS_ENABLED and image_url.startswith(("http://", "https://")):
+            image_url = thumbnails.url_for(image_url)
     
     return {
         'Title': row['Title'],
@@ -94,34 +397,95 @@ def process_news_item(row):
         'Link': row['Link'],
         'Source': row['Source'],
         'date': row['date'].strftime('%Y-%m-%d'),
-        'Image': image_url
+        'Image': image_url,
+        'cluster_id': row.get('cluster_id')
     }
 
-def get_news_data(start_date=None, end_date=None, selected_sources=None):
-    """Main function to get filtered news data"""
+def collapse_clusters(df, all_articles):
+    """Keep the newest article of each cluster in a newest-first frame; returns (df, sizes)
+
+    Cluster sizes are counted over all_articles, the whole snapshot.
+    """
+    import pandas as pd
+    if 'cluster_id' not in df:
+        return df, pd.Series(1, index=df.index)
+    sizes = df['cluster_id'].map(all_articles['cluster_id'].value_counts()).fillna(1).astype(int)
+    keep = df['cluster_id'].isna() | ~df['cluster_id'].duplicated()
+    return df[keep], sizes[keep]
+
+def get_news_page(start_date=None, end_date=None, selected_sources=None, snapshot=None,
+                  limit=None, cursor=None, since=None, fields=None, collapse=False):
+    """Get one page of filtered news; returns (items, next_cursor, newest_cursor)
+
+    With collapse, near-duplicate stories are reduced to their newest article
+    and each item gets a cluster_size.
+    """
     try:
-        df = get_data()
+        if snapshot is None:
+            snapshot = get_snapshot()
+        if snapshot is None:
+            return [], None, None
+        if snapshot.articles.empty:
+            return [], None, None
         
-        if df.empty:
-            return []
-        
-        # Print debug information
-        print(f"Filtering with sources: {selected_sources}")
-        print(f"Available sources in data: {df['Source'].unique()}")
+        if snapshot.index is not None:
+            # Range lookup over the precomputed index instead of DataFrame scans
+            items, next_key, newest_key = snapshot.index.query(
+                start_date, end_date, selected_sources, limit, cursor, since, collapse
+            )
+            if fields:
+                items = [project(item, fields, collapse) for item in items]
+            return (
+                items,
+                encode_cursor(*next_key) if next_key else None,
+                encode_cursor(*newest_key) if newest_key else None,
+            )
         
+        # Without an index, fall back to filtering a DataFrame copy of the articles
+        df = snapshot.articles.to_frame()
         df_filtered = filter_news(df, start_date, end_date, selected_sources)
-        
-        # Print debug information
-        print(f"Number of articles after filtering: {len(df_filtered)}")
+        if collapse:
+            df_filtered, sizes = collapse_clusters(df_filtered, df)
+        df_filtered, next_cursor = paginate(df_filtered, limit, cursor, since)
         
         if len(df_filtered) == 0:
-            return []
+            return [], None, None
         
-        return [process_news_item(row) for _, row in df_filtered.iterrows()]
+        items = [process_news_item(row) for _, row in df_filtered.iterrows()]
+        if collapse:
+            for item, size in zip(items, sizes[df_filtered.index]):
+                item['cluster_size'] = int(size)
+        if fields:
+            items = [project(item, fields, collapse) for item in items]
+        newest = df_filtered.iloc[0]
+        return items, next_cursor, encode_cursor(newest['date'], newest['Link'])
     
     except Exception as e:
-        print(f"Error fetching news data: {str(e)}")
-        return []
+        logger.exception("Error fetching news data: %s", e)
+        return [], None, None
+
+def get_news_data(start_date=None, end_date=None, selected_sources=None, snapshot=None):
+    """Main function to get filtered news data"""
+    items, _, _ = get_news_page(start_date, end_date, selected_sources, snapshot)
+    return items
+
+def list_sources(snapshot):
+    """Sorted source names in a snapshot"""
+    article_stats.sync(snapshot)
+    return article_stats.sources()
+
+def build_news_response(start_date, end_date, sources, snapshot, limit, cursor, since, fields, collapse):
+    """Build the /api/news payload and its pagination headers"""
+    items, next_cursor, newest_cursor = get_news_page(
+        start_date, end_date, sources, snapshot, limit, cursor, since, fields, collapse
+    )
+    headers = {}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    # Position of the newest returned article, for polling with ?since=
+    if newest_cursor:
+        headers["X-Newest-Cursor"] = newest_cursor
+    return items, headers
 
 # API Models
 class NewsItem(BaseModel):
@@ -131,46 +495,240 @@ class NewsItem(BaseModel):
     Source: str
     date: str
     Image: Optional[str] = None
+    cluster_id: Optional[str] = None
+    cluster_size: Optional[int] = None
 
 # API Endpoints
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
     """Serve the main page"""
-    return templates.TemplateResponse("index.html", {"request": request})
+    return templates.TemplateResponse(request, "index.html")
 
 @app.get("/api/news")
 async def get_news(
+    request: Request,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    sources: Optional[str] = None
+    sources: Optional[List[str]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    since: Optional[str] = None,
+    fields: Optional[str] = None,
+    collapse: bool = False
 ):
-    """Get news articles with optional filters"""
+    """Get news articles with optional filters, keyset pagination and field projection
+
+    Pass the X-Next-Cursor response header back as ?cursor= for the next (older) page,
+    or X-Newest-Cursor as ?since= to get only articles newer than the ones already seen.
+    collapse=true returns one article per story cluster. Repeat ?sources= to pick several sources.
+    """
     try:
-        print(f"Received request with sources: {sources}")  # Debug print
-        news_items = get_news_data(start_date, end_date, sources)
-        return news_items
+        page_cursor = decode_cursor(cursor) if cursor else None
+        since_cursor = decode_cursor(since) if since else None
+        selected_fields = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        # Wait for the snapshot without blocking the loop, then filter in a worker thread
+        snapshot = await news_cache.aget()
+        if snapshot is None:
+            return []
+        key = ("news", snapshot.version, start_date, end_date, tuple(sources or ()), limit, cursor, since,
+               selected_fields, collapse)
+        return await cached_json(
+            request, key,
+            lambda: build_news_response(start_date, end_date, sources, snapshot,
+                                        limit, page_cursor, since_cursor, selected_fields, collapse),
+            snapshot
+        )
     except Exception as e:
-        print(f"Error in get_news: {str(e)}")  # Debug print
+        logger.exception("Error in get_news: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/sources")
-async def get_sources():
+async def get_sources(request: Request):
     """Get list of available news sources"""
     try:
-        df = get_data()
-        sources = sorted(df['Source'].unique().tolist())
-        return sources
+        snapshot = await news_cache.aget()
+        if snapshot is None or snapshot.articles.empty:
+            return []
+        key = ("sources", snapshot.version)
+        return await cached_json(
+            request, key, lambda: (list_sources(snapshot), None), snapshot
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/export")
+async def export_news(
+    fmt: str = Query("jsonl", alias="format", pattern="^(jsonl|csv|parquet)$"),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    sources: Optional[List[str]] = Query(None)
+):
+    """Stream the whole stored article history as JSONL, CSV or Parquet
+
+    Takes the same date and source filters as /api/news (repeat ?sources= for
+    several sources). Rows are read and sent a chunk at a time, newest first,
+    so any history size is exported in constant memory.
+    """
+    import export
+    try:
+        chunks = export.stream(article_store, fmt, start_date, end_date, sources)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    media_type, extension = export.FORMATS[fmt]
+    return StreamingResponse(
+        chunks, media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="ai_news.{extension}"'},
+    )
+
+@app.get("/api/stats")
+async def get_stats(
+    request: Request,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    sources: Optional[List[str]] = Query(None)
+):
+    """Article counts per source and UTC day, with each source's total and newest article
+
+    The counters are updated as each refresh adds articles, so answering does
+    not scan the history. start_date and end_date limit the days listed (not
+    the totals); repeat ?sources= to pick sources.
+    """
+    for value in (start_date, end_date):
+        if value:
+            try:
+                day_number(value)
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+    snapshot = await news_cache.aget()
+    if snapshot is None:
+        return {"total": 0, "sources": {}}
+
+    def build():
+        article_stats.sync(snapshot)
+        return article_stats.summary(start_date, end_date, sources), None
+
+    key = ("stats", snapshot.version, start_date, end_date, tuple(sources or ()))
+    return await cached_json(request, key, build, snapshot)
+
+def search_news(q, snapshot, limit):
+    """Rank articles for a query and return their rendered items with scores"""
+    results = []
+    for link, score in served_search.search(q, limit):
+        item = snapshot.index.item(link) if snapshot.index is not None else None
+        if item is not None:
+            results.append(dict(item, score=round(score, 4)))
+    return results, None
+
+@app.get("/api/search")
+async def search(
+    request: Request,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Full-text search over titles and descriptions
+
+    Supports plain terms (BM25 ranked), "quoted phrases" and prefix* terms.
+    """
+    try:
+        snapshot = await news_cache.aget()
+        if snapshot is None:
+            return []
+        # The index and its size are part of the key: a warm start fills it after serving the snapshot,
+        # and followers switch to each index the refresher publishes
+        key = ("search", snapshot.version, id(served_search), len(served_search), q, limit)
+        return await cached_json(request, key, lambda: search_news(q, snapshot, limit), snapshot)
+    except Exception as e:
+        logger.exception("Error in search: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/snapshot")
+async def get_snapshot_status():
+    """Get the version and age of the news snapshot"""
+    status = news_cache.status()
+    if snapshot_channel is not None:
+        status["role"] = "follower" if news_cache.following else "refresher"
+    if not news_cache.following:
+        fetch_data = crawler()
+        status["feeds"] = fetch_data.feed_cache.stats()
+        status["schedule"] = fetch_data.scheduler.status()
+        status["entry_cache"] = fetch_data.entry_cache.stats()
+    status["thumbnails"] = thumbnails.stats()
+    return status
+
+@app.get("/thumbnails/{key}")
+async def thumbnail(request: Request, key: str, w: int = Query(400, ge=1, le=4000)):
+    """Resized copy of an article image, WebP when the browser accepts it
+
+    Unknown keys are 404s; images that cannot be fetched or decoded redirect to the placeholder.
+    """
+    url = thumbnails.resolve(key)
+    if url is None:
+        raise HTTPException(status_code=404, detail="Unknown image")
+    formats = image_formats()
+    fmt = "webp" if "webp" in formats and "image/webp" in request.headers.get("accept", "") else "jpeg"
+    result = thumbnails.cached(url, w, fmt)
+    if result is None:
+        result = await run_in_threadpool(thumbnails.lookup, url, w, fmt)
+    if result is None:
+        return RedirectResponse(PLACEHOLDER_IMAGE, status_code=302, headers={"Cache-Control": "public, max-age=3600"})
+
+    path, etag = result
+    # A key always maps to the same image, so browsers and CDNs can keep it forever
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={ONE_YEAR}, immutable", "Vary": "Accept"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=formats[fmt][1], headers=headers)
+
+@app.get("/api/stream")
+async def stream_news(request: Request, last_event_id: Optional[int] = None):
+    """Server-Sent Events stream of newly discovered articles
+
+    Each event is an "article" with the same fields as /api/news items. Reconnecting
+    clients resume from the Last-Event-ID header (or ?last_event_id=); a "reset"
+    event means the missed articles are gone and the client should reload /api/news.
+    """
+    header = request.headers.get("last-event-id")
+    if header and header.isdigit():
+        last_event_id = int(header)
+    subscriber = article_broker.subscribe(last_event_id)
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Too many open streams")
+    return StreamingResponse(
+        article_broker.stream(subscriber, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Pipeline, feed, cache and request metrics in the Prometheus text format"""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.post("/api/refresh")
+async def refresh_news():
+    """Start a background refresh; readers keep the current snapshot meanwhile"""
+    _, started = news_cache.refresh_async()
+    status = news_cache.status()
+    status["started"] = started
+    return status
+
 if __name__ == "__main__":
     import uvicorn
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     print("\n🚀 Starting Latest AI News API server...")
     print("📝 API Documentation available at: http://localhost:8000/docs")
     print("🌐 Frontend available at: http://localhost:8000")
     print("🌐 API Endpoints:")
     print("   - http://localhost:8000/api/news")
     print("   - http://localhost:8000/api/sources")
+    print("   - http://localhost:8000/api/search?q=waymo")
+    print("   - http://localhost:8000/api/snapshot")
     print("\nPress Ctrl+C to stop the server\n")
     uvicorn.run(app, host="0.0.0.0", port=8000) 
 
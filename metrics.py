@@ -0,0 +1,185 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Set NEWS_METRICS=0 to turn every metric update into a no-op
+METRICS_ENABLED = os.environ.get("NEWS_METRICS", "1") != "0"
+
+# Upper bounds in seconds of the default histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        registry.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def samples(self):
+        """(suffix, label values, extra label, value) tuples for the text format"""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labels, values, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [("_total", key, None, value) for key, value in sorted(self._values.items())]
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=(), function=None):
+        super().__init__(name, help, labels)
+        # Unlabelled gauges can be read from a callback at scrape time instead
+        self.function = function
+
+    def set(self, value, **labels):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self):
+        if self.function is not None:
+            value = self.function()
+            return [] if value is None else [("", (), None, value)]
+        with self._lock:
+            return [("", key, None, value) for key, value in sorted(self._values.items())]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (the last one is +Inf), then sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of a with block"""
+        if not METRICS_ENABLED:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    samples.append(("_bucket", key, ("le", _format_value(float(bound))), cumulative))
+                samples.append(("_sum", key, None, total))
+                samples.append(("_count", key, None, cumulative))
+        return samples
+
+# Every metric created in the process, in creation order
+registry = []
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    return "\n".join(metric.render() for metric in registry) + "\n"
+
+class RequestTimer:
+    """ASGI middleware observing time to response start in request_seconds
+
+    Timing stops at the first response message, so long-lived streams count
+    their time to first byte rather than the whole connection.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start":
+                # Label by route template (or mount path), not raw path, to keep the series count bounded
+                route = scope.get("route")
+                route = route.path if route is not None else scope.get("root_path") or "unmatched"
+                request_seconds.observe(time.perf_counter() - start, method=scope["method"],
+                                        route=route, status=message["status"])
+            await send(message)
+
+        await self.app(scope, receive, timed_send)
+
+# Feed fetching
+feed_fetch_seconds = Histogram("news_feed_fetch_seconds", "Time to fetch and parse one source", ["source"])
+feed_bytes = Counter("news_feed_bytes", "Response bytes downloaded per source", ["source"])
+feed_entries = Gauge("news_feed_entries", "Entries returned by the last poll of a source", ["source"])
+feed_parse_errors = Counter("news_feed_parse_errors", "Malformed feeds and entries that failed to parse", ["source"])
+feed_polls = Counter("news_feed_polls", "Source polls by outcome (hit = unchanged, miss = parsed, skipped = not due)",
+                     ["source", "result"])
+source_breaker_open = Gauge("news_source_breaker_open", "1 while a source's circuit breaker is open", ["source"])
+entry_cache_lookups = Counter("news_entry_cache_lookups",
+                              "Per-entry processing results reused (hit) or computed (miss), by stage",
+                              ["stage", "result"])
+
+# Snapshot builds
+stage_seconds = Histogram("news_pipeline_stage_seconds", "Duration of each snapshot build stage", ["stage"])
+snapshot_builds = Counter("news_snapshot_builds", "Snapshot builds by result (ok or error)", ["result"])
+
+# HTTP serving
+request_seconds = Histogram("news_http_request_seconds", "HTTP request latency", ["method", "route", "status"])
+response_cache_lookups = Counter("news_response_cache_lookups", "Response cache lookups by result", ["result"])
+thumbnail_lookups = Counter("news_thumbnail_lookups", "Thumbnail requests by result (hit, fetched or failed)",
+                            ["result"])
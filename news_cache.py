@@ -0,0 +1,274 @@
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+
+from metrics import snapshot_builds, stage_seconds
+
+logger = logging.getLogger(__name__)
+
+# Seconds between background rebuilds of the news snapshot
+REFRESH_INTERVAL = int(os.environ.get("NEWS_REFRESH_INTERVAL", "900"))
+
+# Seconds a request waits for an in-flight build before falling back to the last good snapshot
+BUILD_WAIT_TIMEOUT = float(os.environ.get("NEWS_BUILD_WAIT_TIMEOUT", "30"))
+
+# Requests allowed to wait on one in-flight build; the rest get the last good snapshot at once
+MAX_WAITERS = int(os.environ.get("NEWS_MAX_WAITERS", "64"))
+
+class NewsSnapshot:
+    """Immutable result of one pipeline run, shared by all readers"""
+
+    __slots__ = ("articles", "version", "built_at", "index")
+
+    def __init__(self, articles, version, built_at, index=None):
+        # The articles are shared between requests and must never be modified in place
+        object.__setattr__(self, "articles", articles)
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "built_at", built_at)
+        # Optional lookup structures derived from the articles once per snapshot
+        object.__setattr__(self, "index", index)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("NewsSnapshot is immutable")
+
+    @property
+    def age(self):
+        """Seconds since this snapshot was built"""
+        return time.time() - self.built_at
+
+class SnapshotCache:
+    """Serve the latest snapshot while a background thread keeps it fresh
+
+    Rebuilds are single-flight: at most one build runs at a time on a dedicated
+    worker thread, and every caller that needs a rebuild meanwhile shares its future.
+    """
+
+    def __init__(self, build, interval=REFRESH_INTERVAL, wait_timeout=BUILD_WAIT_TIMEOUT,
+                 max_waiters=MAX_WAITERS, prepare=None, on_change=None, warm_start=None):
+        self._build = build
+        self._prepare = prepare
+        # Called with (previous, current) after each successful rebuild
+        self._on_change = on_change
+        # Called on the build thread before the first build, e.g. to seed() a snapshot from disk
+        self._warm_start = warm_start
+        self.interval = interval
+        self.wait_timeout = wait_timeout
+        self.max_waiters = max_waiters
+        self._snapshot = None
+        self._version = 0
+        self._lock = threading.Lock()
+        self._inflight = None
+        self._waiters = 0
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="news-build")
+        self._stop = threading.Event()
+        self._thread = None
+        # While following, snapshots only arrive through install() and nothing is built here
+        self._following = False
+        self._warm_built = False
+        self.last_error = None
+
+    def start(self):
+        """Start the periodic refresher thread"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        warming = None
+        if self._warm_start is not None:
+            with self._lock:
+                if self._snapshot is None and self._inflight is None:
+                    # Requests arriving meanwhile wait for the warm start instead of starting a build
+                    warming = self._inflight = self._executor.submit(self._do_warm_start)
+        self._thread = threading.Thread(target=self._run, args=(warming,), name="news-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the periodic refresher thread"""
+        self._stop.set()
+        self._thread = None
+
+    def _run(self, warming=None):
+        if warming is not None:
+            warming.result()
+            if self._warm_built:
+                # The warm start already ran the first build
+                self._stop.wait(self.interval)
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.interval)
+
+    @property
+    def refreshing(self):
+        return self._inflight is not None and not self._following
+
+    @property
+    def snapshot(self):
+        """The last good snapshot, or None before the first successful build"""
+        return self._snapshot
+
+    def seed(self, articles, built_at=None):
+        """Install an initial snapshot (e.g. loaded from disk) before the first build"""
+        index = self._index(articles)
+        with self._lock:
+            if self._snapshot is not None:
+                return self._snapshot
+            self._version += 1
+            self._snapshot = NewsSnapshot(articles, self._version, built_at or time.time(), index)
+            return self._snapshot
+
+    def _do_warm_start(self):
+        try:
+            self._warm_start()
+        except Exception as e:
+            logger.exception("Error warm starting the news snapshot: %s", e)
+        if self._snapshot is None:
+            # Nothing stored yet: requests already waiting get the first build instead of None
+            self._warm_built = True
+            return self._do_refresh()
+        with self._lock:
+            self._inflight = None
+        return self._snapshot
+
+    def follow(self):
+        """Stop building; serve snapshots passed to install(), e.g. published by another process"""
+        with self._lock:
+            self._following = True
+
+    def lead(self):
+        """Build snapshots again after follow()"""
+        with self._lock:
+            self._following = False
+            waiting, self._inflight = self._inflight, None
+        # Requests waiting for an install get the current snapshot instead
+        if waiting is not None and not waiting.done():
+            waiting.set_result(self._snapshot)
+
+    @property
+    def following(self):
+        return self._following
+
+    def install(self, articles, version, built_at):
+        """Serve a snapshot built elsewhere under its own version, so every process agrees on it"""
+        index = self._index(articles)
+        with self._lock:
+            previous = self._snapshot
+            self._version = max(self._version, version)
+            self._snapshot = NewsSnapshot(articles, version, built_at, index)
+            waiting = None
+            if self._following:
+                waiting, self._inflight = self._inflight, None
+        if waiting is not None and not waiting.done():
+            waiting.set_result(self._snapshot)
+        if self._on_change is not None:
+            self._on_change(previous, self._snapshot)
+        return self._snapshot
+
+    def _index(self, articles):
+        return self._prepare(articles) if self._prepare is not None else None
+
+    def refresh_async(self):
+        """Start a rebuild unless one is already running; returns (future, started)"""
+        with self._lock:
+            if self._inflight is not None:
+                return self._inflight, False
+            if self._following:
+                # Callers wait for the next install() instead
+                self._inflight = concurrent.futures.Future()
+                return self._inflight, False
+            future = self._executor.submit(self._do_refresh)
+            self._inflight = future
+            return future, True
+
+    def refresh(self):
+        """Rebuild the snapshot now, joining a build that is already running"""
+        future, _ = self.refresh_async()
+        return future.result()
+
+    def _do_refresh(self):
+        try:
+            with stage_seconds.time(stage="total"):
+                articles = self._build()
+                index = self._index(articles)
+            with self._lock:
+                previous = self._snapshot
+                self._version += 1
+                self._snapshot = NewsSnapshot(articles, self._version, time.time(), index)
+            self.last_error = None
+            snapshot_builds.inc(result="ok")
+        except Exception as e:
+            # Keep serving the previous snapshot if the rebuild fails
+            logger.exception("Error refreshing news snapshot: %s", e)
+            self.last_error = str(e)
+            snapshot_builds.inc(result="error")
+        else:
+            # The snapshot is installed by now, so a failing callback is not a failed build
+            if self._on_change is not None:
+                try:
+                    self._on_change(previous, self._snapshot)
+                except Exception as e:
+                    logger.exception("Error handling new news snapshot %s: %s", self._snapshot.version, e)
+        finally:
+            with self._lock:
+                self._inflight = None
+        return self._snapshot
+
+    def get(self, timeout=None):
+        """Return the current snapshot, building the first one if necessary
+
+        A snapshot older than the refresh interval is still returned immediately
+        while a rebuild runs in the background (stale-while-revalidate).
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            if snapshot.age > self.interval:
+                self.refresh_async()
+            return snapshot
+
+        future, _ = self.refresh_async()
+        try:
+            return future.result(self.wait_timeout if timeout is None else timeout)
+        except concurrent.futures.TimeoutError:
+            return self._snapshot
+
+    async def aget(self, timeout=None):
+        """Async variant of get() that never blocks the event loop
+
+        Requests that arrive while the first build runs wait on the shared future.
+        If too many are already waiting, or the build outlasts the timeout, the
+        last good snapshot (possibly None) is returned instead.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            if snapshot.age > self.interval:
+                self.refresh_async()
+            return snapshot
+
+        future, _ = self.refresh_async()
+        if self._waiters >= self.max_waiters:
+            return self._snapshot
+
+        self._waiters += 1
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(future)),
+                self.wait_timeout if timeout is None else timeout,
+            )
+        except asyncio.TimeoutError:
+            return self._snapshot
+        finally:
+            self._waiters -= 1
+
+    def status(self):
+        """Describe the current snapshot for clients"""
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version if snapshot else 0,
+            "age": round(snapshot.age, 1) if snapshot else None,
+            "built_at": snapshot.built_at if snapshot else None,
+            "refreshing": self.refreshing,
+            "waiters": self._waiters,
+            "interval": self.interval,
+            "error": self.last_error,
+        }
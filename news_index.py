@@ -0,0 +1,198 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+
+import numpy as np
+
+from article_table import ArticleTable
+
+def _timestamp(value):
+    import pandas as pd
+    return pd.Timestamp(value).value
+
+def _reversed_slice(values, start, stop):
+    """Iterate values[start:stop] backwards without copying"""
+    for i in range(stop - 1, start - 1, -1):
+        yield int(values[i])
+
+class NewsIndex:
+    """Read-only lookup structures built once per snapshot
+
+    Articles stay in their ArticleTable, in ascending (date, link) order, so
+    date bounds and keyset cursors become binary searches. Each source has a
+    posting array of positions, and positions of clusters with more than one
+    article are grouped so near-duplicate stories can be collapsed. Items are
+    rendered to response dicts only when a request returns them.
+    """
+
+    def __init__(self, table, render, image_key=None):
+        if not isinstance(table, ArticleTable):
+            table = ArticleTable.from_frame(table)
+        self.table = table
+        self._render = render
+        self.timestamps = table.timestamps
+
+        codes = table.sources.codes
+        self.postings = {name: np.flatnonzero(codes == code) for code, name in enumerate(table.sources.names)}
+        self.sources = sorted(name for name, posting in self.postings.items() if len(posting))
+
+        self.cluster_codes = table.clusters.codes
+        clustered = self.cluster_codes >= 0
+        self.cluster_counts = np.bincount(self.cluster_codes[clustered], minlength=max(1, len(table.clusters.names)))
+        shared = np.flatnonzero(clustered & (self.cluster_counts[np.where(clustered, self.cluster_codes, 0)] > 1))
+        self.members = {}
+        if len(shared):
+            grouped = shared[np.argsort(self.cluster_codes[shared], kind="stable")]
+            boundaries = np.flatnonzero(np.diff(self.cluster_codes[grouped])) + 1
+            for group in np.split(grouped, boundaries):
+                self.members[int(self.cluster_codes[group[0]])] = group
+
+        # Thumbnail keys of article images, sorted so image_url() can resolve a key to its URL
+        self._image_key = image_key
+        self._image_hashes = np.zeros(0, dtype=np.uint64)
+        self._image_positions = np.zeros(0, dtype=np.int64)
+        if image_key is not None:
+            positions, hashes = [], []
+            for position, image in enumerate(table.images):
+                if image:
+                    positions.append(position)
+                    hashes.append(int(image_key(image)[:16], 16))
+            hashes = np.array(hashes, dtype=np.uint64)
+            order = np.argsort(hashes, kind="stable")
+            self._image_hashes = hashes[order]
+            self._image_positions = np.array(positions, dtype=np.int64)[order]
+
+    def __len__(self):
+        return len(self.table)
+
+    def _key_bound(self, key, side):
+        """Position of a (timestamp, link) key in ascending order"""
+        timestamp, link = key
+        lo = int(np.searchsorted(self.timestamps, timestamp, side="left"))
+        hi = int(np.searchsorted(self.timestamps, timestamp, side="right"))
+        search = bisect_left if side == "left" else bisect_right
+        return search(self.table.links, link, lo, hi)
+
+    def _bounds(self, start_date=None, end_date=None, cursor=None, since=None):
+        """Half-open [lo, hi) range of ascending positions matching the filters"""
+        lo, hi = 0, len(self.timestamps)
+
+        if start_date:
+            lo = int(np.searchsorted(self.timestamps, _timestamp(start_date), side="left"))
+        if end_date:
+            import pandas as pd
+            end = pd.to_datetime(end_date)
+            # A bare end date includes that whole day, as in filter_news
+            if end == end.normalize():
+                hi = int(np.searchsorted(self.timestamps, _timestamp(end + timedelta(days=1)), side="left"))
+            else:
+                hi = int(np.searchsorted(self.timestamps, end.value, side="right"))
+        if cursor is not None:
+            hi = min(hi, self._key_bound((_timestamp(cursor[0]), cursor[1]), "left"))
+        if since is not None:
+            lo = max(lo, self._key_bound((_timestamp(since[0]), since[1]), "right"))
+
+        return lo, max(lo, hi)
+
+    def _positions(self, lo, hi, sources):
+        """Matching positions newest first"""
+        if not sources:
+            return range(hi - 1, lo - 1, -1)
+
+        ranges = []
+        for source in sources:
+            posting = self.postings.get(source)
+            if posting is None or not len(posting):
+                continue
+            start, stop = np.searchsorted(posting, [lo, hi], side="left")
+            ranges.append(_reversed_slice(posting, start, stop))
+
+        if len(ranges) == 1:
+            return ranges[0]
+        return heapq.merge(*ranges, reverse=True)
+
+    def _is_newest(self, position, hi, sources):
+        """True if no newer member of the article's cluster matches the filters"""
+        members = self.members.get(int(self.cluster_codes[position]))
+        if members is None:
+            return True
+        for index in range(int(np.searchsorted(members, position, side="right")), len(members)):
+            other = members[index]
+            if other >= hi:
+                break
+            if not sources or self.table.sources[other] in sources:
+                return False
+        return True
+
+    def cluster_size(self, position):
+        code = self.cluster_codes[position]
+        return int(self.cluster_counts[code]) if code >= 0 else 1
+
+    def query(self, start_date=None, end_date=None, sources=None, limit=None, cursor=None, since=None,
+              collapse=False):
+        """Return (items, next_cursor_key, newest_key) newest first
+
+        cursor and since are (date, link) keys; the returned keys are (Timestamp, link).
+        With collapse, only the newest matching article of each cluster is returned,
+        with a cluster_size count; this is decided against the date and source
+        filters, not the page, so cursors page through collapsed results consistently.
+        """
+        if isinstance(sources, str):
+            sources = [sources]
+        lo, hi = self._bounds(start_date, end_date, cursor, since)
+        if collapse:
+            _, filter_hi = self._bounds(start_date, end_date)
+            source_set = set(sources) if sources else None
+
+        positions = []
+        for position in self._positions(lo, hi, sources):
+            if collapse and not self._is_newest(position, filter_hi, source_set):
+                continue
+            positions.append(position)
+            if limit is not None and len(positions) > limit:
+                break
+
+        next_key = None
+        if limit is not None and len(positions) > limit:
+            positions = positions[:limit]
+            next_key = self._key(positions[-1])
+
+        newest_key = self._key(positions[0]) if positions else None
+        items = [self.item_at(position) for position in positions]
+        if collapse:
+            for item, position in zip(items, positions):
+                item['cluster_size'] = self.cluster_size(position)
+        return items, next_key, newest_key
+
+    def item_at(self, position):
+        """Rendered response dict for the article at a position"""
+        return self._render(self.table.row(position))
+
+    def item(self, link):
+        """Rendered item for a link, or None if it is not in this snapshot"""
+        position = self.table.find(link)
+        return self.item_at(position) if position is not None else None
+
+    def __contains__(self, link):
+        return self.table.find(link) is not None
+
+    def image_url(self, key):
+        """Article image URL whose image_key is key, or None"""
+        if self._image_key is None:
+            return None
+        try:
+            target = np.uint64(int(key[:16], 16))
+        except ValueError:
+            return None
+        hashes = self._image_hashes
+        for index in range(int(np.searchsorted(hashes, target, side="left")), len(hashes)):
+            if hashes[index] != target:
+                break
+            image = self.table.images[int(self._image_positions[index])]
+            if self._image_key(image) == key:
+                return image
+        return None
+
+    def _key(self, position):
+        import pandas as pd
+        return pd.Timestamp(int(self.timestamps[position])), self.table.links[position]
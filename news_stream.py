@@ -0,0 +1,142 @@
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+
+# Recent events kept so reconnecting clients can resume from Last-Event-ID
+REPLAY_SIZE = int(os.environ.get("NEWS_STREAM_REPLAY", "1000"))
+
+# Events buffered per client; a client that falls further behind is told to reload
+CLIENT_BUFFER = int(os.environ.get("NEWS_STREAM_BUFFER", "256"))
+
+# Open streams allowed per worker
+MAX_CLIENTS = int(os.environ.get("NEWS_STREAM_MAX_CLIENTS", "5000"))
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT = float(os.environ.get("NEWS_STREAM_HEARTBEAT", "15"))
+
+# Sent instead of events a client can no longer get, so it re-fetches /api/news
+RESET = b"event: reset\ndata: {}\n\n"
+PING = b": ping\n\n"
+
+def format_event(event_id, event, payload):
+    """Encode one Server-Sent Event"""
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n".encode("utf-8")
+
+class _Subscriber:
+    __slots__ = ("queue", "wakeup", "overflowed")
+
+    def __init__(self):
+        self.queue = deque()
+        self.wakeup = asyncio.Event()
+        self.overflowed = False
+
+    def push(self, events):
+        for event in events:
+            if len(self.queue) >= CLIENT_BUFFER:
+                # Too far behind: drop the backlog and ask the client to reload
+                self.queue.clear()
+                self.overflowed = True
+            self.queue.append(event)
+        self.wakeup.set()
+
+class ArticleBroker:
+    """Fan newly discovered articles out to Server-Sent Event streams
+
+    Events are encoded once per publish and shared by every client. All
+    streams of a worker live on its event loop; publish() may be called from
+    any thread and hands the events over with call_soon_threadsafe. An idle
+    stream is one suspended coroutine, so thousands of them stay cheap.
+    """
+
+    def __init__(self, replay_size=REPLAY_SIZE, max_clients=MAX_CLIENTS):
+        self.max_clients = max_clients
+        self._history = deque(maxlen=replay_size)
+        self._subscribers = set()
+        self._loop = None
+        self._lock = threading.Lock()
+        self._last_id = 0
+
+    @property
+    def clients(self):
+        return len(self._subscribers)
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def publish(self, items, event="article"):
+        """Assign ids to items and deliver them to every connected stream"""
+        if not items:
+            return
+        with self._lock:
+            events = []
+            for item in items:
+                self._last_id += 1
+                events.append((self._last_id, format_event(self._last_id, event, item)))
+            self._history.extend(events)
+            loop = self._loop
+
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._deliver, [data for _, data in events])
+
+    def _deliver(self, events):
+        for subscriber in list(self._subscribers):
+            subscriber.push(events)
+
+    def _replay(self, last_event_id):
+        """Events after last_event_id, or None if they are no longer available"""
+        with self._lock:
+            if last_event_id > self._last_id:
+                # Ids from before a restart of this worker
+                return None
+            if last_event_id == self._last_id:
+                return []
+            if not self._history or self._history[0][0] > last_event_id + 1:
+                return None
+            return [data for event_id, data in self._history if event_id > last_event_id]
+
+    def subscribe(self, last_event_id=None):
+        """Register a stream on the running loop; returns None when the worker is full"""
+        if len(self._subscribers) >= self.max_clients:
+            return None
+        self._loop = asyncio.get_running_loop()
+        subscriber = _Subscriber()
+        if last_event_id is not None:
+            backlog = self._replay(last_event_id)
+            if backlog is None:
+                subscriber.queue.append(RESET)
+            else:
+                subscriber.push(backlog)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self._subscribers.discard(subscriber)
+
+    async def stream(self, subscriber, is_disconnected, heartbeat=HEARTBEAT):
+        """Yield encoded events for one client until it disconnects"""
+        try:
+            # Tells EventSource how long to wait before reconnecting
+            yield b"retry: 5000\n\n"
+            while True:
+                if not subscriber.queue:
+                    subscriber.wakeup.clear()
+                    try:
+                        await asyncio.wait_for(subscriber.wakeup.wait(), heartbeat)
+                    except asyncio.TimeoutError:
+                        if await is_disconnected():
+                            break
+                        yield PING
+                        continue
+
+                if subscriber.overflowed:
+                    subscriber.overflowed = False
+                    subscriber.queue.appendleft(RESET)
+                chunk = b"".join(subscriber.queue)
+                subscriber.queue.clear()
+                yield chunk
+        finally:
+            self.unsubscribe(subscriber)
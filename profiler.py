@@ -0,0 +1,83 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from feed_cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Sampling interval in milliseconds for profiled blocks; 0 disables profiling
+PROFILE_INTERVAL_MS = float(os.environ.get("NEWS_PROFILE_INTERVAL_MS", "0"))
+PROFILE_DIR = os.path.join(CACHE_DIR, "profiles")
+
+class SamplingProfiler:
+    """Periodically sample the stacks of all threads into collapsed-stack counts
+
+    The output is the "folded" format read by flamegraph.pl and speedscope:
+    one line per distinct stack, frames separated by semicolons, then a count.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="news-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+@contextmanager
+def sampling_profile(name, interval_ms=None):
+    """Profile a with block when NEWS_PROFILE_INTERVAL_MS is set, writing PROFILE_DIR/<name>-<time>.folded"""
+    interval_ms = PROFILE_INTERVAL_MS if interval_ms is None else interval_ms
+    if interval_ms <= 0:
+        yield None
+        return
+
+    profiler = SamplingProfiler(interval_ms / 1000)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        path = os.path.join(PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        try:
+            profiler.write(path)
+            logger.info("Wrote %d profile samples to %s", profiler.samples, path)
+        except Exception as e:
+            logger.warning("Error writing profile: %s", e)
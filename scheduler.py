@@ -0,0 +1,145 @@
+import os
+import random
+import threading
+import time
+
+# Bounds in seconds on how often one source is polled
+MIN_POLL_INTERVAL = float(os.environ.get("NEWS_MIN_POLL_INTERVAL", "300"))
+MAX_POLL_INTERVAL = float(os.environ.get("NEWS_MAX_POLL_INTERVAL", str(6 * 3600)))
+
+# Poll this many times per typical gap between a source's articles
+POLLS_PER_ARTICLE = 4
+
+# Unchanged polls stretch the interval by this factor, up to the cadence estimate
+UNCHANGED_GROWTH = 1.5
+
+# Hard limit in seconds on fetching and parsing one source
+SOURCE_DEADLINE = float(os.environ.get("NEWS_SOURCE_DEADLINE", "20"))
+
+# Retry delays after errors double from BASE_BACKOFF up to MAX_BACKOFF seconds
+BASE_BACKOFF = 60.0
+MAX_BACKOFF = 3600.0
+
+# Consecutive failures that open a source's circuit breaker
+BREAKER_THRESHOLD = int(os.environ.get("NEWS_BREAKER_THRESHOLD", "5"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+class _SourceState:
+    __slots__ = ("interval", "fixed_interval", "cadence", "next_poll", "failures", "breaker", "last_success",
+                 "last_change", "last_error")
+
+    def __init__(self):
+        self.interval = MIN_POLL_INTERVAL
+        self.fixed_interval = None
+        self.cadence = None
+        self.next_poll = 0.0
+        self.failures = 0
+        self.breaker = CLOSED
+        self.last_success = None
+        self.last_change = None
+        self.last_error = None
+
+class SourceScheduler:
+    """Decide when each source is polled
+
+    A source is polled again after a fraction of the typical gap between its
+    articles (learned from their publication dates), stretched while polls
+    come back unchanged. Errors back off exponentially with jitter; after
+    BREAKER_THRESHOLD consecutive failures the breaker opens and only a single
+    trial poll is let through once the backoff has passed.
+    """
+
+    def __init__(self, deadline=SOURCE_DEADLINE, clock=time.time):
+        self.deadline = deadline
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sources = {}
+
+    def _state(self, link):
+        state = self._sources.get(link)
+        if state is None:
+            state = self._sources[link] = _SourceState()
+        return state
+
+    def configure(self, link, poll_interval=None):
+        """Poll a source every poll_interval seconds instead of learning its cadence"""
+        with self._lock:
+            self._state(link).fixed_interval = poll_interval
+
+    def due(self, link):
+        """True if the source should be polled now"""
+        with self._lock:
+            state = self._state(link)
+            if self._clock() < state.next_poll:
+                return False
+            if state.breaker == OPEN:
+                # Let one trial request through
+                state.breaker = HALF_OPEN
+            return True
+
+    def success(self, link, changed, cadence=None):
+        """Record a successful poll; cadence is the typical seconds between articles, if known"""
+        with self._lock:
+            state = self._state(link)
+            now = self._clock()
+            state.failures = 0
+            state.breaker = CLOSED
+            state.last_success = now
+            state.last_error = None
+            if cadence:
+                state.cadence = cadence
+
+            target = state.cadence / POLLS_PER_ARTICLE if state.cadence else MIN_POLL_INTERVAL
+            target = min(max(target, MIN_POLL_INTERVAL), MAX_POLL_INTERVAL)
+            if state.fixed_interval:
+                state.interval = state.fixed_interval
+            elif changed:
+                state.last_change = now
+                state.interval = target
+            else:
+                # Nothing new: poll a quiet source less often, but not beyond its cadence
+                ceiling = max(target, min(state.cadence or MAX_POLL_INTERVAL, MAX_POLL_INTERVAL))
+                state.interval = min(state.interval * UNCHANGED_GROWTH, ceiling)
+            state.next_poll = now + state.interval
+
+    def failure(self, link, error=None):
+        """Record a failed or timed-out poll and schedule the retry"""
+        with self._lock:
+            state = self._state(link)
+            state.failures += 1
+            state.last_error = str(error) if error is not None else None
+            if state.breaker == HALF_OPEN or state.failures >= BREAKER_THRESHOLD:
+                state.breaker = OPEN
+            backoff = min(MAX_BACKOFF, BASE_BACKOFF * 2 ** (state.failures - 1))
+            state.next_poll = self._clock() + backoff * random.uniform(0.8, 1.2)
+
+    def reset(self, link=None):
+        """Make one source (or all of them) due now with fresh state, keeping fixed intervals"""
+        with self._lock:
+            links = list(self._sources) if link is None else [link]
+            for link in links:
+                state = self._sources.pop(link, None)
+                if state is not None and state.fixed_interval:
+                    self._state(link).fixed_interval = state.fixed_interval
+
+    def breaker_state(self, link):
+        with self._lock:
+            state = self._sources.get(link)
+            return state.breaker if state else CLOSED
+
+    def status(self):
+        """Per-source schedule for /api/snapshot"""
+        now = self._clock()
+        with self._lock:
+            return {
+                link: {
+                    "breaker": state.breaker,
+                    "interval": round(state.interval),
+                    "cadence": round(state.cadence) if state.cadence else None,
+                    "next_poll_in": max(0, round(state.next_poll - now)),
+                    "failures": state.failures,
+                    "last_error": state.last_error,
+                }
+                for link, state in self._sources.items()
+            }
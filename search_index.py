@@ -0,0 +1,447 @@
+import hashlib
+import json
+import math
+import mmap
+import re
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+
+import numpy as np
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Title terms count this many times towards term frequency
+TITLE_WEIGHT = 2
+
+# Most terms a single prefix query (e.g. "robo*") expands to
+MAX_PREFIX_TERMS = 64
+
+# Compact postings once this share of indexed documents has been removed
+COMPACT_RATIO = 0.2
+
+TOKEN = re.compile(r"\w+", re.UNICODE)
+QUERY_PART = re.compile(r'"([^"]+)"|(\S+)')
+
+SUFFIXES = (("ies", "y"), ("sses", "ss"), ("ing", ""), ("ed", ""), ("es", ""), ("ly", ""), ("s", ""))
+
+def stem(token):
+    """Light suffix stripping so plural and simple verb forms match"""
+    for suffix, replacement in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            if suffix == "s" and token.endswith("ss"):
+                return token
+            return token[: -len(suffix)] + replacement
+    return token
+
+def tokenize(text):
+    """Lowercase word tokens, stemmed"""
+    return [stem(token) for token in TOKEN.findall((text or "").lower())]
+
+class _Postings:
+    """Doc ids and term frequencies for one term; appends go to a tail merged lazily into arrays"""
+
+    __slots__ = ("ids", "tfs", "tail_ids", "tail_tfs")
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.tfs = np.empty(0, dtype=np.float32)
+        self.tail_ids = []
+        self.tail_tfs = []
+
+    def add(self, doc_id, tf):
+        self.tail_ids.append(doc_id)
+        self.tail_tfs.append(tf)
+
+    def arrays(self):
+        if self.tail_ids:
+            self.ids = np.concatenate([self.ids, np.asarray(self.tail_ids, dtype=np.int64)])
+            self.tfs = np.concatenate([self.tfs, np.asarray(self.tail_tfs, dtype=np.float32)])
+            self.tail_ids = []
+            self.tail_tfs = []
+        return self.ids, self.tfs
+
+    def __len__(self):
+        return len(self.ids) + len(self.tail_ids)
+
+class _Ranker:
+    """BM25 ranking, phrase and prefix matching over the storage accessors of an index"""
+
+    def parse_query(self, query):
+        """Split a query into (terms, phrases) of term ids; unknown terms are dropped"""
+        terms, phrases = [], []
+        for phrase, word in QUERY_PART.findall(query or ""):
+            if phrase:
+                tokens = tokenize(phrase)
+                ids = [self._lookup(token) for token in tokens]
+                if None in ids:
+                    # A phrase with an unknown word cannot match anything
+                    phrases.append(None)
+                    continue
+                terms.extend(ids)
+                if len(ids) > 1:
+                    phrases.append(ids)
+            elif word.endswith("*") and len(word) > 1:
+                for prefix in TOKEN.findall(word[:-1].lower())[-1:]:
+                    # Keep the most common expansions
+                    matches = sorted(self._expand_prefix(prefix), key=self._term_documents, reverse=True)
+                    terms.extend(matches[:MAX_PREFIX_TERMS])
+            else:
+                for token in tokenize(word):
+                    term_id = self._lookup(token)
+                    if term_id is not None:
+                        terms.append(term_id)
+        return list(dict.fromkeys(terms)), phrases
+
+    def _matches_phrase(self, doc_id, phrase):
+        # Compare raw term id bytes; only 4-byte aligned hits are real matches
+        haystack = self._doc_token_bytes(doc_id)
+        needle = array("I", phrase).tobytes()
+        start = haystack.find(needle)
+        while start != -1:
+            if start % 4 == 0:
+                return True
+            start = haystack.find(needle, start + 1)
+        return False
+
+    def search(self, query, limit=20):
+        """Return up to limit (link, score) pairs, best first"""
+        with self._lock:
+            terms, phrases = self.parse_query(query)
+            if not terms or None in phrases:
+                return []
+
+            live, lengths, total_length, deleted = self._ranking()
+            if not live:
+                return []
+            average = total_length / live
+            scores = np.zeros(len(lengths), dtype=np.float32)
+
+            for term_id in terms:
+                ids, tfs = self._term_postings(term_id)
+                if not len(ids):
+                    continue
+                idf = math.log(1 + (live - len(ids) + 0.5) / (len(ids) + 0.5))
+                norm = K1 * (1 - B + B * lengths[ids] / average)
+                scores[ids] += idf * tfs * (K1 + 1) / (tfs + norm)
+
+            if deleted is not None:
+                scores[deleted] = 0
+
+            if phrases:
+                return self._phrase_results(scores, phrases, limit)
+
+            matched = np.flatnonzero(scores)
+            if not len(matched):
+                return []
+            if len(matched) > limit:
+                top = np.argpartition(scores[matched], -limit)[-limit:]
+                matched = matched[top]
+            order = matched[np.argsort(-scores[matched], kind="stable")]
+            return [(self._link(doc_id), float(scores[doc_id])) for doc_id in order]
+
+    def _phrase_results(self, scores, phrases, limit):
+        """Verify phrases on candidates in score order, stopping once limit matches are found"""
+        # Documents holding every phrase word, counted over the postings instead of intersecting them
+        words = list(dict.fromkeys(term_id for phrase in phrases for term_id in phrase))
+        hits = np.zeros(len(scores), dtype=np.uint16)
+        for term_id in words:
+            ids, _ = self._term_postings(term_id)
+            hits[ids] += 1
+        remaining = np.flatnonzero((hits == len(words)) & (scores > 0))
+
+        # Verify the best scored candidates first, in growing batches that keep ties together
+        results = []
+        size = max(4 * limit, 64)
+        while len(remaining) and len(results) < limit:
+            candidate_scores = scores[remaining]
+            if len(remaining) > size:
+                cutoff = np.partition(candidate_scores, len(remaining) - size)[len(remaining) - size]
+                selected = candidate_scores >= cutoff
+                batch, remaining = remaining[selected], remaining[~selected]
+            else:
+                batch, remaining = remaining, remaining[:0]
+            for doc_id in batch[np.argsort(-scores[batch], kind="stable")]:
+                if all(self._matches_phrase(doc_id, phrase) for phrase in phrases):
+                    results.append((self._link(doc_id), float(scores[doc_id])))
+                    if len(results) >= limit:
+                        break
+            size *= 4
+        return results
+
+class SearchIndex(_Ranker):
+    """In-process inverted index over article titles and descriptions
+
+    Documents are keyed by link and updated in place: adding a link whose
+    content is unchanged is a no-op, changed content replaces the old document.
+    Ranking is BM25; queries support "quoted phrases" and prefix* terms.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._term_ids = {}
+        self._terms = []
+        self._postings = []
+        self._sorted_terms = None
+        self._doc_ids = {}
+        self._doc_links = []
+        self._doc_hashes = []
+        self._doc_tokens = []
+        self._doc_lengths = array("f")
+        self._lengths_array = None
+        self._deleted = set()
+        self._deleted_array = None
+        self._total_length = 0.0
+
+    def __len__(self):
+        return len(self._doc_ids)
+
+    def _term_id(self, term):
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = len(self._terms)
+            self._term_ids[term] = term_id
+            self._terms.append(term)
+            self._postings.append(_Postings())
+            self._sorted_terms = None
+        return term_id
+
+    def add(self, link, title, description):
+        """Index or re-index one article; returns True if anything changed"""
+        digest = hashlib.blake2b(f"{title}\0{description}".encode("utf-8"), digest_size=8).digest()
+        with self._lock:
+            doc_id = self._doc_ids.get(link)
+            if doc_id is not None:
+                if self._doc_hashes[doc_id] == digest:
+                    return False
+                self._remove(doc_id)
+
+            title_tokens = tokenize(title)
+            tokens = title_tokens + tokenize(description)
+            term_ids = array("I", (self._term_id(token) for token in tokens))
+
+            frequencies = {}
+            for position, term_id in enumerate(term_ids):
+                weight = TITLE_WEIGHT if position < len(title_tokens) else 1
+                frequencies[term_id] = frequencies.get(term_id, 0) + weight
+
+            doc_id = len(self._doc_links)
+            for term_id, tf in frequencies.items():
+                self._postings[term_id].add(doc_id, tf)
+
+            length = float(sum(frequencies.values()))
+            self._doc_ids[link] = doc_id
+            self._doc_links.append(link)
+            self._doc_hashes.append(digest)
+            self._doc_tokens.append(term_ids)
+            self._doc_lengths.append(length)
+            self._lengths_array = None
+            self._total_length += length
+
+            if len(self._deleted) > COMPACT_RATIO * len(self._doc_links):
+                self._compact()
+            return True
+
+    def update(self, df):
+        """Index new or changed rows of an article frame; returns the number indexed"""
+        changed = 0
+        for title, link, description in zip(df['Title'], df['Link'], df['Description']):
+            if self.add(link, title, description):
+                changed += 1
+        return changed
+
+    def remove(self, link):
+        with self._lock:
+            doc_id = self._doc_ids.get(link)
+            if doc_id is not None:
+                self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        # Postings are cleaned up lazily; deleted ids are masked at query time
+        del self._doc_ids[self._doc_links[doc_id]]
+        self._deleted.add(doc_id)
+        self._deleted_array = None
+        self._total_length -= self._doc_lengths[doc_id]
+        self._doc_tokens[doc_id] = array("I")
+
+    def _compact(self):
+        """Rebuild postings without removed documents"""
+        for postings in self._postings:
+            ids, tfs = postings.arrays()
+            keep = ~np.isin(ids, self._deleted_array_locked())
+            postings.ids, postings.tfs = ids[keep], tfs[keep]
+        # Document ids stay stable; removed slots remain as empty placeholders
+        self._deleted = set()
+        self._deleted_array = None
+
+    def _deleted_array_locked(self):
+        if self._deleted_array is None:
+            self._deleted_array = np.fromiter(self._deleted, dtype=np.int64, count=len(self._deleted))
+        return self._deleted_array
+
+    def _expand_prefix(self, prefix):
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._terms)
+        matches = []
+        for position in range(bisect_left(self._sorted_terms, prefix), len(self._sorted_terms)):
+            term = self._sorted_terms[position]
+            if not term.startswith(prefix):
+                break
+            matches.append(self._term_ids[term])
+        return matches
+
+    def _lookup(self, token):
+        return self._term_ids.get(token)
+
+    def _term_postings(self, term_id):
+        return self._postings[term_id].arrays()
+
+    def _term_documents(self, term_id):
+        return len(self._postings[term_id])
+
+    def _doc_token_bytes(self, doc_id):
+        return self._doc_tokens[doc_id].tobytes()
+
+    def _link(self, doc_id):
+        return self._doc_links[doc_id]
+
+    def _ranking(self):
+        if self._lengths_array is None:
+            self._lengths_array = np.frombuffer(self._doc_lengths, dtype=np.float32).copy()
+        deleted = self._deleted_array_locked() if self._deleted else None
+        return len(self._doc_ids), self._lengths_array, self._total_length, deleted
+
+    def write(self, path, metadata=None):
+        """Write a read-only copy of the index for MappedSearchIndex, with optional JSON metadata"""
+        with self._lock:
+            postings = [postings.arrays() for postings in self._postings]
+            order = sorted(range(len(self._terms)), key=self._terms.__getitem__)
+            terms = [self._terms[term_id].encode("utf-8") for term_id in order]
+            links = [link.encode("utf-8") for link in self._doc_links]
+            arrays = {
+                "term_bytes": np.frombuffer(b"".join(terms), dtype=np.uint8),
+                "term_offsets": _offsets(terms),
+                "sorted_term_ids": np.asarray(order, dtype=np.uint32),
+                "posting_offsets": _offsets([ids for ids, _ in postings]),
+                "posting_ids": _concatenate([ids for ids, _ in postings], np.int32),
+                "posting_tfs": _concatenate([tfs for _, tfs in postings], np.float32),
+                "token_offsets": _offsets(self._doc_tokens),
+                "tokens": np.frombuffer(b"".join(tokens.tobytes() for tokens in self._doc_tokens), dtype=np.uint32),
+                # Copied: a view would stop add() from growing the array while the file is written
+                "lengths": np.array(self._doc_lengths, dtype=np.float32),
+                "deleted": self._deleted_array_locked(),
+                "link_bytes": np.frombuffer(b"".join(links), dtype=np.uint8),
+                "link_offsets": _offsets(links),
+            }
+            header = {"live": len(self._doc_ids), "total_length": self._total_length, "metadata": metadata or {}}
+        _write_arrays(path, header, arrays)
+
+class MappedSearchIndex(_Ranker):
+    """Read-only SearchIndex memory-mapped from a file written by SearchIndex.write
+
+    Processes that map the same file share one copy of it in the page cache
+    and rank exactly as the index that wrote it.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.RLock()
+        header, self._arrays = _read_arrays(path)
+        self.metadata = header["metadata"]
+        self._live = header["live"]
+        self._total_length = header["total_length"]
+        self._terms = _Strings(self._arrays["term_bytes"], self._arrays["term_offsets"])
+        self._links = _Strings(self._arrays["link_bytes"], self._arrays["link_offsets"])
+
+    def __len__(self):
+        return self._live
+
+    def _lookup(self, token):
+        position = bisect_left(self._terms, token)
+        if position < len(self._terms) and self._terms[position] == token:
+            return int(self._arrays["sorted_term_ids"][position])
+        return None
+
+    def _expand_prefix(self, prefix):
+        matches = []
+        for position in range(bisect_left(self._terms, prefix), len(self._terms)):
+            if not self._terms[position].startswith(prefix):
+                break
+            matches.append(int(self._arrays["sorted_term_ids"][position]))
+        return matches
+
+    def _term_postings(self, term_id):
+        offsets = self._arrays["posting_offsets"]
+        start, stop = offsets[term_id], offsets[term_id + 1]
+        return self._arrays["posting_ids"][start:stop], self._arrays["posting_tfs"][start:stop]
+
+    def _term_documents(self, term_id):
+        offsets = self._arrays["posting_offsets"]
+        return int(offsets[term_id + 1] - offsets[term_id])
+
+    def _doc_token_bytes(self, doc_id):
+        offsets = self._arrays["token_offsets"]
+        return self._arrays["tokens"][offsets[doc_id]:offsets[doc_id + 1]].tobytes()
+
+    def _link(self, doc_id):
+        return self._links[doc_id]
+
+    def _ranking(self):
+        deleted = self._arrays["deleted"]
+        return self._live, self._arrays["lengths"], self._total_length, deleted if len(deleted) else None
+
+class _Strings:
+    """Sequence view of UTF-8 strings stored back to back, for bisect"""
+
+    def __init__(self, data, offsets):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, position):
+        return self._data[self._offsets[position]:self._offsets[position + 1]].tobytes().decode("utf-8")
+
+def _offsets(items):
+    """Start offsets of items stored back to back, plus the total length"""
+    offsets = np.zeros(len(items) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in items], out=offsets[1:])
+    return offsets
+
+def _concatenate(arrays, dtype):
+    return np.concatenate(arrays).astype(dtype, copy=False) if arrays else np.empty(0, dtype=dtype)
+
+_MAGIC = b"NEWSIDX1"
+
+def _write_arrays(path, header, arrays):
+    """Write a JSON header and 8-byte aligned raw arrays to one file"""
+    layout, offset = {}, 0
+    for name, values in arrays.items():
+        values = np.ascontiguousarray(values)
+        layout[name] = {"dtype": values.dtype.str, "offset": offset, "count": len(values)}
+        offset += -(-values.nbytes // 8) * 8
+    encoded = json.dumps(dict(header, arrays=layout)).encode("utf-8")
+    encoded += b" " * (-len(encoded) % 8)
+    with open(path, "wb") as f:
+        f.write(_MAGIC + struct.pack("<Q", len(encoded)) + encoded)
+        for name, values in arrays.items():
+            data = np.ascontiguousarray(values).tobytes()
+            f.write(data + b"\0" * (-len(data) % 8))
+
+def _read_arrays(path):
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if data[:len(_MAGIC)] != _MAGIC:
+        raise ValueError(f"{path} is not a search index file")
+    (size,) = struct.unpack_from("<Q", data, len(_MAGIC))
+    start = len(_MAGIC) + 8
+    header = json.loads(bytes(data[start:start + size]))
+    start += size
+    arrays = {
+        name: np.frombuffer(data, dtype=np.dtype(spec["dtype"]), count=spec["count"], offset=start + spec["offset"])
+        for name, spec in header.pop("arrays").items()
+    }
+    return header, arrays
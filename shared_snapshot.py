@@ -0,0 +1,188 @@
+import fcntl
+import logging
+import os
+import re
+import threading
+
+from article_table import ArticleTable
+from feed_cache import CACHE_DIR
+from search_index import MappedSearchIndex
+
+logger = logging.getLogger(__name__)
+
+# Set NEWS_SHARED_SNAPSHOT=1 when running several workers (uvicorn --workers N): one of them
+# crawls and publishes each snapshot as an Arrow file that the others memory-map
+SHARED_SNAPSHOT = os.environ.get("NEWS_SHARED_SNAPSHOT", "0") == "1"
+
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, "snapshots")
+
+# Seconds between checks for a newly published snapshot and for a vacant refresher role
+POLL_INTERVAL = float(os.environ.get("NEWS_SNAPSHOT_POLL_INTERVAL", "1"))
+
+# Older snapshot files kept next to the current one for workers still switching over
+KEEP_SNAPSHOTS = 2
+
+_SNAPSHOT_FILE = re.compile(r"^snapshot-(\d+)\.arrow$")
+_SEARCH_FILE = re.compile(r"^search-(\d+)\.idx$")
+
+class SnapshotChannel:
+    """Share snapshots between worker processes through memory-mapped Arrow files
+
+    One process, the refresher, holds an exclusive lock on refresher.lock,
+    builds snapshots and publishes each one as snapshot-{version}.arrow
+    before atomically pointing CURRENT at it, so readers only ever open
+    complete files. The other processes follow CURRENT and map each new file
+    without copying it, sharing one copy in the page cache. The refresher's
+    search index is published the same way as search-{version}.idx behind
+    SEARCH, so followers search without indexing the history. When the
+    refresher exits its lock is released and the next process to poll takes
+    over. Files stay readable by processes that mapped them after they are
+    pruned.
+    """
+
+    def __init__(self, directory=SNAPSHOT_DIR, poll_interval=POLL_INTERVAL):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.version = 0
+        self._current = None
+        self._current_search = None
+        self._lock_file = None
+        self._stop = threading.Event()
+
+    @property
+    def current_path(self):
+        return os.path.join(self.directory, "CURRENT")
+
+    @property
+    def search_path(self):
+        return os.path.join(self.directory, "SEARCH")
+
+    @property
+    def leader(self):
+        """True if this process is the refresher"""
+        return self._lock_file is not None
+
+    def try_lead(self):
+        """Become the refresher unless another process is; returns True if this process is it"""
+        if self._lock_file is not None:
+            return True
+        os.makedirs(self.directory, exist_ok=True)
+        lock_file = open(os.path.join(self.directory, "refresher.lock"), "a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.truncate(0)
+        lock_file.write(f"{os.getpid()}\n")
+        lock_file.flush()
+        self._lock_file = lock_file
+        return True
+
+    def publish(self, snapshot):
+        """Write a snapshot built by this process and make it the current one"""
+        if snapshot.version <= self.version:
+            return
+        name = f"snapshot-{snapshot.version}.arrow"
+        path = os.path.join(self.directory, name)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            snapshot.articles.write_arrow(f"{path}.tmp", {"version": snapshot.version, "built_at": snapshot.built_at})
+            os.replace(f"{path}.tmp", path)
+            self._point(self.current_path, name)
+        except Exception as e:
+            logger.exception("Error publishing snapshot %s: %s", snapshot.version, e)
+            return
+        self.version = snapshot.version
+        self._current = name
+        self._prune(_SNAPSHOT_FILE, name)
+
+    def publish_search(self, index, version):
+        """Write this process's search index as of a snapshot version and make it the current one"""
+        name = f"search-{version}.idx"
+        if name == self._current_search:
+            return
+        path = os.path.join(self.directory, name)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            index.write(f"{path}.tmp", {"version": version})
+            os.replace(f"{path}.tmp", path)
+            self._point(self.search_path, name)
+        except Exception as e:
+            logger.exception("Error publishing search index %s: %s", version, e)
+            return
+        self._current_search = name
+        self._prune(_SEARCH_FILE, name)
+
+    def _point(self, pointer, name):
+        with open(f"{pointer}.tmp", "w", encoding="utf-8") as f:
+            f.write(name)
+        os.replace(f"{pointer}.tmp", pointer)
+
+    def _prune(self, pattern, current):
+        versions = []
+        for name in os.listdir(self.directory):
+            match = pattern.match(name)
+            if match and name != current:
+                versions.append((int(match.group(1)), name))
+        for _, name in sorted(versions)[:-KEEP_SNAPSHOTS or None]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def latest(self):
+        """(articles, version, built_at) of the current snapshot if it is new to this process, else None"""
+        try:
+            with open(self.current_path, "r", encoding="utf-8") as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return None
+        if not name or name == self._current:
+            return None
+        articles, metadata = ArticleTable.read_arrow(os.path.join(self.directory, name))
+        self._current = name
+        self.version = int(metadata["version"])
+        return articles, self.version, float(metadata["built_at"])
+
+    def latest_search(self):
+        """The current published search index if it is new to this process, else None"""
+        try:
+            with open(self.search_path, "r", encoding="utf-8") as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return None
+        if not name or name == self._current_search:
+            return None
+        index = MappedSearchIndex(os.path.join(self.directory, name))
+        self._current_search = name
+        return index
+
+    def run(self, cache, on_lead, on_search=None):
+        """Install published snapshots into a SnapshotCache until this process becomes the refresher
+
+        on_lead is called once this process holds the refresher role; meanwhile
+        the cache should be following (cache.follow()). on_search gets each
+        newly published search index. Blocks, so run it on its own thread.
+        """
+        while not self._stop.is_set():
+            try:
+                latest = self.latest()
+                if latest is not None:
+                    cache.install(*latest)
+                index = self.latest_search() if on_search is not None else None
+                if index is not None:
+                    on_search(index)
+            except Exception as e:
+                # The file may have been pruned between reading CURRENT and opening it
+                logger.exception("Error loading published snapshot: %s", e)
+            if self.try_lead():
+                on_lead()
+                return
+            self._stop.wait(self.poll_interval)
+
+    def stop(self):
+        self._stop.set()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
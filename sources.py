@@ -0,0 +1,94 @@
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Declarative list of the sources to crawl
+SOURCES_PATH = os.environ.get("NEWS_SOURCES_PATH", "sources.json")
+
+KINDS = ("rss", "html")
+
+# "source" shows the article's own image, "placeholder" always shows the placeholder
+IMAGE_POLICIES = ("source", "placeholder")
+
+# CSS selectors an html source must define; the others are optional
+REQUIRED_SELECTORS = ("item", "link", "title")
+
+class Source:
+    """One entry of the source registry"""
+
+    __slots__ = ("name", "url", "kind", "poll_interval", "image_policy", "selectors", "date_format", "page_url",
+                 "enabled")
+
+    def __init__(self, name, url, kind="rss", poll_interval=None, image_policy="source",
+                 selectors=None, date_format=None, page_url=None, enabled=True):
+        if kind not in KINDS:
+            raise ValueError(f"unknown kind {kind!r}")
+        if image_policy not in IMAGE_POLICIES:
+            raise ValueError(f"unknown image_policy {image_policy!r}")
+        selectors = dict(selectors or {})
+        if kind == "html":
+            missing = [key for key in REQUIRED_SELECTORS if key not in selectors]
+            if missing:
+                raise ValueError(f"html source needs selectors {', '.join(missing)}")
+        if page_url is not None and (kind != "html" or "{page}" not in page_url):
+            raise ValueError("page_url is only for html sources and must contain {page}")
+        self.name = name
+        self.url = url
+        self.kind = kind
+        self.poll_interval = float(poll_interval) if poll_interval else None
+        self.image_policy = image_policy
+        self.selectors = selectors
+        self.date_format = date_format
+        # URL of older listing pages, e.g. ".../page/{page}/", walked by a backfill
+        self.page_url = page_url
+        self.enabled = enabled
+
+    def __repr__(self):
+        return f"Source({self.name!r}, {self.url!r}, kind={self.kind!r})"
+
+class SourceRegistry:
+    """Sources to crawl plus per-host concurrency caps, loaded from a JSON file"""
+
+    def __init__(self, sources=(), host_limits=None):
+        self.sources = [source for source in sources if source.enabled]
+        self.host_limits = dict(host_limits or {})
+        self._by_name = {source.name: source for source in sources}
+
+    def __iter__(self):
+        return iter(self.sources)
+
+    def __len__(self):
+        return len(self.sources)
+
+    def get(self, name):
+        return self._by_name.get(name)
+
+    def image_policy(self, name):
+        """Image policy of a source; sources no longer in the registry show their images"""
+        source = self._by_name.get(name)
+        return source.image_policy if source is not None else "source"
+
+    @classmethod
+    def from_dict(cls, data):
+        defaults = data.get("defaults", {})
+        sources = []
+        for position, entry in enumerate(data.get("sources", [])):
+            try:
+                sources.append(Source(**{**defaults, **entry}))
+            except (TypeError, ValueError) as e:
+                # Skip a broken entry rather than crawling nothing
+                logger.warning("Error in source #%d (%s): %s", position, entry.get('name', '?'), e)
+        return cls(sources, data.get("hosts"))
+
+def load_sources(path=SOURCES_PATH):
+    """Load the source registry, or an empty one if the file is missing or invalid"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return SourceRegistry.from_dict(json.load(f))
+    except FileNotFoundError:
+        logger.warning("Source registry %s not found, crawling nothing", path)
+    except Exception as e:
+        logger.exception("Error loading source registry %s: %s", path, e)
+    return SourceRegistry()
@@ -0,0 +1,313 @@
+import asyncio
+import functools
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from feed_cache import CACHE_DIR
+from fetcher import fetcher
+from metrics import thumbnail_lookups
+
+logger = logging.getLogger(__name__)
+
+# Set NEWS_THUMBNAILS=0 to hotlink the publishers' images instead
+THUMBNAILS_ENABLED = os.environ.get("NEWS_THUMBNAILS", "1") != "0"
+
+THUMBNAIL_DIR = os.path.join(CACHE_DIR, "thumbnails")
+
+# Disk space for thumbnails; the least recently served images are evicted first
+THUMBNAIL_CACHE_BYTES = int(float(os.environ.get("NEWS_THUMBNAIL_CACHE_MB", "256")) * 1024 * 1024)
+
+# Widths generated for every image: the card width and its 2x version
+THUMBNAIL_WIDTHS = (400, 800)
+
+# Images larger than this are not proxied
+MAX_IMAGE_BYTES = 15 * 1024 * 1024
+MAX_IMAGE_PIXELS = 50_000_000
+
+# Seconds before an image that failed to load is tried again
+FAILURE_TTL = 3600
+
+# Thumbnails fetched ahead of time per refresh, newest articles first
+PREFETCH_LIMIT = int(os.environ.get("NEWS_THUMBNAIL_PREFETCH", "200"))
+
+# Seconds a request waits for an image that is not cached yet
+FETCH_TIMEOUT = 30
+
+def image_key(url):
+    """Short stable key for an image URL, used in thumbnail URLs"""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:20]
+
+@functools.lru_cache(maxsize=None)
+def image_formats():
+    """Encoders by URL-safe format name, best first; WebP needs Pillow built with libwebp"""
+    from PIL import features
+    formats = OrderedDict(
+        [("webp", ("WEBP", "image/webp", {"quality": 75, "method": 4}))] if features.check("webp") else []
+    )
+    formats["jpeg"] = ("JPEG", "image/jpeg", {"quality": 80, "optimize": True, "progressive": True})
+    return formats
+
+def render_thumbnails(body, widths=THUMBNAIL_WIDTHS, formats=None):
+    """Decode an image once and encode it at every width and format; returns {(width, format): bytes}"""
+    from PIL import Image, ImageOps
+    formats = formats or image_formats()
+    image = Image.open(io.BytesIO(body))
+    if image.width * image.height > MAX_IMAGE_PIXELS:
+        raise ValueError(f"image too large ({image.width}x{image.height})")
+    # JPEGs can be decoded at a fraction of their size, which is much faster
+    image.draft("RGB", (max(widths), max(widths) * 3))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        has_alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    variants = {}
+    for width in sorted(widths, reverse=True):
+        # Never upscales; height is capped so very tall images stay small
+        image.thumbnail((width, width * 3), Image.LANCZOS)
+        for name, (encoder, _, options) in formats.items():
+            frame = image
+            if encoder == "JPEG" and image.mode == "RGBA":
+                frame = Image.new("RGB", image.size, "white")
+                frame.paste(image, mask=image.getchannel("A"))
+            out = io.BytesIO()
+            frame.save(out, encoder, **options)
+            variants[width, name] = out.getvalue()
+    return variants
+
+class ThumbnailCache:
+    """Resized copies of article images in a bounded on-disk LRU
+
+    Each image is downloaded once and stored as {content hash}-{width}.{format},
+    so the same picture behind several URLs is kept once. Thumbnail keys are
+    resolved to article images by the resolver callback, so only images of
+    known articles are fetched, never arbitrary URLs.
+    """
+
+    def __init__(self, directory=THUMBNAIL_DIR, max_bytes=THUMBNAIL_CACHE_BYTES, widths=THUMBNAIL_WIDTHS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.widths = tuple(sorted(widths))
+        # Maps a key from url_for() back to the image URL, or None for unknown keys
+        self.resolver = None
+        self._lock = threading.Lock()
+        self._digests = {}
+        self._files = OrderedDict()
+        self._bytes = 0
+        self._failed = {}
+        self._inflight = {}
+        self._loaded = False
+        self._dirty = False
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.directory, "manifest.json")
+
+    def _load(self):
+        """Index the thumbnails already on disk, oldest first, and the URL manifest"""
+        with self._lock:
+            if self._loaded:
+                return
+            files = {}
+            try:
+                for entry in os.scandir(self.directory):
+                    digest, _, rest = entry.name.partition("-")
+                    if not rest or rest.endswith(".tmp") or "." not in rest:
+                        continue
+                    stat = entry.stat()
+                    size, mtime = files.get(digest, (0, 0))
+                    files[digest] = (size + stat.st_size, max(mtime, stat.st_mtime))
+            except FileNotFoundError:
+                pass
+            for digest, (size, _) in sorted(files.items(), key=lambda item: item[1][1]):
+                self._files[digest] = size
+                self._bytes += size
+
+            try:
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+                self._digests = {url: digest for url, digest in manifest.items() if digest in self._files}
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning("Error loading thumbnail manifest: %s", e)
+            self._loaded = True
+
+    def save(self):
+        """Write the URL to content hash manifest if it changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps({url: digest for url, digest in self._digests.items() if digest in self._files})
+            self._dirty = False
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{self.manifest_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.manifest_path)
+        except Exception as e:
+            logger.warning("Error saving thumbnail manifest: %s", e)
+
+    def url_for(self, url, width=THUMBNAIL_WIDTHS[0]):
+        """Thumbnail URL for an article image"""
+        return f"/thumbnails/{image_key(url)}?w={width}"
+
+    def resolve(self, key):
+        """Image URL behind a thumbnail key, or None"""
+        return self.resolver(key) if self.resolver is not None else None
+
+    def width_for(self, width):
+        """Smallest generated width at least as wide as requested"""
+        for candidate in self.widths:
+            if candidate >= width:
+                return candidate
+        return self.widths[-1]
+
+    def path(self, digest, width, fmt):
+        return os.path.join(self.directory, f"{digest}-{width}.{fmt}")
+
+    def _hit(self, url, width, fmt):
+        """(path, etag) of a stored thumbnail, marking it recently used, or None"""
+        digest = self._digests.get(url)
+        if digest is None:
+            return None
+        with self._lock:
+            if digest not in self._files:
+                return None
+            self._files.move_to_end(digest)
+        path = self.path(digest, width, fmt)
+        try:
+            # Keeps the LRU order across restarts
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path, f'"{digest}-{width}-{fmt}"'
+
+    def cached(self, url, width, fmt):
+        """Serve from disk without fetching; None if the image is not there yet"""
+        if not self._loaded:
+            return None
+        result = self._hit(url, self.width_for(width), fmt)
+        if result is not None:
+            thumbnail_lookups.inc(result="hit")
+        return result
+
+    def lookup(self, url, width, fmt, timeout=FETCH_TIMEOUT):
+        """(path, etag) of a thumbnail, fetching the image if needed; None if it cannot be loaded
+
+        Blocks, so call it from a worker thread.
+        """
+        self._load()
+        width = self.width_for(width)
+        result = self._hit(url, width, fmt)
+        if result is not None:
+            thumbnail_lookups.inc(result="hit")
+            return result
+
+        future = self._start(url)
+        if future is None:
+            thumbnail_lookups.inc(result="failed")
+            return None
+        try:
+            future.result(timeout)
+        except Exception:
+            pass
+        result = self._hit(url, width, fmt)
+        thumbnail_lookups.inc(result="fetched" if result is not None else "failed")
+        return result
+
+    def _start(self, url):
+        """Future for the download of url, shared with any download already running; None after a recent failure"""
+        with self._lock:
+            future = self._inflight.get(url)
+            if future is not None:
+                return future
+            failed_at = self._failed.get(url)
+            if failed_at is not None and time.time() - failed_at < FAILURE_TTL:
+                return None
+            future = self._inflight[url] = fetcher.submit(self._fetch(url))
+            return future
+
+    async def _fetch(self, url):
+        try:
+            res = await fetcher.get(url)
+            res.raise_for_status()
+            if len(res.content) > MAX_IMAGE_BYTES:
+                raise ValueError(f"image larger than {MAX_IMAGE_BYTES} bytes")
+            digest = hashlib.sha256(res.content).hexdigest()[:24]
+            if digest not in self._files:
+                # Decoding and encoding are CPU-bound; keep them off the fetcher loop
+                variants = await asyncio.to_thread(render_thumbnails, res.content, self.widths)
+                await asyncio.to_thread(self._store, digest, variants)
+            with self._lock:
+                self._digests[url] = digest
+                self._failed.pop(url, None)
+                self._dirty = True
+            return digest
+        except Exception as e:
+            logger.warning("Error creating thumbnail for %s: %s", url, e)
+            with self._lock:
+                self._failed[url] = time.time()
+            return None
+        finally:
+            with self._lock:
+                self._inflight.pop(url, None)
+
+    def _store(self, digest, variants):
+        os.makedirs(self.directory, exist_ok=True)
+        size = 0
+        for (width, fmt), data in variants.items():
+            path = self.path(digest, width, fmt)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            size += len(data)
+
+        evicted = []
+        with self._lock:
+            self._bytes += size - self._files.pop(digest, 0)
+            self._files[digest] = size
+            while self._bytes > self.max_bytes and len(self._files) > 1:
+                old, old_size = self._files.popitem(last=False)
+                self._bytes -= old_size
+                evicted.append(old)
+        for old in evicted:
+            for width in self.widths:
+                for fmt in image_formats():
+                    try:
+                        os.remove(self.path(old, width, fmt))
+                    except FileNotFoundError:
+                        pass
+
+    def prefetch(self, urls, limit=PREFETCH_LIMIT):
+        """Start downloading thumbnails for up to limit image URLs that are not cached; returns how many"""
+        self._load()
+        # Record what the previous prefetches found
+        self.save()
+        started = 0
+        for url in urls:
+            if started >= limit:
+                break
+            digest = self._digests.get(url)
+            if digest is not None and digest in self._files:
+                continue
+            if self._start(url) is not None:
+                started += 1
+        return started
+
+    def stats(self):
+        with self._lock:
+            return {
+                "images": len(self._files),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "downloading": len(self._inflight),
+            }